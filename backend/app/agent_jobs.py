@@ -0,0 +1,287 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import select as sa_select, update as sa_update, func
+from sqlalchemy.orm import Session
+
+from .config import AGENT_JOB_WORKERS, AGENT_JOB_MAX_ATTEMPTS, AGENT_JOB_BACKOFF_S
+from .database import SessionLocal
+from .models import AgentJobORM
+from .reflection_store import save_reflection
+from .utils import ensure_profile, _groq_json_chat
+
+_REFLECT_SYSTEM = {
+    "role": "system",
+    "content": (
+        "You are an English speaking coach. Return STRICT JSON only.\n"
+        "IMPORTANT: Write all text fields in Bahasa Indonesia EXCEPT vocab_targets.items (keep English words).\n"
+        '{"summary":"3-5 kalimat ringkasan sesi dalam Bahasa Indonesia",'
+        '"error_patterns":[{"tag":"kategori singkat","description":"deskripsi kesalahan dalam Bahasa Indonesia","examples":["kutipan dari percakapan"],"weight":0}],'
+        '"vocab_targets":[{"topic":"topik dalam Bahasa Indonesia","items":["english_word1","english_word2"]}],'
+        '"objectives_next":["tujuan latihan berikutnya dalam Bahasa Indonesia"]}\nNo extra text.'
+    ),
+}
+
+_PLAN_SYSTEM = {
+    "role": "system",
+    "content": (
+        "You are a session planner. Produce JSON only.\n"
+        "IMPORTANT: objectives and rubric in Bahasa Indonesia. starter_turns in English (practice prompts).\n"
+        '{"scenario":"scenario name in English","level":1..5,'
+        '"objectives":["tujuan dalam Bahasa Indonesia"],'
+        '"rubric":["kriteria penilaian dalam Bahasa Indonesia"],'
+        '"starter_turns":["opening question in English"],'
+        '"target_time_min":5}\n'
+        "No extra text."
+    ),
+}
+
+
+# ===== Reflect / Plan (dipakai endpoint sinkron dan job background) =====
+# Langkah DB memakai SessionLocal singkat di thread (asyncio.to_thread) — session tidak pernah
+# terbuka selama panggilan LLM di-await, dan commit tidak jalan di event loop.
+
+def _in_session(fn, *args):
+    with SessionLocal() as db:
+        return fn(db, *args)
+
+
+def _profile_context(db: Session, user_id: int) -> dict:
+    prof = ensure_profile(db, user_id=user_id)
+    return {
+        "level": prof.level,
+        "ma": {
+            "range":     prof.ma_range,
+            "accuracy":  prof.ma_accuracy,
+            "fluency":   prof.ma_fluency,
+            "coherence": prof.ma_coherence,
+            "interaction": prof.ma_interaction,
+            "overall":   prof.ma_overall,
+        },
+    }
+
+
+def _save_objectives(db: Session, user_id: int, objectives: list) -> None:
+    prof = ensure_profile(db, user_id=user_id)
+    prof.last_objectives = "\n".join(objectives[:6])
+    db.add(prof); db.commit()
+
+
+async def reflect_session(user_id: int, messages: list, feedback: dict, strict: bool = False) -> dict:
+    """Ringkasan sesi + pola kesalahan + target kosakata; disimpan ke error_patterns/vocab_targets."""
+    msgs     = messages[-60:]
+    user_msg = {"role": "user", "content": json.dumps({"dialogue": msgs, "feedback": feedback}, ensure_ascii=False)}
+    data     = await _groq_json_chat([_REFLECT_SYSTEM, user_msg], temperature=0.2)
+    if strict and not data:
+        raise RuntimeError("reflect: empty LLM response")
+    out      = {
+        "summary":         (data.get("summary") or "")[:2000],
+        "error_patterns":  data.get("error_patterns", [])[:5],
+        "vocab_targets":   data.get("vocab_targets", [])[:2],
+        "objectives_next": data.get("objectives_next", [])[:5],
+    }
+
+    await asyncio.to_thread(_in_session, save_reflection, user_id, out)
+    return out
+
+
+async def plan_next_session(user_id: int, error_patterns: list, objectives_next: list,
+                            vocab_targets: list, profile: dict | None = None, strict: bool = False) -> dict:
+    """Rencana sesi berikutnya dari hasil reflect + profil; objectives disimpan ke profil."""
+    profile = profile or await asyncio.to_thread(_in_session, _profile_context, user_id)
+    context = {
+        "profile":         profile,
+        "error_patterns":  error_patterns,
+        "objectives_next": objectives_next,
+        "vocab_targets":   vocab_targets,
+    }
+    plan = await _groq_json_chat(
+        [_PLAN_SYSTEM, {"role": "user", "content": json.dumps(context, ensure_ascii=False)}],
+        temperature=0.3,
+    )
+    if strict and not plan:
+        raise RuntimeError("plan: empty LLM response")
+    await asyncio.to_thread(_in_session, _save_objectives, user_id, plan.get("objectives") or [])
+    return {
+        "scenario":        plan.get("scenario", "Daily Conversation"),
+        "level":           int(plan.get("level", profile.get("level", 2))),
+        "objectives":      (plan.get("objectives") or [])[:6],
+        "rubric":          (plan.get("rubric") or ["Speak clearly", "Use correct tense"])[:6],
+        "starter_turns":   (plan.get("starter_turns") or ["Tell me about your day."])[:3],
+        "target_time_min": int(plan.get("target_time_min", 7)),
+    }
+
+
+# ===== Job queue =====
+
+def job_to_dict(job: AgentJobORM) -> dict:
+    result = json.loads(job.result_json) if job.result_json else {}
+    return {
+        "id":          job.id,
+        "kind":        job.kind,
+        "status":      job.status,
+        "session_id":  job.session_id,
+        "attempts":    job.attempts,
+        "reflect":     result.get("reflect"),
+        "plan":        result.get("plan"),
+        "error":       job.error,
+        "created_at":  job.created_at.isoformat() if job.created_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+class AgentJobQueue:
+    """
+    Reflect + plan setelah sesi disimpan, dijalankan worker asyncio terbatas di proses API.
+    State job ada di tabel agent_jobs (bukan memori) — job yang belum selesai saat restart
+    dilanjutkan di startup. Gagal → dicoba ulang dengan backoff eksponensial.
+    """
+
+    def __init__(self, workers: int, max_attempts: int, backoff_s: float):
+        self.workers      = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_s    = backoff_s
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    async def startup(self) -> None:
+        self._loop  = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        now     = datetime.utcnow()
+        pending = await asyncio.to_thread(self._recover)
+        for job_id, run_at in pending:
+            self._push(job_id, max(0.0, (run_at - now).total_seconds()))
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if pending:
+            print(f"[AGENT] Resumed {len(pending)} pending job(s)", flush=True)
+
+    @staticmethod
+    def _recover() -> list:
+        with SessionLocal() as db:
+            # Job "running" saat proses mati dianggap belum jalan
+            db.execute(sa_update(AgentJobORM).where(AgentJobORM.status == "running").values(status="queued"))
+            db.commit()
+            return db.execute(
+                sa_select(AgentJobORM.id, AgentJobORM.next_run_at).where(AgentJobORM.status == "queued")
+            ).all()
+
+    async def shutdown(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop  = None
+        self._queue = None
+
+    def _push(self, job_id: int, delay: float = 0.0) -> None:
+        # Dipanggil di event loop
+        if self._queue is None:
+            return
+        if delay > 0:
+            self._loop.call_later(delay, self._push, job_id, 0.0)
+        else:
+            self._queue.put_nowait(job_id)
+
+    def _schedule(self, job_id: int, delay: float = 0.0) -> None:
+        """Aman dipanggil dari thread endpoint sinkron. Tanpa loop aktif job tetap 'queued' di DB."""
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(self._push, job_id, delay)
+        except RuntimeError:
+            pass   # loop sudah ditutup — diambil lagi saat startup berikutnya
+
+    def enqueue(self, db: Session, user_id: int, session_id: int | None, payload: dict,
+                kind: str = "reflect_plan") -> AgentJobORM:
+        job = AgentJobORM(
+            user_id      = user_id,
+            session_id   = session_id,
+            kind         = kind,
+            payload_json = json.dumps(payload, ensure_ascii=False),
+        )
+        db.add(job); db.commit(); db.refresh(job)
+        self._schedule(job.id)
+        return job
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                print(f"[AGENT] Job {job_id} crashed: {e}", flush=True)
+            finally:
+                self._queue.task_done()
+
+    @staticmethod
+    def _claim(job_id: int) -> tuple | None:
+        """queued → running; None kalau job sudah diambil / tidak ada."""
+        with SessionLocal() as db:
+            job = db.get(AgentJobORM, job_id)
+            if job is None or job.status != "queued":
+                return None
+            job.status     = "running"
+            job.attempts  += 1
+            job.updated_at = datetime.utcnow()
+            db.commit()
+            return (job.user_id, job.attempts, json.loads(job.payload_json),
+                    json.loads(job.result_json) if job.result_json else {})
+
+    async def _run(self, job_id: int) -> None:
+        claimed = await asyncio.to_thread(self._claim, job_id)
+        if claimed is None:
+            return
+        user_id, attempts, payload, result = claimed
+
+        try:
+            # Reflect yang sudah sukses tidak diulang (hindari vocab_targets ganda saat retry)
+            if "reflect" not in result:
+                result["reflect"] = await reflect_session(
+                    user_id, payload.get("messages") or [], payload.get("feedback") or {}, strict=True)
+                await self._update(job_id, result_json=json.dumps(result, ensure_ascii=False))
+            ref = result["reflect"]
+            result["plan"] = await plan_next_session(
+                user_id, ref["error_patterns"], ref["objectives_next"], ref["vocab_targets"], strict=True)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"[:2000]
+            if attempts >= self.max_attempts:
+                await self._update(job_id, status="failed", error=error, finished_at=datetime.utcnow())
+                print(f"[AGENT] Job {job_id} failed after {attempts} attempt(s): {error}", flush=True)
+                return
+            delay = self.backoff_s * (2 ** (attempts - 1))
+            await self._update(job_id, status="queued", error=error,
+                               next_run_at=datetime.utcnow() + timedelta(seconds=delay))
+            print(f"[AGENT] Job {job_id} attempt {attempts} failed — retry in {delay:.0f}s", flush=True)
+            self._push(job_id, delay)
+            return
+
+        await self._update(job_id, status="done", error=None, finished_at=datetime.utcnow(),
+                           result_json=json.dumps(result, ensure_ascii=False))
+
+    @staticmethod
+    def _update_sync(job_id: int, values: dict) -> None:
+        values["updated_at"] = datetime.utcnow()
+        with SessionLocal() as db:
+            db.execute(sa_update(AgentJobORM).where(AgentJobORM.id == job_id).values(**values))
+            db.commit()
+
+    async def _update(self, job_id: int, **values) -> None:
+        await asyncio.to_thread(self._update_sync, job_id, values)
+
+    def stats(self, db: Session) -> dict:
+        by_status = dict(db.execute(
+            sa_select(AgentJobORM.status, func.count()).group_by(AgentJobORM.status)
+        ).all())
+        return {
+            "workers":      len(self._tasks),
+            "ready_now":    self._queue.qsize() if self._queue is not None else 0,
+            "jobs":         by_status,
+            "max_attempts": self.max_attempts,
+            "backoff_s":    self.backoff_s,
+        }
+
+
+queue = AgentJobQueue(AGENT_JOB_WORKERS, AGENT_JOB_MAX_ATTEMPTS, AGENT_JOB_BACKOFF_S)
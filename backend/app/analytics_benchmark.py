@@ -0,0 +1,169 @@
+# backend/app/analytics_benchmark.py
+"""
+Benchmark endpoint admin analytics: implementasi lama (N+1 — 2 query per user,
+agregasi harian di Python) vs implementasi set-based (join profil + ROW_NUMBER()
+untuk 30 sesi terakhir per user; view daily dibaca dari daily_score_rollups).
+
+Database sementara di-seed dengan N user × M sesi, lalu untuk tiap implementasi
+dan view ('session' / 'daily') diukur jumlah query SQL dan latensi (median).
+
+CARA PAKAI (dari folder backend/):
+  python -m app.analytics_benchmark --users 300 --sessions 40
+  python -m app.analytics_benchmark --db-url postgresql://... --users 300   # DB kosong khusus benchmark
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+
+def _legacy_aggregate_by_date(sessions: list) -> list:
+    by_date = defaultdict(list)
+    for s in sessions:
+        by_date[s.created_at.strftime("%d/%m")].append(s)
+    result = []
+    for date_key in sorted(by_date.keys()):
+        day = by_date[date_key]
+        result.append({
+            "date": date_key,
+            "sessions_on_day": len(day),
+            "overall": round(sum(s.score_overall for s in day) / len(day), 2),
+            "range": round(sum(s.score_range for s in day) / len(day), 2),
+            "accuracy": round(sum(s.score_accuracy for s in day) / len(day), 2),
+            "fluency": round(sum(s.score_fluency for s in day) / len(day), 2),
+            "coherence": round(sum(s.score_coherence for s in day) / len(day), 2),
+            "interaction": round(sum(s.score_interaction for s in day) / len(day), 2),
+            "total_min": round(sum(s.duration_min or 0 for s in day), 1),
+            "scenarios": [s.scenario for s in day],
+        })
+    return result
+
+
+def legacy_analytics(db, view: str) -> list:
+    """Salinan implementasi sebelum set-based (satu query profil + satu query sesi per user)."""
+    from sqlalchemy import select as sa_select, asc
+    from .models import UserORM, ProfileORM, SessionRecordORM
+
+    users = db.execute(
+        sa_select(UserORM).where(UserORM.role == "user").order_by(asc(UserORM.id))
+    ).scalars().all()
+    result = []
+    for u in users:
+        prof_rows = db.execute(
+            sa_select(ProfileORM).where(ProfileORM.user_id == u.id).order_by(asc(ProfileORM.id))
+        ).scalars().all()
+        prof = prof_rows[0] if prof_rows else None
+        sessions = db.execute(
+            sa_select(SessionRecordORM)
+            .where(SessionRecordORM.user_id == u.id)
+            .order_by(asc(SessionRecordORM.created_at))
+            .limit(30)
+        ).scalars().all()
+        trend = _legacy_aggregate_by_date(sessions) if view == "daily" else [
+            {"session": i + 1, "overall": round(s.score_overall, 2), "date": s.created_at.strftime("%d/%m")}
+            for i, s in enumerate(sessions)
+        ]
+        result.append({"user_id": u.id, "level": prof.level if prof else 1,
+                       "ma_overall": prof.ma_overall if prof else 3.0, "score_trend": trend})
+    result.sort(key=lambda x: x["ma_overall"], reverse=True)
+    return result
+
+
+def seed(n_users: int, n_sessions: int) -> None:
+    from .database import SessionLocal
+    from .models import UserORM, ProfileORM, SessionRecordORM
+    from .rollups import rebuild as rebuild_rollups
+
+    rnd   = random.Random(42)
+    start = datetime.utcnow() - timedelta(days=90)
+    with SessionLocal() as db:
+        users = [UserORM(username=f"bench_{i}", email=f"bench_{i}@example.com", hashed_password="x", role="user")
+                 for i in range(n_users)]
+        db.add_all(users); db.flush()
+        db.add_all([ProfileORM(user_id=u.id, ma_overall=rnd.uniform(1, 5)) for u in users])
+        rows = []
+        for u in users:
+            for j in range(n_sessions):
+                sc = [rnd.uniform(1, 5) for _ in range(5)]
+                rows.append(SessionRecordORM(
+                    user_id=u.id, scenario=rnd.choice(["Job Interview", "Travel Situations", "Daily Conversation"]),
+                    score_range=sc[0], score_accuracy=sc[1], score_fluency=sc[2],
+                    score_coherence=sc[3], score_interaction=sc[4], score_overall=sum(sc) / 5,
+                    duration_min=rnd.uniform(2, 10),
+                    created_at=start + timedelta(hours=j * 20 + rnd.randint(0, 10)),
+                ))
+        db.add_all(rows)
+        db.commit()
+        rebuild_rollups(db)
+
+
+def measure(fn, repeat: int) -> dict:
+    from sqlalchemy import event
+    from .database import engine, SessionLocal
+
+    counter = {"n": 0}
+
+    def _count(*_):
+        counter["n"] += 1
+
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        timings, queries = [], []
+        for _ in range(repeat):
+            counter["n"] = 0
+            with SessionLocal() as db:
+                t0 = time.perf_counter()
+                fn(db)
+                timings.append((time.perf_counter() - t0) * 1000)
+            queries.append(counter["n"])
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+    return {"queries": max(queries), "median_ms": round(statistics.median(timings), 1),
+            "min_ms": round(min(timings), 1)}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--users",    type=int, default=300)
+    ap.add_argument("--sessions", type=int, default=40)
+    ap.add_argument("--repeat",   type=int, default=5)
+    ap.add_argument("--db-url",   default="")
+    args = ap.parse_args()
+
+    tmpdir = None
+    if not args.db_url:
+        tmpdir = tempfile.mkdtemp(prefix="analytics_bench_")
+        args.db_url = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    os.environ["DATABASE_URL"] = args.db_url   # harus di-set sebelum app.database di-import
+
+    from .models import Base
+    from .database import engine
+    from .routers.admin import admin_analytics
+
+    Base.metadata.create_all(bind=engine)
+    t0 = time.perf_counter()
+    seed(args.users, args.sessions)
+    print(f"Seeded {args.users} users x {args.sessions} sessions in {time.perf_counter() - t0:.1f}s ({args.db_url})")
+
+    admin = {"sub": "0", "role": "admin"}
+    print(f"\n{'view':<8} {'implementation':<12} {'queries':>8} {'median ms':>10} {'min ms':>8}")
+    for view in ("session", "daily"):
+        before = measure(lambda db: legacy_analytics(db, view), args.repeat)
+        after  = measure(lambda db: admin_analytics(view=view, current_user=admin, db=db), args.repeat)
+        for name, r in (("before", before), ("after", after)):
+            print(f"{view:<8} {name:<12} {r['queries']:>8} {r['median_ms']:>10} {r['min_ms']:>8}")
+        print(f"{'':<8} {'speedup':<12} {'':>8} {before['median_ms'] / max(after['median_ms'], 0.001):>9.1f}x")
+
+    if tmpdir:
+        import shutil
+        engine.dispose()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+# backend/app/async_db_benchmark.py
+"""
+Load test endpoint hot-path dengan DB_ASYNC=0 (Session sync di thread pool) vs DB_ASYNC=1
+(AsyncSession di atas aiosqlite/asyncpg). Tiap mode menjalankan server uvicorn sendiri
+dengan database sementara; klien httpx async mensimulasikan N user bersamaan dengan campuran:
+
+  GET  /agent/next        GET  /profile        GET  /sessions/recent
+  POST /sessions          POST /auth/refresh   POST /auth/login
+
+Dilaporkan: requests/detik, latensi p50/p99 keseluruhan dan per endpoint, jumlah error.
+Server dijalankan lewat `--serve` (limiter slowapi dimatikan di proses benchmark saja) agar login
+tidak menghasilkan 429 — aplikasi sendiri tidak punya saklar untuk mematikan rate limit.
+
+CARA PAKAI (dari folder backend/):
+  python -m app.async_db_benchmark --users 100 --seconds 20
+  DATABASE_URL=postgresql://... python -m app.async_db_benchmark   # pakai DB sendiri (tidak dihapus)
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+_MODES = {"sync": "0", "async": "1"}
+_MIX   = [   # (endpoint, bobot)
+    ("agent_next", 25), ("profile", 25), ("recent", 20), ("save_session", 20), ("refresh", 7), ("login", 3),
+]
+_PASSWORD = "Bench12345!"
+
+
+def _pct(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))], 1)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_ready(client: httpx.AsyncClient, proc: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with code {proc.returncode}")
+        try:
+            if (await client.get("/api/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("server not ready")
+
+
+async def _setup_users(client: httpx.AsyncClient, n: int, run_id: str) -> list[dict]:
+    async def one(i: int) -> dict:
+        username = f"bench_{run_id}_{i}"
+        await client.post("/api/auth/register", json={
+            "username": username, "email": f"{username}@example.com", "password": _PASSWORD,
+        })
+        tok = (await client.post("/api/auth/login", json={"username": username, "password": _PASSWORD})).json()
+        return {"username": username, "access": tok["access_token"], "refresh": tok["refresh_token"]}
+
+    users = []
+    for start in range(0, n, 20):   # bcrypt register/login — batch kecil agar setup tidak time out
+        users += await asyncio.gather(*[one(i) for i in range(start, min(n, start + 20))])
+    return users
+
+
+async def _request(client: httpx.AsyncClient, user: dict, kind: str, rnd: random.Random) -> httpx.Response:
+    auth = {"Authorization": f"Bearer {user['access']}"}
+    if kind == "agent_next":
+        return await client.get("/api/agent/next", headers=auth)
+    if kind == "profile":
+        return await client.get("/api/profile", headers=auth)
+    if kind == "recent":
+        return await client.get("/api/sessions/recent", headers=auth)
+    if kind == "save_session":
+        # Tanpa messages → tidak memicu job reflect/plan (LLM) — yang diukur jalur DB-nya
+        return await client.post("/api/sessions", headers=auth, json={
+            "scenario": "Job Interview", "score_range": rnd.uniform(1, 5), "score_accuracy": rnd.uniform(1, 5),
+            "score_fluency": rnd.uniform(1, 5), "score_coherence": rnd.uniform(1, 5),
+            "score_interaction": rnd.uniform(1, 5), "duration_min": rnd.uniform(2, 10),
+        })
+    if kind == "refresh":
+        r = await client.post("/api/auth/refresh", json={"refresh_token": user["refresh"]})
+        if r.status_code == 200:
+            user["access"], user["refresh"] = r.json()["access_token"], r.json()["refresh_token"]
+        return r
+    return await client.post("/api/auth/login", json={"username": user["username"], "password": _PASSWORD})
+
+
+async def _load(base_url: str, proc: subprocess.Popen, args, mode: str) -> dict:
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0, limits=limits) as client:
+        await _wait_ready(client, proc)
+        users = await _setup_users(client, args.users, f"{mode}{int(time.time())}")
+
+        kinds, weights = zip(*_MIX)
+        latencies: dict[str, list] = {k: [] for k in kinds}
+        errors   = {"http": 0, "transport": 0}
+        deadline = time.perf_counter() + args.seconds
+
+        async def virtual_user(uid: int):
+            rnd, user = random.Random(uid), users[uid]
+            while time.perf_counter() < deadline:
+                kind = rnd.choices(kinds, weights)[0]
+                t0   = time.perf_counter()
+                try:
+                    r = await _request(client, user, kind, rnd)
+                except httpx.TransportError:
+                    errors["transport"] += 1
+                    continue
+                if r.status_code >= 400:
+                    errors["http"] += 1
+                    continue
+                latencies[kind].append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*[virtual_user(i) for i in range(args.users)])
+        elapsed = time.perf_counter() - t0
+
+    all_ms = [ms for values in latencies.values() for ms in values]
+    return {
+        "mode":          mode,
+        "requests_ok":   len(all_ms),
+        "rps":           round(len(all_ms) / elapsed, 1),
+        "p50_ms":        _pct(all_ms, 0.50),
+        "p99_ms":        _pct(all_ms, 0.99),
+        "http_errors":   errors["http"],
+        "transport_err": errors["transport"],
+        **{f"{k}_p99_ms": _pct(v, 0.99) for k, v in latencies.items()},
+    }
+
+
+def run_mode(mode: str, args) -> dict:
+    port = _free_port()
+    with tempfile.TemporaryDirectory(prefix="async_bench_") as tmpdir:
+        env = {
+            **os.environ,
+            "DB_ASYNC":           _MODES[mode],
+            "TTS_PREWARM":        "0",
+            "DATABASE_URL":       os.environ.get("DATABASE_URL") or f"sqlite:///{os.path.join(tmpdir, 'bench.db')}",
+        }
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "app.async_db_benchmark", "--serve", str(port)],
+            env=env, stdout=subprocess.DEVNULL,
+        )
+        try:
+            return asyncio.run(_load(f"http://127.0.0.1:{port}", proc, args, mode))
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+def _serve(port: int) -> None:
+    """Server untuk satu mode benchmark: app yang sama, limiter dimatikan hanya di proses ini."""
+    import uvicorn
+    from .limiter import limiter
+    from .main import app
+
+    limiter.enabled = False
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--users",   type=int,   default=100, help="user virtual bersamaan")
+    ap.add_argument("--seconds", type=float, default=20.0, help="durasi beban per mode")
+    ap.add_argument("--modes",   nargs="+",  choices=sorted(_MODES), default=list(_MODES))
+    ap.add_argument("--serve",   type=int,   help=argparse.SUPPRESS)   # internal: proses server
+    args = ap.parse_args()
+    if args.serve:
+        _serve(args.serve)
+        return
+
+    results = [run_mode(mode, args) for mode in args.modes]
+
+    print(f"\n{args.users} virtual users x {args.seconds:g}s per mode\n")
+    print(f"{'':<20}" + "".join(f"{r['mode']:>12}" for r in results))
+    for k in [k for k in results[0] if k != "mode"]:
+        print(f"{k:<20}" + "".join(f"{r[k]:>12}" for r in results))
+
+
+if __name__ == "__main__":
+    main()
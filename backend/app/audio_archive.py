@@ -0,0 +1,377 @@
+import asyncio
+import io
+import json
+import os
+import shutil
+import subprocess
+import threading
+import wave
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import select as sa_select, func
+
+from .config import (
+    AUDIO_ARCHIVE_AFTER_DAYS, AUDIO_ARCHIVE_FORMAT, AUDIO_ARCHIVE_OPUS_KBPS, AUDIO_ARCHIVE_INTERVAL_H,
+)
+from .database import SessionLocal
+from .models import AudioArchiveORM, SessionRecordORM
+from .session_turns import referenced_audio
+from .audio_serving import etag_for
+
+# Tier arsip untuk uploads/audio. Compactor (periodik, atau manual lewat admin/CLI):
+#   1. klip turn user yang sudah ada di file sesi gabungan (audio_segments_json) → dihapus,
+#      dicatat sebagai "segment" (file sumber + posisi frame)
+#   2. file .wav/.mp3 yang lebih tua dari AUDIO_ARCHIVE_AFTER_DAYS → di-transcode ke
+#      archive/<nama>.<flac|opus> lewat ffmpeg, dicatat sebagai "transcoded"
+# Nama file asli tidak berubah: handler /uploads/audio/<nama> mencari file mentah dulu,
+# lalu tabel audio_archive — jadi audio_path / klip turn (session_turns) lama tetap bisa diputar.
+#
+# CARA PAKAI (dari folder backend/):
+#   python -m app.audio_archive          # dry-run: laporan byte yang bisa dihemat
+#   python -m app.audio_archive --run    # jalankan compactor sekarang
+
+_AUDIO_DIR   = Path(__file__).parent.parent / "uploads" / "audio"
+_ARCHIVE_DIR = _AUDIO_DIR / "archive"
+_FFMPEG      = shutil.which("ffmpeg")
+_CODECS      = {   # format → (ekstensi, media type, argumen encoder ffmpeg)
+    "flac": (".flac", "audio/flac", ["-c:a", "flac", "-compression_level", "8", "-f", "flac"]),
+    "opus": (".opus", "audio/ogg",  ["-c:a", "libopus", "-b:a", f"{AUDIO_ARCHIVE_OPUS_KBPS}k",
+                                     "-application", "voip", "-f", "ogg"]),
+}
+_FLAC_RATIO       = 0.55   # perkiraan ukuran FLAC / PCM untuk rekaman suara (hanya untuk dry-run)
+_TTS_MP3_KBPS     = 48     # bitrate mp3 edge-tts — perkiraan durasi mp3 untuk dry-run opus
+_SEGMENT_CACHE_MB = 64     # segment WAV yang sudah dipotong/didecode, disimpan di memori (LRU)
+MEDIA_TYPES       = {".wav": "audio/wav", ".mp3": "audio/mpeg", ".flac": "audio/flac", ".opus": "audio/ogg"}
+
+_compact_lock = threading.Lock()   # loop periodik vs POST /admin/audio/archive/compact
+
+
+def safe_name(name: str) -> bool:
+    return bool(name) and Path(name).name == name and not name.startswith(".")
+
+
+def _estimate_after(path: Path, size: int) -> int | None:
+    """Perkiraan ukuran hasil transcode; None = tidak akan lebih kecil (dilewati)."""
+    if path.suffix == ".mp3":
+        if AUDIO_ARCHIVE_FORMAT != "opus" or AUDIO_ARCHIVE_OPUS_KBPS >= _TTS_MP3_KBPS:
+            return None   # mp3 → flac selalu lebih besar
+        return int(size * AUDIO_ARCHIVE_OPUS_KBPS / _TTS_MP3_KBPS)
+    try:
+        with wave.open(str(path), "rb") as wf:
+            seconds = wf.getnframes() / wf.getframerate()
+    except (wave.Error, EOFError):
+        seconds = None   # bukan PCM WAV (mis. webm bernama .wav) — ffmpeg tetap bisa decode
+    if AUDIO_ARCHIVE_FORMAT == "opus":
+        return int(seconds * AUDIO_ARCHIVE_OPUS_KBPS * 125) + 4096 if seconds is not None else size // 4
+    return int(size * _FLAC_RATIO)
+
+
+def _plan(db, now: datetime) -> tuple[list, list]:
+    """(klip turn yang bisa dihapus, file yang bisa di-transcode) — belum mengubah apa pun."""
+    cutoff   = now - timedelta(days=AUDIO_ARCHIVE_AFTER_DAYS)
+    archived = set(db.execute(sa_select(AudioArchiveORM.name)).scalars().all())
+    # Klip sesi yang masih dirakit session_audio jangan disentuh
+    busy = set()
+    for parts in db.execute(
+        sa_select(SessionRecordORM.audio_parts_json).where(SessionRecordORM.audio_status == "pending")
+    ).scalars():
+        busy.update(json.loads(parts or "[]"))
+
+    drops, seen = [], set()
+    for source, segments in db.execute(
+        sa_select(SessionRecordORM.audio_path, SessionRecordORM.audio_segments_json).where(
+            SessionRecordORM.audio_status == "ready",
+            SessionRecordORM.audio_segments_json.isnot(None),
+            SessionRecordORM.created_at < cutoff,
+        )
+    ).all():
+        # Klip hanya dihapus selama file sumbernya masih WAV mentah (rate dicatat untuk slicing nanti)
+        try:
+            with wave.open(str(_AUDIO_DIR / source), "rb") as wf:
+                rate = wf.getframerate()
+        except (OSError, wave.Error, EOFError):
+            continue
+        for name, start, frames in json.loads(segments):
+            path = _AUDIO_DIR / name
+            # tts_* dipakai bersama banyak sesi (cache content-addressed) → tidak dihapus di sini
+            if name.startswith("tts_") or name == source or name in archived or name in seen or not path.is_file():
+                continue
+            # Satu baris arsip per nama (unik): klip berulang / dipakai dua sesi → sumber pertama
+            seen.add(name)
+            drops.append((name, source, start, frames, rate, path.stat().st_size))
+    dropped = seen
+
+    files = []
+    for path in sorted(_AUDIO_DIR.glob("*")):
+        if path.suffix not in (".wav", ".mp3") or not path.is_file():
+            continue
+        name = path.name
+        if name in dropped or name in busy or name in archived:
+            continue
+        st = path.stat()
+        if datetime.utcfromtimestamp(st.st_mtime) >= cutoff:
+            continue
+        files.append((path, st.st_size))
+    # File tts_* yang tidak dipakai sesi mana pun = cache panas (dievict LRU oleh tts_cache)
+    tts = [p.name for p, _ in files if p.name.startswith("tts_")]
+    used = set()
+    for i in range(0, len(tts), 50):
+        used |= referenced_audio(tts[i:i + 50])
+    files = [(p, size) for p, size in files if not p.name.startswith("tts_") or p.name in used]
+    return drops, files
+
+
+def _transcode(path: Path) -> tuple[str, int] | None:
+    """ffmpeg → archive/<nama><ext>. Return (nama arsip, ukuran) atau None kalau tidak lebih kecil."""
+    ext, _, args = _CODECS[AUDIO_ARCHIVE_FORMAT]
+    _ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    stored = f"{path.name}{ext}"
+    tmp    = _ARCHIVE_DIR / f"{stored}.part"
+    try:
+        subprocess.run([_FFMPEG, "-nostdin", "-v", "error", "-y", "-i", str(path), "-vn", *args, str(tmp)],
+                       capture_output=True, timeout=300, check=True)
+        size = tmp.stat().st_size
+        if size >= path.stat().st_size:
+            return None
+        os.replace(tmp, _ARCHIVE_DIR / stored)
+        return stored, size
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def compact(dry_run: bool = True, now: datetime | None = None, wait: bool = True) -> dict | None:
+    """Satu putaran compactor. dry_run=True hanya melaporkan byte yang bisa dihemat.
+    Putaran nyata dijalankan satu per satu per proses; wait=False → None kalau sedang ada yang jalan."""
+    if dry_run:
+        return _compact(True, now)
+    if not _compact_lock.acquire(blocking=wait):
+        return None
+    try:
+        # Rencana dibuat di dalam lock — putaran sebelumnya bisa sudah menghapus / mengarsip file
+        return _compact(False, now)
+    finally:
+        _compact_lock.release()
+
+
+def _compact(dry_run: bool, now: datetime | None) -> dict:
+    now = now or datetime.utcnow()
+    with SessionLocal() as db:
+        drops, files = _plan(db, now)
+    can_transcode = _FFMPEG is not None and AUDIO_ARCHIVE_FORMAT in _CODECS
+    report = {
+        "dry_run":    dry_run,
+        "after_days": AUDIO_ARCHIVE_AFTER_DAYS,
+        "format":     AUDIO_ARCHIVE_FORMAT,
+        "ffmpeg":     _FFMPEG is not None,
+        "drop_turn_clips": {"files": len(drops), "bytes": sum(d[5] for d in drops)},
+        "transcode":  {"files": 0, "bytes_before": 0, "bytes_after": 0, "skipped_no_gain": 0,
+                       "failed": 0, "unavailable": not can_transcode},
+    }
+    tc = report["transcode"]
+
+    if dry_run:
+        for path, size in files if can_transcode else []:
+            after = _estimate_after(path, size)
+            if after is None or after >= size:
+                tc["skipped_no_gain"] += 1
+                continue
+            tc["files"] += 1; tc["bytes_before"] += size; tc["bytes_after"] += after
+        tc["estimated"] = True
+        report["reclaimable_bytes"] = report["drop_turn_clips"]["bytes"] + tc["bytes_before"] - tc["bytes_after"]
+        return report
+
+    with SessionLocal() as db:
+        # Satu commit per file: crash di tengah jalan tidak meninggalkan referensi yang hilang
+        for name, source, start, frames, rate, size in drops:
+            db.add(AudioArchiveORM(name=name, kind="segment", stored=source, media_type="audio/wav",
+                                   start_frame=start, frames=frames, sample_rate=rate,
+                                   bytes_before=size, bytes_after=0))
+            db.commit()
+            (_AUDIO_DIR / name).unlink(missing_ok=True)
+        for path, size in files if can_transcode else []:
+            try:
+                result = _transcode(path)
+            except (subprocess.SubprocessError, OSError) as e:
+                print(f"[ARCHIVE] transcode {path.name} failed: {e}", flush=True)
+                tc["failed"] += 1
+                continue
+            if result is None:
+                tc["skipped_no_gain"] += 1
+                continue
+            stored, after = result
+            db.add(AudioArchiveORM(name=path.name, kind="transcoded", stored=stored,
+                                   media_type=_CODECS[AUDIO_ARCHIVE_FORMAT][1],
+                                   bytes_before=size, bytes_after=after))
+            db.commit()
+            path.unlink(missing_ok=True)
+            tc["files"] += 1; tc["bytes_before"] += size; tc["bytes_after"] += after
+    report["reclaimed_bytes"] = report["drop_turn_clips"]["bytes"] + tc["bytes_before"] - tc["bytes_after"]
+    print(f"[ARCHIVE] dropped {len(drops)} turn clip(s), transcoded {tc['files']} file(s), "
+          f"reclaimed {report['reclaimed_bytes'] / 1e6:.1f} MB", flush=True)
+    return report
+
+
+def totals(db) -> dict:
+    files, before, after = db.execute(
+        sa_select(func.count(AudioArchiveORM.id),
+                  func.coalesce(func.sum(AudioArchiveORM.bytes_before), 0),
+                  func.coalesce(func.sum(AudioArchiveORM.bytes_after), 0))
+    ).one()
+    return {"files": files, "bytes_before": int(before), "bytes_after": int(after)}
+
+
+# ===== Serving =====
+
+def _wav_bytes(params: tuple[int, int, int], frames: bytes) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(params[0]); wf.setsampwidth(params[1]); wf.setframerate(params[2])
+        wf.writeframes(frames)
+    return buf.getvalue()
+
+
+class _SegmentCache:
+    """LRU (dibatasi total byte) WAV segment yang sudah dipotong/didecode, kunci (nama, path sumber, mtime).
+    Scrubbing rater = banyak request Range untuk klip yang sama → ffmpeg + hash ETag cukup sekali."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._data: OrderedDict[tuple, bytes] = OrderedDict()
+        self._etags: dict[int, str] = {}   # id(bytes) → ETag, selama objeknya masih di cache
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> bytes | None:
+        with self._lock:
+            data = self._data.get(key)
+            if data is not None:
+                self._data.move_to_end(key)
+            return data
+
+    def put(self, key: tuple, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        etag = etag_for(data)
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = data
+            self._etags[id(data)] = etag
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._data)))
+
+    def _drop(self, key: tuple) -> None:
+        data = self._data.pop(key)
+        self._etags.pop(id(data), None)
+        self._bytes -= len(data)
+
+    def etag(self, data: bytes) -> str | None:
+        with self._lock:
+            return self._etags.get(id(data))
+
+
+_segments = _SegmentCache(_SEGMENT_CACHE_MB * 1024 * 1024)
+
+
+def _segment(name: str, source: str, start: int, frames: int, rate: int | None, depth: int = 0) -> bytes | None:
+    """Potongan [start, start+frames) dari file sesi gabungan sebagai WAV (di-cache per mtime sumber)."""
+    found = resolve(source, depth + 1)
+    if found is None:
+        return None
+    data, _ = found
+    if isinstance(data, bytes):
+        return None   # sumber sendiri segment — tidak terjadi (file sesi tidak pernah dihapus jadi segment)
+    try:
+        key = (name, str(data), data.stat().st_mtime_ns)
+    except OSError:
+        return None
+    cached = _segments.get(key)
+    if cached is None:
+        cached = _cut_segment(data, start, frames, rate)
+        if cached is not None:
+            _segments.put(key, cached)
+    return cached
+
+
+def _cut_segment(data: Path, start: int, frames: int, rate: int | None) -> bytes | None:
+    if data.parent == _AUDIO_DIR:
+        with wave.open(str(data), "rb") as wf:
+            wf.setpos(min(start, wf.getnframes()))
+            return _wav_bytes((wf.getnchannels(), wf.getsampwidth(), wf.getframerate()), wf.readframes(frames))
+    if _FFMPEG is None:
+        return None
+    # File sesi sudah di-transcode: decode potongannya saja (akurat per sampel)
+    out = subprocess.run(
+        [_FFMPEG, "-nostdin", "-v", "error", "-i", str(data),
+         # opus selalu didecode di 48 kHz → kembalikan ke rate sumber sebelum trim per sampel
+         "-af", (f"aresample={rate}," if rate else "") + f"atrim=start_sample={start}:end_sample={start + frames}",
+         "-map_metadata", "-1", "-bitexact", "-f", "wav", "-"],
+        capture_output=True, timeout=60, check=True,
+    ).stdout
+    # Header WAV dari pipe berisi ukuran placeholder (ffmpeg tidak bisa seek) → tulis ulang
+    with wave.open(io.BytesIO(out), "rb") as wf:
+        return _wav_bytes((wf.getnchannels(), wf.getsampwidth(), wf.getframerate()), wf.readframes(frames))
+
+
+def segment_etag(data: bytes) -> str:
+    """ETag untuk isi segment dari resolve() — tanpa hash ulang selama segment masih di cache."""
+    return _segments.etag(data) or etag_for(data)
+
+
+def resolve(name: str, depth: int = 0) -> tuple[Path | bytes, str] | None:
+    """Nama file uploads/audio → (path file di disk | isi WAV segment, media type); None = tidak ada."""
+    if not safe_name(name) or depth > 2:
+        return None
+    path = _AUDIO_DIR / name
+    if path.is_file():
+        return path, MEDIA_TYPES.get(path.suffix, "application/octet-stream")
+    with SessionLocal() as db:
+        row = db.execute(sa_select(AudioArchiveORM).where(AudioArchiveORM.name == name)).scalar_one_or_none()
+    if row is None:
+        return None
+    if row.kind == "transcoded":
+        stored = _ARCHIVE_DIR / row.stored
+        return (stored, row.media_type) if stored.is_file() else None
+    data = _segment(name, row.stored, row.start_frame or 0, row.frames or 0, row.sample_rate, depth)
+    return (data, row.media_type) if data is not None else None
+
+
+class AudioArchiver:
+    """Compactor periodik di proses API (file I/O + ffmpeg di thread)."""
+
+    def __init__(self, after_days: int, interval_h: float):
+        self.after_days = after_days
+        self.interval_s = max(60.0, interval_h * 3600)
+        self._task: asyncio.Task | None = None
+        self.last_report: dict | None = None
+
+    async def startup(self) -> None:
+        if self.after_days > 0:
+            self._task = asyncio.create_task(self._loop())
+
+    async def shutdown(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self) -> None:
+        await asyncio.sleep(60)   # jangan bersaing dengan startup (pre-warm TTS, resume job)
+        while True:
+            try:
+                # Compactor manual (admin) sedang jalan → putaran ini dilewati
+                self.last_report = await asyncio.to_thread(compact, False, None, False) or self.last_report
+            except Exception as e:
+                print(f"[ARCHIVE] compaction failed: {e}", flush=True)
+            await asyncio.sleep(self.interval_s)
+
+
+archiver = AudioArchiver(AUDIO_ARCHIVE_AFTER_DAYS, AUDIO_ARCHIVE_INTERVAL_H)
+
+
+if __name__ == "__main__":
+    import sys
+    print(json.dumps(compact(dry_run="--run" not in sys.argv[1:]), indent=2))
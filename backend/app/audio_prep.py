@@ -0,0 +1,151 @@
+import io
+import shutil
+import subprocess
+import time
+import wave
+from pathlib import Path
+
+try:
+    import numpy as np
+except Exception:  # numpy opsional — tanpa numpy audio dikirim apa adanya
+    np = None
+
+from .config import WHISPER_UPLOAD_FORMAT
+
+# Pra-proses audio sebelum dikirim ke Whisper: decode → mono → 16 kHz → trim hening
+# di awal/akhir (energi per frame) → WAV 16-bit (atau FLAC lewat ffmpeg).
+# File asli tetap disimpan untuk rater; yang dikirim ke Groq versi ramping.
+TARGET_RATE = 16000
+_FRAME_MS   = 30
+_PAD_MS     = 250     # sisakan sedikit hening agar awal/akhir kata tidak terpotong
+_FFMPEG     = shutil.which("ffmpeg")
+
+
+def pcm_to_float(frames: bytes, width: int) -> "np.ndarray":
+    """PCM little-endian (lebar 1–4 byte) → float32 [-1, 1), masih interleaved per channel."""
+    if width == 1:
+        pcm = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        pcm = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        b = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        v = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        pcm = (np.where(v >= 1 << 23, v - (1 << 24), v)).astype(np.float32) / float(1 << 23)
+    elif width == 4:
+        pcm = np.frombuffer(frames, dtype="<i4").astype(np.float32) / float(1 << 31)
+    else:
+        raise ValueError(f"unsupported sample width {width}")
+    return pcm
+
+
+def _decode_wav(raw: bytes) -> tuple["np.ndarray", int]:
+    with wave.open(io.BytesIO(raw), "rb") as wf:
+        channels, width, rate = wf.getnchannels(), wf.getsampwidth(), wf.getframerate()
+        frames = wf.readframes(wf.getnframes())
+    pcm = pcm_to_float(frames, width)
+    if channels > 1:
+        pcm = pcm[: len(pcm) - len(pcm) % channels].reshape(-1, channels).mean(axis=1)
+    return pcm, rate
+
+
+def _decode_ffmpeg(path: Path) -> tuple["np.ndarray", int]:
+    out = subprocess.run(
+        [_FFMPEG, "-nostdin", "-v", "error", "-i", str(path),
+         "-ac", "1", "-ar", str(TARGET_RATE), "-f", "s16le", "-"],
+        capture_output=True, timeout=60, check=True,
+    ).stdout
+    return np.frombuffer(out, dtype="<i2").astype(np.float32) / 32768.0, TARGET_RATE
+
+
+def _resample(pcm: "np.ndarray", rate: int) -> "np.ndarray":
+    """Low-pass (windowed-sinc FIR) lalu interpolasi linear ke 16 kHz."""
+    if rate == TARGET_RATE or len(pcm) == 0:
+        return pcm
+    if rate > TARGET_RATE:
+        cutoff = 0.5 * TARGET_RATE / rate          # relatif terhadap sample rate asal
+        taps = np.arange(-32, 33, dtype=np.float32)
+        h = 2 * cutoff * np.sinc(2 * cutoff * taps) * np.hamming(len(taps)).astype(np.float32)
+        pcm = np.convolve(pcm, h / h.sum(), mode="same").astype(np.float32)
+    n_out = int(round(len(pcm) * TARGET_RATE / rate))
+    x_out = np.arange(n_out, dtype=np.float64) * (rate / TARGET_RATE)
+    return np.interp(x_out, np.arange(len(pcm)), pcm).astype(np.float32)
+
+
+def _trim_silence(pcm: "np.ndarray", rate: int) -> "np.ndarray":
+    """Potong hening awal/akhir berdasarkan energi RMS per frame (dB, ambang adaptif)."""
+    frame = int(rate * _FRAME_MS / 1000)
+    n = len(pcm) // frame
+    if n < 3:
+        return pcm
+    frames = pcm[: n * frame].reshape(n, frame)
+    db = 20 * np.log10(np.sqrt((frames ** 2).mean(axis=1)) + 1e-9)
+    floor, peak = np.percentile(db, 10), db.max()
+    threshold = max(floor + 12.0, peak - 45.0, -60.0)
+    voiced = np.flatnonzero(db > threshold)
+    if len(voiced) == 0:
+        return pcm
+    pad = int(_PAD_MS / _FRAME_MS)
+    start = max(0, voiced[0] - pad) * frame
+    end = min(n, voiced[-1] + 1 + pad) * frame
+    return pcm[start:end]
+
+
+def _encode(pcm: "np.ndarray") -> tuple[bytes, str, str]:
+    data = (np.clip(pcm, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+    if WHISPER_UPLOAD_FORMAT == "flac" and _FFMPEG:
+        flac = subprocess.run(
+            [_FFMPEG, "-nostdin", "-v", "error", "-f", "s16le", "-ar", str(TARGET_RATE), "-ac", "1",
+             "-i", "-", "-f", "flac", "-"],
+            input=data, capture_output=True, timeout=60, check=True,
+        ).stdout
+        return flac, "flac", "audio/flac"
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(TARGET_RATE)
+        wf.writeframes(data)
+    return buf.getvalue(), "wav", "audio/wav"
+
+
+def prepare_for_whisper(path: Path) -> dict | None:
+    """
+    Buat versi ramping dari `path` di samping file aslinya (<nama>.lean.<ext>).
+    Return info {path, content_type, original_bytes, sent_bytes, ...} atau None
+    kalau tidak bisa diproses (numpy/ffmpeg tidak ada, format tidak dikenal) — kirim file asli.
+    """
+    if np is None:
+        return None
+    t0 = time.perf_counter()
+    original_bytes = path.stat().st_size
+    try:
+        try:
+            pcm, rate = _decode_wav(path.read_bytes())
+        except (wave.Error, EOFError, ValueError):
+            if not _FFMPEG:
+                return None
+            pcm, rate = _decode_ffmpeg(path)
+        original_s = len(pcm) / rate if rate else 0.0
+        pcm = _trim_silence(_resample(pcm, rate), TARGET_RATE)
+        if len(pcm) == 0:
+            return None
+        payload, ext, content_type = _encode(pcm)
+    except Exception as e:
+        print(f"[AUDIO] Preprocess skipped: {e}", flush=True)
+        return None
+    if len(payload) >= original_bytes:
+        return None
+    lean_path = path.with_name(f"{path.stem}.lean.{ext}")
+    lean_path.write_bytes(payload)
+    sent_s = len(pcm) / TARGET_RATE
+    return {
+        "path":              lean_path,
+        "content_type":      content_type,
+        "original_bytes":    original_bytes,
+        "sent_bytes":        len(payload),
+        "bytes_saved":       original_bytes - len(payload),
+        "original_duration_s": round(original_s, 2),
+        "sent_duration_s":   round(sent_s, 2),
+        "trimmed_s":         round(max(0.0, original_s - sent_s), 2),
+        "preprocess_ms":     round((time.perf_counter() - t0) * 1000, 1),
+    }
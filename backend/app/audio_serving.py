@@ -0,0 +1,137 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from sqlalchemy import select as sa_select, or_
+
+from .models import SessionRecordORM, SessionTurnORM
+
+# Pendukung routers/uploads.py: ETag dari hash isi, kebijakan Cache-Control, cek akses per role
+# dan meter byte yang dikirim (per role + per rater per sesi).
+
+CACHE_IMMUTABLE = "private, max-age=31536000, immutable"
+# Nama uuid tidak pernah ditimpa, tapi representasinya bisa berubah saat diarsip (wav → flac)
+# → cache sebentar lalu revalidasi dengan ETag (304)
+CACHE_DEFAULT   = "private, max-age=3600"
+
+_ACCESS_TTL_S = 60.0   # keputusan akses di-cache sebentar: scrubbing = banyak request Range per file
+_MAX_ENTRIES  = 4096
+
+
+def is_content_addressed(name: str) -> bool:
+    """tts_<hash>.* (tts_cache): isi untuk nama yang sama tidak pernah berubah."""
+    return name.startswith("tts_")
+
+
+class _LRU:
+    def __init__(self, max_entries: int = _MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+
+_etags  = _LRU()
+_grants = _LRU()
+
+
+def etag_for(data: Path | bytes) -> str:
+    """Strong ETag = sha256 isi yang dikirim. Hash file di-cache per (path, size, mtime)."""
+    if isinstance(data, bytes):
+        return f'"{hashlib.sha256(data).hexdigest()[:32]}"'
+    st  = data.stat()
+    key = (str(data), st.st_size, st.st_mtime_ns)
+    tag = _etags.get(key)
+    if tag is None:
+        with open(data, "rb") as f:
+            tag = f'"{hashlib.file_digest(f, "sha256").hexdigest()[:32]}"'
+        _etags.put(key, tag)
+    return tag
+
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    """If-None-Match: daftar ETag dipisah koma, `*`, atau bentuk lemah W/"..."."""
+    if not header:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+def access(db, user: dict, name: str) -> tuple[bool, int | None]:
+    """
+    (boleh, id sesi pemilik file). admin: semua file; rater: file dari sesi rater_visible;
+    user: file dari sesinya sendiri. tts_* (audio AI bersama) boleh untuk semua role login.
+    """
+    role, uid = user.get("role"), int(user.get("sub", 0))
+    key    = (uid, role, name)
+    cached = _grants.get(key)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1], cached[2]
+
+    def _owner(cond):
+        q = sa_select(SessionRecordORM.id).where(cond)
+        if role in ("rater1", "rater2"):
+            q = q.where(SessionRecordORM.rater_visible == True)
+        elif role != "admin":
+            q = q.where(SessionRecordORM.user_id == uid)
+        return db.execute(q.limit(1)).scalar()
+
+    # Lewat index dulu (file gabungan / session_turns); klip sesi lama tanpa conversation_turns
+    # hanya tercatat di audio_parts_json — nama di JSON list selalu dikutip, hindari cocok sebagian
+    session_id = _owner(or_(
+        SessionRecordORM.audio_path == name,
+        SessionRecordORM.id.in_(sa_select(SessionTurnORM.session_id).where(SessionTurnORM.audio_path == name)),
+    ))
+    if session_id is None:
+        session_id = _owner(SessionRecordORM.audio_parts_json.contains(f'"{name}"'))
+    allowed    = role == "admin" or session_id is not None or is_content_addressed(name)
+    _grants.put(key, (time.monotonic() + _ACCESS_TTL_S, allowed, session_id))
+    return allowed, session_id
+
+
+class AudioServeMeter:
+    """Byte audio yang dikirim per role & status, dan per (rater, sesi) — dampak cache/Range."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._roles: dict[str, dict] = {}
+        self._rater_sessions: dict[tuple[int, int], int] = {}
+
+    def record(self, user: dict, session_id: int | None, status: int, nbytes: int) -> None:
+        role = user.get("role", "user")
+        with self._lock:
+            s = self._roles.setdefault(role, {"requests": 0, "bytes": 0, "status": {}})
+            s["requests"] += 1
+            s["bytes"]    += nbytes
+            s["status"][str(status)] = s["status"].get(str(status), 0) + 1
+            if role in ("rater1", "rater2") and session_id is not None:
+                key = (int(user.get("sub", 0)), session_id)
+                self._rater_sessions[key] = self._rater_sessions.get(key, 0) + nbytes
+
+    def stats(self) -> dict:
+        with self._lock:
+            per_session = list(self._rater_sessions.values())
+            return {
+                "roles":                       {k: {**v, "status": dict(v["status"])} for k, v in self._roles.items()},
+                "rater_sessions":              len(per_session),
+                "avg_bytes_per_rater_session": round(sum(per_session) / len(per_session)) if per_session else 0,
+                "max_bytes_per_rater_session": max(per_session, default=0),
+            }
+
+
+meter = AudioServeMeter()
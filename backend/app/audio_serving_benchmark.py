@@ -0,0 +1,164 @@
+# backend/app/audio_serving_benchmark.py
+"""
+Byte audio yang dikirim per sesi rater: mount StaticFiles lama vs handler /uploads/audio baru.
+
+Satu "sesi rater" disimulasikan dengan klien mirip browser (cache HTTP sederhana):
+  1. buka sesi → putar semua turn (klip user + klip AI tts_*) dan file sesi gabungan
+  2. geser posisi (seek) di file gabungan --seeks kali sebelum selesai diunduh → Range bytes=x-
+  3. buka ulang sesi --replays kali (pindah sesi lalu kembali, reload halaman) → putar semua lagi
+
+Cache klien: entri dipakai tanpa request selama masih fresh (Cache-Control max-age/immutable);
+entri tanpa Cache-Control direvalidasi (If-None-Match → 304). Server yang mengabaikan Range
+mengirim ulang seluruh file untuk setiap seek.
+
+CARA PAKAI (dari folder backend/):
+  python -m app.audio_serving_benchmark --sessions 20 --turns 8 --seeks 4 --replays 3
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+import uuid
+import wave
+
+
+def _write_clip(path, seconds: float, rnd: random.Random) -> None:
+    import numpy as np
+    n = int(16000 * seconds)
+    x = (np.sin(np.arange(n) * rnd.uniform(0.02, 0.08)) * 6000 + np.random.default_rng(rnd.randint(0, 1 << 30))
+         .normal(0, 300, n)).astype("<i2")
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1); wf.setsampwidth(2); wf.setframerate(16000); wf.writeframes(x.tobytes())
+
+
+class _Browser:
+    """Cache HTTP minimal: {url: (etag, fresh_until)}; seek = Range dari offset sampai akhir."""
+
+    def __init__(self, client):
+        self.client = client
+        self.cache: dict[str, tuple[str | None, float]] = {}
+        self.bytes = 0
+        self.requests: dict[int, int] = {}
+
+    async def get(self, url: str, offset: int = 0) -> None:
+        entry = self.cache.get(url)
+        if entry and entry[1] > time.time():
+            return   # fresh di cache lokal — tanpa request
+        headers = {"If-None-Match": entry[0]} if entry and entry[0] and not offset else {}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+        r = await self.client.get(url, headers=headers)
+        self.bytes += len(r.content)
+        self.requests[r.status_code] = self.requests.get(r.status_code, 0) + 1
+        if r.status_code == 200 or (r.status_code == 206 and not offset):
+            cc = r.headers.get("cache-control", "")
+            max_age = next((int(p.split("=")[1]) for p in cc.replace(" ", "").split(",") if p.startswith("max-age=")), 0)
+            self.cache[url] = (r.headers.get("etag"), time.time() + max_age)
+
+
+async def _rater_session(client, url_for, session: dict, args, rnd: random.Random) -> _Browser:
+    browser = _Browser(client)
+    for visit in range(1 + args.replays):
+        for name in session["turns"]:
+            await browser.get(url_for(name))
+        if visit == 0:
+            for _ in range(args.seeks):
+                await browser.get(url_for(session["combined"]), offset=rnd.randrange(44, session["combined_size"]))
+        await browser.get(url_for(session["combined"]))
+    return browser
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sessions", type=int,   default=20)
+    ap.add_argument("--turns",    type=int,   default=8, help="turn per sesi (separuh user, separuh AI)")
+    ap.add_argument("--seeks",    type=int,   default=4)
+    ap.add_argument("--replays",  type=int,   default=3)
+    ap.add_argument("--seconds",  type=float, default=6.0, help="durasi per klip")
+    args = ap.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="audio_bench_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    os.environ["TTS_PREWARM"]  = "0"
+
+    import httpx
+    from starlette.applications import Starlette
+    from starlette.routing import Mount
+    from starlette.staticfiles import StaticFiles
+    from .main import app
+    from .auth import create_media_token
+    from .database import SessionLocal
+    from .models import SessionRecordORM, UserORM
+    from .session_audio import concat_wav
+    from .audio_archive import _AUDIO_DIR
+    from .audio_serving import meter
+    from . import session_turns, turn_manifest
+
+    rnd     = random.Random(11)
+    created = []
+    try:
+        with SessionLocal() as db:
+            rater = UserORM(username=f"bench_rater_{uuid.uuid4().hex[:6]}", email=f"r{uuid.uuid4().hex[:6]}@example.com",
+                            hashed_password="x", role="rater1")
+            db.add(rater); db.flush()
+            sessions = []
+            for _ in range(args.sessions):
+                turns = []
+                for t in range(args.turns):
+                    name = f"{'tts_bench' if t % 2 else 'bench'}_{uuid.uuid4().hex[:12]}.wav"
+                    _write_clip(_AUDIO_DIR / name, args.seconds, rnd)
+                    created.append(name); turns.append(name)
+                combined, _ = concat_wav(turns)
+                created.append(combined)
+                manifest = turn_manifest.build([{"role": "user", "path": n} for n in turns], None)
+                row = SessionRecordORM(
+                    user_id=rater.id, scenario="Bench", score_range=3, score_accuracy=3, score_fluency=3,
+                    score_coherence=3, score_interaction=3, score_overall=3, duration_min=1,
+                    audio_path=combined, audio_status="ready", rater_visible=True,
+                    turn_manifest_json=json.dumps(manifest), turn_count=manifest["turn_count"],
+                )
+                db.add(row); db.flush()
+                session_turns.write(db, row.id, manifest["turns"])
+                sessions.append({"turns": turns, "combined": combined,
+                                 "combined_size": (_AUDIO_DIR / combined).stat().st_size})
+            db.commit()
+            token, _ = create_media_token(rater.id)
+
+        static = Starlette(routes=[Mount("/uploads", StaticFiles(directory=str(_AUDIO_DIR.parent)))])
+        modes  = {
+            "static":  (static, lambda n: f"/uploads/audio/{n}"),
+            "handler": (app,    lambda n: f"/uploads/audio/{n}?token={token}"),
+        }
+
+        async def run(target, url_for) -> list[_Browser]:
+            transport = httpx.ASGITransport(app=target)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                return [await _rater_session(client, url_for, s, args, random.Random(i)) for i, s in enumerate(sessions)]
+
+        print(f"{args.sessions} rater sessions x {args.turns} turns ({args.seconds:g}s clips), "
+              f"{args.seeks} seeks, {args.replays} replays\n")
+        print(f"{'mode':<10}{'KB/session':>12}{'req/session':>13}  status")
+        for mode, (target, url_for) in modes.items():
+            browsers = asyncio.run(run(target, url_for))
+            status: dict[int, int] = {}
+            for b in browsers:
+                for k, v in b.requests.items():
+                    status[k] = status.get(k, 0) + v
+            kb  = sum(b.bytes for b in browsers) / len(browsers) / 1024
+            req = sum(status.values()) / len(browsers)
+            print(f"{mode:<10}{kb:>12.0f}{req:>13.1f}  {dict(sorted(status.items()))}")
+        print(f"\nserver meter (handler): {meter.stats()['avg_bytes_per_rater_session'] / 1024:.0f} KB avg per rater session")
+    finally:
+        for name in created:
+            if name:
+                (_AUDIO_DIR / name).unlink(missing_ok=True)
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
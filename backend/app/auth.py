@@ -1,13 +1,17 @@
 import secrets
+import threading
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
-from .config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXP, REFRESH_TOKEN_EXP
+from .config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXP, REFRESH_TOKEN_EXP, MEDIA_TOKEN_WINDOW_MIN
+from .database import SessionLocal
+from .models import UserORM
 
 # FIX: bcrypt__rounds=12 terlalu berat untuk dev; truncate_error=False agar tidak crash
 # pada passlib 1.7.4 + bcrypt 4.x
@@ -54,6 +58,19 @@ def create_refresh_token(user_id: int, username: str) -> str:
     )
 
 
+def create_media_token(user_id: int) -> tuple[str, int]:
+    """Token baca audio untuk query `?token=` (elemen <audio> tidak bisa kirim header Bearer).
+    Tanpa jti/iat acak: token identik selama satu jendela MEDIA_TOKEN_WINDOW_MIN, jadi URL audio
+    tidak berubah dan cache browser tetap terpakai. Berlaku sampai akhir jendela berikutnya.
+    Role tidak ikut di token — get_media_user membaca role & is_active terbaru dari DB."""
+    window = MEDIA_TOKEN_WINDOW_MIN * 60
+    start  = int(time.time()) // window * window
+    exp    = start + 2 * window
+    token  = jwt.encode({"sub": str(user_id), "type": "media", "iat": start, "exp": exp},
+                        SECRET_KEY, algorithm=ALGORITHM)
+    return token, exp
+
+
 def verify_token(token: str, expected_type: str = "access") -> dict:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -80,6 +97,60 @@ def get_current_user(
     return verify_token(credentials.credentials, expected_type="access")
 
 
+def get_media_user(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+) -> dict:
+    """Header Bearer (access token) atau query `?token=` (media token dari /auth/media-token)."""
+    if credentials:
+        return verify_token(credentials.credentials, expected_type="access")
+    token = request.query_params.get("token")
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token autentikasi diperlukan",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    payload = verify_token(token, expected_type="media")
+    user    = _media_user(int(payload.get("sub", 0)))
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Akun tidak aktif",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return {**payload, **user}
+
+
+# (user_id) → (berlaku sampai, {"role", "username"} | None kalau tidak aktif). Scrubbing audio = banyak
+# request per detik; status akun dibaca ulang dari DB paling lambat setelah _MEDIA_USER_TTL_S
+_MEDIA_USER_TTL_S = 30.0
+_media_users: dict[int, tuple[float, dict | None]] = {}
+_media_users_lock = threading.Lock()
+
+
+def _media_user(user_id: int) -> dict | None:
+    now = time.monotonic()
+    with _media_users_lock:
+        cached = _media_users.get(user_id)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    with SessionLocal() as db:
+        row = db.query(UserORM.role, UserORM.username, UserORM.is_active).filter(UserORM.id == user_id).first()
+    user = {"role": row.role, "username": row.username} if row is not None and row.is_active else None
+    with _media_users_lock:
+        if len(_media_users) > 4096:
+            _media_users.clear()
+        _media_users[user_id] = (now + _MEDIA_USER_TTL_S, user)
+    return user
+
+
+def forget_media_user(user_id: int) -> None:
+    """Role / status akun diubah admin → berlaku langsung untuk URL audio."""
+    with _media_users_lock:
+        _media_users.pop(user_id, None)
+
+
 def require_role(*roles: str):
     def _check(current_user: dict = Depends(get_current_user)):
         if current_user.get("role") not in roles:
@@ -0,0 +1,188 @@
+# backend/app/concurrency_benchmark.py
+"""
+Benchmark konkurensi SQLite: banyak thread menyimpan sesi (save_session — insert sesi,
+rollup harian, update profil, job agent) sementara thread lain terus membaca admin
+analytics. Dibandingkan dua profil, masing-masing di proses & database sementara sendiri:
+
+  baseline — engine lama: rollback journal, tanpa pragma, timeout sqlite3 default 5 s,
+             analytics lewat engine yang sama
+  tuned    — profil produksi: WAL, synchronous=NORMAL, busy_timeout, cache/mmap,
+             pool terkonfigurasi, analytics lewat engine baca read-only
+
+Dilaporkan: throughput tulis, latensi tulis p50/p95/max, jumlah error
+"database is locked", dan jumlah/latensi baca analytics selama beban tulis.
+
+CARA PAKAI (dari folder backend/):
+  python -m app.concurrency_benchmark --writers 16 --writes 40 --readers 4
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+_PROFILES = {
+    "baseline": {"SQLITE_PERF_PROFILE": "0", "SQLITE_BUSY_TIMEOUT_MS": "5000"},
+    "tuned":    {"SQLITE_PERF_PROFILE": "1"},
+}
+
+
+def _pct(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))], 1)
+
+
+def seed(n_users: int, n_sessions: int) -> list[int]:
+    from .database import SessionLocal
+    from .models import UserORM, ProfileORM, SessionRecordORM
+    from .rollups import rebuild as rebuild_rollups
+
+    rnd   = random.Random(7)
+    start = datetime.utcnow() - timedelta(days=60)
+    with SessionLocal() as db:
+        users = [UserORM(username=f"conc_{i}", email=f"conc_{i}@example.com", hashed_password="x", role="user")
+                 for i in range(n_users)]
+        db.add_all(users); db.flush()
+        db.add_all([ProfileORM(user_id=u.id) for u in users])
+        db.add_all([
+            SessionRecordORM(
+                user_id=u.id, scenario="Daily Conversation",
+                score_range=3, score_accuracy=3, score_fluency=3, score_coherence=3, score_interaction=3,
+                score_overall=3, duration_min=rnd.uniform(2, 10),
+                created_at=start + timedelta(hours=j * 30 + rnd.randint(0, 10)),
+            )
+            for u in users for j in range(n_sessions)
+        ])
+        db.commit()
+        rebuild_rollups(db)
+        return [u.id for u in users]
+
+
+def run_child(args) -> dict:
+    from sqlalchemy.exc import OperationalError
+    from .models import Base
+    from .database import engine, SessionLocal, ReadSessionLocal
+    from .schemas import SaveSessionIn
+    from .routers.sessions import _save_session
+    from . import turn_manifest
+    from .routers.admin import admin_analytics
+
+    Base.metadata.create_all(bind=engine)
+    user_ids = seed(args.users, args.sessions)
+    # Baseline: analytics lewat engine tulis yang sama (perilaku lama)
+    read_session = ReadSessionLocal if args.profile == "tuned" else SessionLocal
+
+    write_ms, read_ms = [], []
+    errors = {"locked": 0, "other": 0}
+    lock   = threading.Lock()
+    done   = threading.Event()
+    admin  = {"sub": "0", "role": "admin"}
+
+    def writer(wid: int):
+        rnd = random.Random(wid)
+        for _ in range(args.writes):
+            uid     = rnd.choice(user_ids)
+            payload = SaveSessionIn(
+                scenario="Job Interview", score_range=rnd.uniform(1, 5), score_accuracy=rnd.uniform(1, 5),
+                score_fluency=rnd.uniform(1, 5), score_coherence=rnd.uniform(1, 5),
+                score_interaction=rnd.uniform(1, 5), duration_min=rnd.uniform(2, 10),
+                messages=[{"role": "assistant", "content": "Hi"}, {"role": "user", "content": "Hello there"}],
+            )
+            t0 = time.perf_counter()
+            try:
+                with SessionLocal() as db:
+                    _save_session(db, payload, uid, turn_manifest.build(None, payload.messages))
+                ms = (time.perf_counter() - t0) * 1000
+                with lock:
+                    write_ms.append(ms)
+            except OperationalError as e:
+                with lock:
+                    errors["locked" if "locked" in str(e) else "other"] += 1
+
+    def reader(rid: int):
+        view = "daily" if rid % 2 else "session"
+        while not done.is_set():
+            t0 = time.perf_counter()
+            try:
+                with read_session() as db:
+                    admin_analytics(view=view, current_user=admin, db=db)
+                ms = (time.perf_counter() - t0) * 1000
+                with lock:
+                    read_ms.append(ms)
+            except OperationalError as e:
+                with lock:
+                    errors["locked" if "locked" in str(e) else "other"] += 1
+
+    readers = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    writers = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    t0 = time.perf_counter()
+    for t in readers + writers:
+        t.start()
+    for t in writers:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    done.set()
+    for t in readers:
+        t.join()
+
+    return {
+        "profile":       args.profile,
+        "writes_ok":     len(write_ms),
+        "writes_per_s":  round(len(write_ms) / elapsed, 1),
+        "write_p50_ms":  _pct(write_ms, 0.50),
+        "write_p95_ms":  _pct(write_ms, 0.95),
+        "write_max_ms":  round(max(write_ms), 1) if write_ms else 0.0,
+        "locked_errors": errors["locked"],
+        "other_errors":  errors["other"],
+        "reads_ok":      len(read_ms),
+        "read_p50_ms":   _pct(read_ms, 0.50),
+        "read_p95_ms":   _pct(read_ms, 0.95),
+        "elapsed_s":     round(elapsed, 2),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--writers",  type=int, default=16)
+    ap.add_argument("--writes",   type=int, default=40, help="save_session per writer thread")
+    ap.add_argument("--readers",  type=int, default=4)
+    ap.add_argument("--users",    type=int, default=200)
+    ap.add_argument("--sessions", type=int, default=20, help="sesi awal per user")
+    ap.add_argument("--profile",  choices=sorted(_PROFILES), default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.profile:
+        # Proses anak: env (DATABASE_URL + profil) sudah di-set oleh parent
+        print(json.dumps(run_child(args)))
+        return
+
+    results = []
+    for profile, env in _PROFILES.items():
+        with tempfile.TemporaryDirectory(prefix="conc_bench_") as tmpdir:
+            child_env = {**os.environ, **env, "DATABASE_URL": f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"}
+            out = subprocess.run(
+                [sys.executable, "-m", "app.concurrency_benchmark", *sys.argv[1:], "--profile", profile],
+                env=child_env, capture_output=True, text=True,
+            )
+            if out.returncode != 0:
+                print(out.stderr, file=sys.stderr)
+                sys.exit(out.returncode)
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"{args.writers} writers x {args.writes} save_session + {args.readers} analytics readers\n")
+    cols = [k for k in results[0] if k != "profile"]
+    print(f"{'':<14}" + "".join(f"{r['profile']:>12}" for r in results))
+    for k in cols:
+        print(f"{k:<14}" + "".join(f"{r[k]:>12}" for r in results))
+
+
+if __name__ == "__main__":
+    main()
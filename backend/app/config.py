@@ -1,4 +1,5 @@
 import os, json
+from pathlib import Path
 
 try:
     from dotenv import load_dotenv
@@ -16,6 +17,52 @@ _groq_pool_raw = [
 GROQ_API_KEYS: list[str] = [k for k in [GROQ_API_KEY] + _groq_pool_raw if k]
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY", "")
 GOOGLE_APPLICATION_CREDENTIALS = os.getenv("GOOGLE_APPLICATION_CREDENTIALS", "")
+
+# Piper TTS lokal — binary + model ONNX per voice; jumlah proses warm per voice
+PIPER_BIN               = Path(os.getenv("PIPER_BIN", str(Path.home() / "piper" / "piper")))
+PIPER_VOICES_DIR        = Path(os.getenv("PIPER_VOICES_DIR", str(Path.home() / "piper-voices")))
+PIPER_WORKERS_PER_VOICE = int(os.getenv("PIPER_WORKERS_PER_VOICE", "1"))
+
+# Pra-proses audio sebelum Whisper (trim hening + 16 kHz mono); format kirim: wav | flac (butuh ffmpeg)
+WHISPER_PREPROCESS    = os.getenv("WHISPER_PREPROCESS", "1").strip().lower() not in ("0", "false", "no")
+WHISPER_UPLOAD_FORMAT = os.getenv("WHISPER_UPLOAD_FORMAT", "wav").strip().lower()
+
+# Cache hasil Whisper per hash audio (tabel transcript_cache) — jumlah baris maksimum
+TRANSCRIPT_CACHE_MAX_ROWS = int(os.getenv("TRANSCRIPT_CACHE_MAX_ROWS", "5000"))
+# Interval sweep pembersihan tabel cache (app/maintenance.py) — di luar jalur request
+MAINTENANCE_INTERVAL_MIN  = float(os.getenv("MAINTENANCE_INTERVAL_MIN", "10"))
+
+# Cache audio TTS content-addressed (uploads/audio/tts_<hash>.*) + pre-warm opening agent saat startup
+TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", "512"))
+# File yang dipakai (X-Audio-Path) dalam N menit terakhir tidak dievict: sesi yang masih berjalan
+# belum tercatat di session_turns. Setidaknya sepanjang sesi terlama.
+TTS_CACHE_GRACE_MIN = int(os.getenv("TTS_CACHE_GRACE_MIN", "180"))
+TTS_PREWARM      = os.getenv("TTS_PREWARM", "1").strip().lower() not in ("0", "false", "no")
+
+# Perakitan audio sesi penuh di background (worker), opsional sertakan turn AI; klip dengan
+# format berbeda: resample (konversi ke format klip pertama) | reject (dilewati)
+SESSION_AUDIO_WORKERS     = int(os.getenv("SESSION_AUDIO_WORKERS", "1"))
+SESSION_AUDIO_INCLUDE_AI  = os.getenv("SESSION_AUDIO_INCLUDE_AI", "0").strip().lower() not in ("0", "false", "no")
+SESSION_AUDIO_ON_MISMATCH = os.getenv("SESSION_AUDIO_ON_MISMATCH", "resample").strip().lower()
+
+# Tier arsip audio: klip lebih tua dari N hari di-transcode (flac lossless | opus) ke uploads/audio/archive,
+# klip turn yang sudah ada di file sesi gabungan dihapus. 0 = compactor background mati.
+AUDIO_ARCHIVE_AFTER_DAYS  = int(os.getenv("AUDIO_ARCHIVE_AFTER_DAYS", "30"))
+AUDIO_ARCHIVE_FORMAT      = os.getenv("AUDIO_ARCHIVE_FORMAT", "flac").strip().lower()
+AUDIO_ARCHIVE_OPUS_KBPS   = int(os.getenv("AUDIO_ARCHIVE_OPUS_KBPS", "24"))
+AUDIO_ARCHIVE_INTERVAL_H  = float(os.getenv("AUDIO_ARCHIVE_INTERVAL_H", "6"))
+# Di belakang nginx: prefix location `internal` untuk X-Accel-Redirect (nginx yang sendfile + Range).
+# Kosong = file dikirim oleh app (zerocopysend bila server ASGI mendukung, selain itu per chunk)
+AUDIO_ACCEL_REDIRECT      = os.getenv("AUDIO_ACCEL_REDIRECT", "").strip()
+
+# Job background reflect+plan setelah sesi disimpan (tabel agent_jobs)
+AGENT_JOB_WORKERS      = int(os.getenv("AGENT_JOB_WORKERS", "2"))
+AGENT_JOB_MAX_ATTEMPTS = int(os.getenv("AGENT_JOB_MAX_ATTEMPTS", "4"))
+AGENT_JOB_BACKOFF_S    = float(os.getenv("AGENT_JOB_BACKOFF_S", "5"))
+
+# Bootstrap CI validasi AI vs rater (admin) — jumlah proses worker & resample default
+VALIDATION_BOOTSTRAP_WORKERS   = int(os.getenv("VALIDATION_BOOTSTRAP_WORKERS", str(min(4, os.cpu_count() or 1))))
+VALIDATION_BOOTSTRAP_RESAMPLES = int(os.getenv("VALIDATION_BOOTSTRAP_RESAMPLES", "2000"))
 _raw_origins = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000")
 if _raw_origins.strip().startswith("["):
     try:
@@ -31,7 +78,27 @@ SECRET_KEY        = os.getenv("SECRET_KEY", "GANTI_INI_DENGAN_SECRET_PANJANG_DAN
 ALGORITHM         = "HS256"
 ACCESS_TOKEN_EXP  = int(os.getenv("ACCESS_TOKEN_EXP_MINUTES", "30"))
 REFRESH_TOKEN_EXP = int(os.getenv("REFRESH_TOKEN_EXP_DAYS", "7"))
+# Token baca audio (<audio src=...?token=>) — sama dalam satu jendela agar URL & cache browser stabil.
+# Berlaku paling lama 2 jendela; URL ini ikut tercatat di log proxy → jendela pendek
+MEDIA_TOKEN_WINDOW_MIN = int(os.getenv("MEDIA_TOKEN_WINDOW_MIN", "30"))
 # DB disimpan di backend/ (satu level di atas package app/) — terpisah dari kode aplikasi
 _BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 _DEFAULT_DB  = f"sqlite:///{_BACKEND_DIR}/speaking.db"
 DATABASE_URL_CFG  = os.getenv("DATABASE_URL", "").strip() or _DEFAULT_DB
+# Engine baca (analytics/admin berat). Kosong = DB yang sama lewat pool koneksi read-only terpisah;
+# untuk PostgreSQL bisa diisi URL replica.
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", "").strip()
+
+# Pool koneksi per engine
+DB_POOL_SIZE      = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW   = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT_S = float(os.getenv("DB_POOL_TIMEOUT_S", "30"))
+# Endpoint hot-path (sesi, agent/next, profil, login/refresh) lewat driver async (aiosqlite/asyncpg).
+# 0 = Session sync di thread pool seperti sebelumnya.
+DB_ASYNC          = os.getenv("DB_ASYNC", "1").strip().lower() not in ("0", "false", "no")
+
+# Profil performa SQLite (WAL + pragma). Matikan (0) di network filesystem yang tidak mendukung WAL.
+SQLITE_PERF_PROFILE    = os.getenv("SQLITE_PERF_PROFILE", "1").strip().lower() not in ("0", "false", "no")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "15000"))
+SQLITE_CACHE_SIZE_MB   = int(os.getenv("SQLITE_CACHE_SIZE_MB", "64"))
+SQLITE_MMAP_SIZE_MB    = int(os.getenv("SQLITE_MMAP_SIZE_MB", "256"))
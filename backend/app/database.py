@@ -1,13 +1,86 @@
-from sqlalchemy import create_engine, text
+import asyncio
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.concurrency import run_in_threadpool
+
+from .config import (
+    DATABASE_URL_CFG, DATABASE_READ_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT_S, DB_ASYNC,
+    SQLITE_PERF_PROFILE, SQLITE_BUSY_TIMEOUT_MS, SQLITE_CACHE_SIZE_MB, SQLITE_MMAP_SIZE_MB,
+)
+
+
+def _sqlite_pragmas(read_only: bool) -> list[str]:
+    # WAL: pembaca tidak memblok penulis (dan sebaliknya); NORMAL aman di WAL (fsync hanya saat checkpoint).
+    # busy_timeout: penulis yang bentrok menunggu lock, bukan langsung "database is locked".
+    pragmas = [
+        f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_MB * 1024}",   # negatif = KiB
+        f"PRAGMA mmap_size={SQLITE_MMAP_SIZE_MB * 1024 * 1024}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+    if read_only:
+        return pragmas + ["PRAGMA query_only=ON"]
+    return ["PRAGMA journal_mode=WAL", "PRAGMA synchronous=NORMAL"] + pragmas
+
+
+def _sqlite_in_memory(url: str) -> bool:
+    return ":memory:" in url or url in ("sqlite://", "sqlite:///")
+
+
+def make_engine(url: str, read_only: bool = False):
+    pool = {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_timeout": DB_POOL_TIMEOUT_S}
+    if not url.startswith("sqlite"):
+        connect_args = {"options": "-c default_transaction_read_only=on"} if read_only else {}
+        return create_engine(url, pool_pre_ping=True, future=True, connect_args=connect_args, **pool)
+
+    if _sqlite_in_memory(url):
+        return create_engine(url, future=True, connect_args={"check_same_thread": False})
+    engine = create_engine(
+        url, future=True,
+        connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+        **pool,
+    )
+    _install_pragmas(engine, read_only)
+    return engine
+
+
+def _install_pragmas(engine, read_only: bool = False) -> None:
+    if not SQLITE_PERF_PROFILE:
+        return
+    pragmas = _sqlite_pragmas(read_only)
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        for p in pragmas:
+            cur.execute(p)
+        cur.close()
 
-from .config import DATABASE_URL_CFG
 
+def async_url(url: str) -> str | None:
+    """URL sync → driver async (aiosqlite / asyncpg); None kalau dialek tidak didukung."""
+    scheme, _, rest = url.partition("://")
+    if scheme in ("sqlite", "sqlite+pysqlite"):
+        return f"sqlite+aiosqlite://{rest}"
+    if scheme in ("postgres", "postgresql", "postgresql+psycopg2"):
+        return f"postgresql+asyncpg://{rest}"
+    return None
 
-def make_engine(url: str):
-    if url.startswith("sqlite"):
-        return create_engine(url, pool_pre_ping=True, future=True, connect_args={"check_same_thread": False})
-    return create_engine(url, pool_pre_ping=True, future=True)
+
+def make_async_engine(url: str):
+    pool = {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_timeout": DB_POOL_TIMEOUT_S}
+    if not url.startswith("sqlite"):
+        return create_async_engine(url, pool_pre_ping=True, **pool)
+    # aiosqlite default-nya NullPool (buka file + thread baru per request) → pool eksplisit
+    engine = create_async_engine(
+        url, poolclass=AsyncAdaptedQueuePool,
+        connect_args={"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}, **pool,
+    )
+    _install_pragmas(engine.sync_engine)   # event connect tetap di level sync_engine
+    return engine
 
 
 DATABASE_URL = DATABASE_URL_CFG
@@ -21,9 +94,35 @@ except Exception as e:
     DATABASE_URL = f"sqlite:///{_BACKEND_DIR}/speaking.db"
     engine = make_engine(DATABASE_URL)
 
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+# Engine baca terpisah untuk query admin/analytics berat: pool sendiri (tidak merebut koneksi
+# endpoint tulis) dan koneksi read-only. SQLite in-memory tidak bisa dibagi → pakai engine utama.
+if DATABASE_READ_URL and DATABASE_URL == DATABASE_URL_CFG:
+    read_engine = make_engine(DATABASE_READ_URL, read_only=True)
+elif DATABASE_URL.startswith("sqlite") and _sqlite_in_memory(DATABASE_URL):
+    read_engine = engine
+else:
+    read_engine = make_engine(DATABASE_URL, read_only=True)
+
+SessionLocal     = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False, autocommit=False, future=True)
 Base = declarative_base()
 
+# Engine async untuk endpoint hot-path (DB_ASYNC). SQLite in-memory tidak bisa dibagi antar engine,
+# dan driver async yang tidak terpasang → tetap lewat engine sync di thread pool.
+async_engine = None
+if DB_ASYNC and not (DATABASE_URL.startswith("sqlite") and _sqlite_in_memory(DATABASE_URL)):
+    _async_url = async_url(DATABASE_URL)
+    try:
+        async_engine = make_async_engine(_async_url) if _async_url else None
+    except ImportError as e:
+        print(f"[DB] Async driver unavailable ({e}). Hot paths stay on the sync engine.", flush=True)
+AsyncSessionLocal = (
+    async_sessionmaker(bind=async_engine, autoflush=False, class_=AsyncSession) if async_engine else None
+)
+# SQLite hanya punya satu penulis. Tanpa antrian, transaksi tulis yang bersamaan saling busy-wait
+# (backoff sleep, tidak FIFO) → ekor latensi panjang. Di mode async antrikan di event loop.
+_sqlite_write_gate = asyncio.Lock() if async_engine is not None and DATABASE_URL.startswith("sqlite") else None
+
 
 def get_db():
     db = SessionLocal()
@@ -33,6 +132,67 @@ def get_db():
         db.close()
 
 
+def get_read_db():
+    """Session read-only untuk endpoint yang hanya membaca (analytics, validasi)."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+class ThreadedSession:
+    """Pengganti AsyncSession saat DB_ASYNC mati: run_sync() menjalankan fungsi di thread pool
+    dengan Session sync biasa (perilaku lama endpoint `def`)."""
+
+    def __init__(self, db):
+        self.sync_session = db
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
+
+
+async def get_async_db():
+    """AsyncSession (aiosqlite / asyncpg) untuk endpoint async di hot path.
+
+    Endpoint memanggil `await db.run_sync(fn, ...)` dengan fn(Session, ...) — query tetap ditulis
+    sekali untuk Session sync, I/O-nya di-await lewat driver async tanpa memegang thread pool.
+    Tanpa engine async, yang di-yield ThreadedSession dengan antarmuka run_sync yang sama.
+    """
+    if AsyncSessionLocal is None:
+        db = ThreadedSession(SessionLocal())
+        try:
+            yield db
+        finally:
+            await db.close()
+        return
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def run_write(db, fn, *args):
+    """`db.run_sync(fn, *args)` untuk transaksi yang menulis; di SQLite async diantrikan FIFO."""
+    if _sqlite_write_gate is None:
+        return await db.run_sync(fn, *args)
+    async with _sqlite_write_gate:
+        return await db.run_sync(fn, *args)
+
+
+def dialect_insert(db):
+    """Konstruksi INSERT dengan ON CONFLICT (SQLite / PostgreSQL); None untuk dialek lain."""
+    name = db.get_bind().dialect.name
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
+
+
 def sqlite_add_column_if_missing(table_name: str, column_def_sql: str):
     if not DATABASE_URL.startswith("sqlite"):
         return
@@ -42,3 +202,11 @@ def sqlite_add_column_if_missing(table_name: str, column_def_sql: str):
         col_name = column_def_sql.strip().split()[0]
         if col_name not in cols:
             conn.exec_driver_sql(f"ALTER TABLE {table_name} ADD COLUMN {column_def_sql}")
+
+
+def create_index_if_missing(index_name: str, table_name: str, columns: str, unique: bool = False):
+    """CREATE INDEX IF NOT EXISTS — untuk DB lama yang tabelnya dibuat sebelum index ditambahkan."""
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {index_name} ON {table_name} ({columns})"
+        )
@@ -0,0 +1,72 @@
+import asyncio
+
+import httpx
+
+# HTTP/2 butuh paket 'h2' — kalau belum terpasang tetap jalan dengan HTTP/1.1 keep-alive
+try:
+    import h2  # noqa: F401
+    _HTTP2 = True
+except Exception:
+    _HTTP2 = False
+
+# Timeout + batas koneksi per kelas endpoint.
+# "chat" = balasan percakapan (hot path), "open" = pesan pembuka, "transcribe" = upload audio Whisper,
+# "feedback" = penilaian akhir sesi, "json" = reflect/plan agent.
+ENDPOINT_CLASSES: dict[str, dict] = {
+    "chat":       {"timeout": httpx.Timeout(60.0,  connect=5.0), "max_concurrency": 48},
+    "open":       {"timeout": httpx.Timeout(30.0,  connect=5.0), "max_concurrency": 16},
+    "transcribe": {"timeout": httpx.Timeout(120.0, connect=5.0, write=60.0), "max_concurrency": 24},
+    "feedback":   {"timeout": httpx.Timeout(10.0,  connect=5.0), "max_concurrency": 16},
+    "json":       {"timeout": httpx.Timeout(60.0,  connect=5.0), "max_concurrency": 8},
+}
+
+_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=40, keepalive_expiry=60.0)
+
+_client: httpx.AsyncClient | None = None
+_semaphores: dict[str, asyncio.Semaphore] = {}
+
+
+def _new_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=_HTTP2,
+        limits=_LIMITS,
+        timeout=ENDPOINT_CLASSES["chat"]["timeout"],
+    )
+
+
+async def startup() -> None:
+    """Dipanggil dari lifespan FastAPI — buka satu client untuk seluruh umur aplikasi."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _new_client()
+    _semaphores.clear()
+    print(f"[GROQ] Shared client ready (http2={_HTTP2})", flush=True)
+
+
+async def shutdown() -> None:
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+    _semaphores.clear()
+
+
+def get_client() -> httpx.AsyncClient:
+    """Client bersama; dibuat lazily kalau dipakai di luar lifespan (mis. script CLI)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _new_client()
+    return _client
+
+
+def endpoint_timeout(endpoint: str) -> httpx.Timeout:
+    return ENDPOINT_CLASSES.get(endpoint, ENDPOINT_CLASSES["chat"])["timeout"]
+
+
+def endpoint_slot(endpoint: str) -> asyncio.Semaphore:
+    """Batas request paralel per kelas endpoint agar upload audio tidak menghabiskan pool untuk chat."""
+    sem = _semaphores.get(endpoint)
+    if sem is None:
+        cfg = ENDPOINT_CLASSES.get(endpoint, ENDPOINT_CLASSES["chat"])
+        sem = _semaphores[endpoint] = asyncio.Semaphore(cfg["max_concurrency"])
+    return sem
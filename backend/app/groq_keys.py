@@ -0,0 +1,235 @@
+import asyncio
+import json
+import math
+import re
+import time
+
+from .config import GROQ_API_KEY, GROQ_API_KEYS
+
+# Groq mengirim header x-ratelimit-* di setiap response:
+#   limit/remaining-requests (per hari), limit/remaining-tokens (per menit),
+#   reset-requests / reset-tokens dalam format durasi "2m59.56s", "7.66s", "450ms".
+_DURATION_RE = re.compile(r"(?:(\d+(?:\.\d+)?)h)?(?:(\d+(?:\.\d+)?)m(?!s))?(?:(\d+(?:\.\d+)?)s)?(?:(\d+(?:\.\d+)?)ms)?$")
+
+
+def _parse_duration(value: str | None) -> float | None:
+    """'1m30.5s' → 90.5 detik. None kalau header tidak ada / tidak dikenali."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    m = _DURATION_RE.match(value)
+    if not m or not any(m.groups()):
+        return None
+    h, mnt, s, ms = (float(g) if g else 0.0 for g in m.groups())
+    return h * 3600 + mnt * 60 + s + ms / 1000.0
+
+
+def _parse_int(value: str | None) -> int | None:
+    try:
+        return int(float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def estimate_tokens(payload: dict | None) -> int:
+    """Perkiraan kasar token request (~4 karakter/token) + jatah completion."""
+    if not payload:
+        return 0
+    prompt_chars = len(json.dumps(payload.get("messages", []), ensure_ascii=False))
+    return prompt_chars // 4 + int(payload.get("max_tokens") or 256)
+
+
+class _KeyState:
+    def __init__(self, idx: int, key: str):
+        self.idx            = idx
+        self.key            = key
+        self.limit_req      : int | None = None
+        self.remaining_req  : int | None = None
+        self.reset_req_at   = 0.0
+        self.limit_tok      : int | None = None
+        self.remaining_tok  : int | None = None
+        self.reset_tok_at   = 0.0
+        self.cooldown_until = 0.0
+        self.inflight       = 0
+        self.sent           = 0
+        self.throttled      = 0
+        self.tokens_reserved = 0
+
+    def _refresh(self, now: float) -> None:
+        # Jendela rate limit sudah lewat → budget kembali penuh, SEKALI per jendela: waktu reset
+        # berikutnya belum diketahui sampai header response berikutnya datang (inf sampai saat itu),
+        # jadi reserve() setelah isi ulang tetap mengurangi budget
+        if self.remaining_req is not None and now >= self.reset_req_at:
+            self.remaining_req = self.limit_req
+            self.reset_req_at  = math.inf
+        if self.remaining_tok is not None and now >= self.reset_tok_at:
+            self.remaining_tok = self.limit_tok
+            self.reset_tok_at  = math.inf
+
+    def _fit(self, est_tokens: int) -> int:
+        # Request yang lebih besar dari limit token per menit tidak pernah muat → cukup tunggu
+        # budget penuh (limit), jangan menunggu MAX_WAIT untuk kondisi yang mustahil
+        return min(est_tokens, self.limit_tok) if self.limit_tok else est_tokens
+
+    def available(self, now: float, est_tokens: int) -> bool:
+        self._refresh(now)
+        est_tokens = self._fit(est_tokens)
+        if now < self.cooldown_until:
+            return False
+        if self.remaining_req is not None and self.remaining_req <= 0:
+            return False
+        if self.remaining_tok is not None and est_tokens and self.remaining_tok < est_tokens:
+            return False
+        return True
+
+    def ready_at(self, est_tokens: int) -> float:
+        """Kapan key ini paling cepat bisa dipakai lagi."""
+        est_tokens = self._fit(est_tokens)
+        t = self.cooldown_until
+        if self.remaining_req is not None and self.remaining_req <= 0:
+            t = max(t, self.reset_req_at)
+        if self.remaining_tok is not None and est_tokens and self.remaining_tok < est_tokens:
+            t = max(t, self.reset_tok_at)
+        return t
+
+    def load(self) -> float:
+        """Utilisasi 0..1 dari budget yang diketahui (request & token, ambil yang terbesar)."""
+        used = []
+        if self.limit_req and self.remaining_req is not None:
+            used.append(1.0 - self.remaining_req / self.limit_req)
+        if self.limit_tok and self.remaining_tok is not None:
+            used.append(1.0 - self.remaining_tok / self.limit_tok)
+        return max(used) if used else 0.0
+
+    def reserve(self, est_tokens: int) -> None:
+        # Kurangi budget secara optimistis supaya request paralel tidak menumpuk di key yang sama
+        self.inflight += 1
+        self.sent += 1
+        self.tokens_reserved += est_tokens
+        if self.remaining_req is not None:
+            self.remaining_req -= 1
+        if self.remaining_tok is not None:
+            self.remaining_tok -= est_tokens
+
+    def update_from_headers(self, headers, now: float) -> None:
+        limit_req = _parse_int(headers.get("x-ratelimit-limit-requests"))
+        rem_req   = _parse_int(headers.get("x-ratelimit-remaining-requests"))
+        reset_req = _parse_duration(headers.get("x-ratelimit-reset-requests"))
+        limit_tok = _parse_int(headers.get("x-ratelimit-limit-tokens"))
+        rem_tok   = _parse_int(headers.get("x-ratelimit-remaining-tokens"))
+        reset_tok = _parse_duration(headers.get("x-ratelimit-reset-tokens"))
+        if limit_req is not None: self.limit_req = limit_req
+        if rem_req   is not None: self.remaining_req = rem_req
+        if reset_req is not None: self.reset_req_at = now + reset_req
+        if limit_tok is not None: self.limit_tok = limit_tok
+        if rem_tok   is not None: self.remaining_tok = rem_tok
+        if reset_tok is not None: self.reset_tok_at = now + reset_tok
+
+    def snapshot(self, now: float) -> dict:
+        self._refresh(now)
+
+        def _reset_in(at: float) -> float | None:
+            return None if math.isinf(at) else round(max(0.0, at - now), 2)
+
+        return {
+            "key":              f"#{self.idx + 1} …{self.key[-4:]}" if self.key else f"#{self.idx + 1}",
+            "inflight":         self.inflight,
+            "sent":             self.sent,
+            "throttled":        self.throttled,
+            "utilisation":      round(self.load(), 3),
+            "requests":         {"limit": self.limit_req, "remaining": self.remaining_req,
+                                 "reset_in_s": _reset_in(self.reset_req_at)},
+            "tokens":           {"limit": self.limit_tok, "remaining": self.remaining_tok,
+                                 "reset_in_s": _reset_in(self.reset_tok_at)},
+            "tokens_estimated": self.tokens_reserved,
+            "cooldown_s":       round(max(0.0, self.cooldown_until - now), 2),
+        }
+
+
+class GroqKeyScheduler:
+    """
+    Pilih key Groq dengan beban paling ringan SEBELUM request dikirim, berdasarkan
+    budget dari header x-ratelimit-*. Kalau semua key jenuh, request mengantre FIFO
+    (asyncio.Lock adil) sampai jendela rate limit key tercepat di-reset.
+    """
+    MAX_WAIT = 30.0
+
+    def __init__(self, keys: list[str]):
+        self._states = [_KeyState(i, k) for i, k in enumerate(keys)]
+        self._lock: asyncio.Lock | None = None
+        self.queued      = 0
+        self.waits       = 0
+        self.wait_time_s = 0.0
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def _pick(self, now: float, est_tokens: int) -> _KeyState | None:
+        ready = [s for s in self._states if s.available(now, est_tokens)]
+        if not ready:
+            return None
+        return min(ready, key=lambda s: (s.load(), s.inflight, s.idx))
+
+    async def acquire(self, est_tokens: int = 0, max_wait: float | None = None) -> _KeyState:
+        max_wait = self.MAX_WAIT if max_wait is None else max_wait
+        now = time.monotonic()
+        # Kalau sudah ada yang antre, jangan menyalip
+        state = None if self.queued else self._pick(now, est_tokens)
+        if state is None:
+            # Semua key jenuh: antre adil — yang datang duluan dilayani duluan
+            self.queued += 1
+            started = now
+            try:
+                async with self._get_lock():
+                    while True:
+                        now = time.monotonic()
+                        state = self._pick(now, est_tokens)
+                        if state is not None:
+                            break
+                        waited = now - started
+                        if waited >= max_wait:
+                            # Best effort: pakai key yang paling cepat pulih, biarkan 429 ditangani caller
+                            state = min(self._states, key=lambda s: s.ready_at(est_tokens))
+                            break
+                        next_ready = min(s.ready_at(est_tokens) for s in self._states)
+                        await asyncio.sleep(min(max(next_ready - now, 0.05), max_wait - waited))
+            finally:
+                self.queued -= 1
+            self.waits += 1
+            self.wait_time_s += time.monotonic() - started
+        state.reserve(est_tokens)
+        return state
+
+    def release(self, state: _KeyState, response=None) -> None:
+        state.inflight = max(0, state.inflight - 1)
+        if response is None:
+            return
+        now = time.monotonic()
+        state.update_from_headers(response.headers, now)
+        if response.status_code == 429:
+            state.throttled += 1
+            retry_after = _parse_duration(response.headers.get("retry-after"))
+            if retry_after is None:
+                retry_after = max(state.ready_at(0) - now, 2.0)
+            state.cooldown_until = now + min(retry_after, 120.0)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "keys":         [s.snapshot(now) for s in self._states],
+            "queued_now":   self.queued,
+            "waits":        self.waits,
+            "avg_wait_s":   round(self.wait_time_s / self.waits, 3) if self.waits else 0.0,
+        }
+
+
+scheduler = GroqKeyScheduler(GROQ_API_KEYS or [GROQ_API_KEY])
@@ -1,19 +1,26 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.routing import APIRouter
-from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 
-from .config import API_PREFIX, ALLOWED_ORIGINS, GROQ_API_KEY
+from .config import API_PREFIX, ALLOWED_ORIGINS, GROQ_API_KEY, TTS_PREWARM
 from .limiter import limiter
-from .database import engine, SessionLocal, sqlite_add_column_if_missing
+from . import groq_client, agent_jobs, validation_bootstrap, session_audio, audio_archive, maintenance
+from .piper_pool import pool as piper_pool
+from .database import engine, async_engine, SessionLocal, sqlite_add_column_if_missing, create_index_if_missing
 from .models import Base
 from .seed import seed_scenarios, seed_admin
-from .routers import auth, admin, scenarios, sessions, chat, feedback, agent, profile, validation, rater
+from .reflection_store import ensure_unique_indexes
+from .rollups import backfill_if_empty as backfill_rollups_if_empty
+from .session_turns import backfill_if_needed as backfill_session_turns, referenced_audio
+from .tts_cache import cache as tts_cache
+from .routers import auth, admin, scenarios, sessions, chat, feedback, agent, profile, validation, rater, uploads
 
 # Create tables
 Base.metadata.create_all(bind=engine)
@@ -33,16 +40,56 @@ sqlite_add_column_if_missing("sessions",       "score_coherence REAL NOT NULL DE
 sqlite_add_column_if_missing("sessions",       "score_phonology REAL NOT NULL DEFAULT 3.0")
 sqlite_add_column_if_missing("sessions",       "user_id INTEGER NOT NULL DEFAULT 1")
 sqlite_add_column_if_missing("sessions",       "audio_path TEXT")
+sqlite_add_column_if_missing("sessions",       "audio_status VARCHAR(16)")
+sqlite_add_column_if_missing("sessions",       "audio_parts_json TEXT")
+sqlite_add_column_if_missing("sessions",       "audio_segments_json TEXT")
 sqlite_add_column_if_missing("sessions",       "full_audio_json TEXT")
 sqlite_add_column_if_missing("sessions",       "full_text_json TEXT")
+sqlite_add_column_if_missing("sessions",       "turn_manifest_json TEXT")
+sqlite_add_column_if_missing("sessions",       "turn_count INTEGER")
 sqlite_add_column_if_missing("sessions",       "rater_visible INTEGER NOT NULL DEFAULT 1")
 sqlite_add_column_if_missing("error_patterns", "weight REAL NOT NULL DEFAULT 1.0")
+ensure_unique_indexes()
+create_index_if_missing("ix_sessions_user_created", "sessions", "user_id, created_at")
+create_index_if_missing("ix_sessions_created_id",    "sessions", "created_at, id")
+create_index_if_missing("ix_rater_assessments_session_rater", "rater_assessments", "session_id, rater_id")
+backfill_rollups_if_empty()
+backfill_session_turns()
+
+# Cache TTS: file yang dipakai sesi tersimpan tidak dievict
+tts_cache.referenced = referenced_audio
 
 # Seed
 with SessionLocal() as db:
     seed_scenarios(db)
     seed_admin(db)
 
+# ===== Lifespan =====
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await groq_client.startup()
+    await piper_pool.startup(sorted(set(chat._SCENARIO_VOICE.values())))
+    prewarm = asyncio.create_task(chat.prewarm_tts_cache()) if TTS_PREWARM else None
+    await agent_jobs.queue.startup()
+    await session_audio.assembler.startup()
+    await audio_archive.archiver.startup()
+    await maintenance.sweeper.startup()
+    try:
+        yield
+    finally:
+        if prewarm is not None:
+            prewarm.cancel()
+        await agent_jobs.queue.shutdown()
+        await maintenance.sweeper.shutdown()
+        await audio_archive.archiver.shutdown()
+        await session_audio.assembler.shutdown()
+        await validation_bootstrap.runner.shutdown()
+        await piper_pool.shutdown()
+        await groq_client.shutdown()
+        if async_engine is not None:
+            await async_engine.dispose()   # tutup koneksi aiosqlite (thread worker) / asyncpg
+
+
 # ===== App =====
 app = FastAPI(
     title="Speaking Practice API",
@@ -51,6 +98,7 @@ app = FastAPI(
     docs_url=f"{API_PREFIX}/docs",
     redoc_url=f"{API_PREFIX}/redoc",
     openapi_url=f"{API_PREFIX}/openapi.json",
+    lifespan=lifespan,
 )
 
 app.state.limiter = limiter
@@ -62,7 +110,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["X-Audio-Path"],
+    expose_headers=["X-Audio-Path", "X-Next-Cursor"],
 )
 
 
@@ -89,13 +137,13 @@ app.include_router(agent.router,     prefix=API_PREFIX)
 app.include_router(profile.router,   prefix=API_PREFIX)
 app.include_router(validation.router, prefix=API_PREFIX)
 app.include_router(rater.router,     prefix=API_PREFIX)
+app.include_router(uploads.router)   # /uploads/audio/<nama> — tanpa API_PREFIX, URL lama tetap berlaku
 
 
-# Serve static audio files — buat direktori jika belum ada
+# Direktori audio (dilayani routers/uploads.py) — buat jika belum ada
 uploads_dir = Path(__file__).parent.parent / "uploads"
 uploads_dir.mkdir(parents=True, exist_ok=True)
 (uploads_dir / "audio").mkdir(exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=str(uploads_dir)), name="uploads")
 
 
 if __name__ == "__main__":
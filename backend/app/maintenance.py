@@ -0,0 +1,47 @@
+import asyncio
+from typing import Callable
+
+from .config import MAINTENANCE_INTERVAL_MIN
+from . import transcript_cache
+
+# Pembersihan tabel cache secara periodik (bukan di jalur request): tiap sweep berupa fungsi sync
+# yang membuka SessionLocal sendiri dan dijalankan di thread, satu per satu.
+
+
+class MaintenanceLoop:
+    def __init__(self, interval_min: float):
+        self.interval_s = max(30.0, interval_min * 60)
+        self._sweeps: dict[str, Callable[[], int]] = {}
+        self._task: asyncio.Task | None = None
+        self.last_run: dict[str, int | str] = {}
+
+    def register(self, name: str, fn: Callable[[], int]) -> None:
+        """fn() → jumlah baris yang dibersihkan."""
+        self._sweeps[name] = fn
+
+    async def startup(self) -> None:
+        self._task = asyncio.create_task(self._loop())
+
+    async def shutdown(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run_once(self) -> dict[str, int | str]:
+        for name, fn in list(self._sweeps.items()):
+            try:
+                self.last_run[name] = await asyncio.to_thread(fn)
+            except Exception as e:
+                self.last_run[name] = f"error: {e}"
+                print(f"[MAINTENANCE] {name} failed: {e}", flush=True)
+        return dict(self.last_run)
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_s)
+            await self.run_once()
+
+
+sweeper = MaintenanceLoop(MAINTENANCE_INTERVAL_MIN)
+sweeper.register("transcript_cache", transcript_cache.evict_excess)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, Float, String, DateTime, Text, Boolean
+from sqlalchemy import Column, Integer, Float, String, Date, DateTime, Text, Boolean, UniqueConstraint, Index
 
 from .database import Base
 
@@ -36,6 +36,10 @@ class ScenarioORM(Base):
 
 class SessionRecordORM(Base):
     __tablename__ = "sessions"
+    __table_args__ = (
+        Index("ix_sessions_user_created", "user_id", "created_at"),
+        Index("ix_sessions_created_id", "created_at", "id"),       # keyset pagination daftar rater/validasi
+    )
     id              = Column(Integer, primary_key=True, index=True, autoincrement=True)
     user_id         = Column(Integer, nullable=False, default=1, index=True)
     scenario        = Column(String(200), nullable=False)
@@ -48,8 +52,13 @@ class SessionRecordORM(Base):
     comment         = Column(Text, nullable=True)
     duration_min    = Column(Float, nullable=False, default=0.0)
     audio_path      = Column(String(500), nullable=True)
-    full_audio_json = Column(Text, nullable=True)
-    full_text_json  = Column(Text, nullable=True)
+    audio_status    = Column(String(16), nullable=True)   # pending | ready | failed (None = tanpa audio)
+    audio_parts_json = Column(Text, nullable=True)        # klip yang digabung worker session_audio
+    audio_segments_json = Column(Text, nullable=True)     # [[klip, frame_awal, jumlah_frame]] di file gabungan
+    full_audio_json = Column(Text, nullable=True)         # lama, read-only: diganti turn_manifest_json + session_turns
+    full_text_json  = Column(Text, nullable=True)         # lama, read-only (sumber backfill session_turns)
+    turn_manifest_json = Column(Text, nullable=True)      # turn_manifest.build() — bundle rater, dihitung saat simpan
+    turn_count      = Column(Integer, nullable=True)      # ringkasan untuk daftar rater (tanpa memuat manifest)
     rater_visible   = Column(Boolean, nullable=False, default=True)  # admin bisa nonaktifkan dari antrian rater
     created_at      = Column(DateTime, default=datetime.utcnow, nullable=False)
 
@@ -95,6 +104,7 @@ class PlanItemORM(Base):
 
 class ErrorPatternORM(Base):
     __tablename__ = "error_patterns"
+    __table_args__ = (Index("uq_error_patterns_user_tag", "user_id", "tag", unique=True),)
     id           = Column(Integer, primary_key=True, autoincrement=True)
     user_id      = Column(Integer, index=True, nullable=False, default=1)
     tag          = Column(String(64), index=True, nullable=False)
@@ -106,6 +116,7 @@ class ErrorPatternORM(Base):
 
 class VocabTargetORM(Base):
     __tablename__ = "vocab_targets"
+    __table_args__ = (Index("uq_vocab_targets_user_topic", "user_id", "topic", unique=True),)
     id         = Column(Integer, primary_key=True, autoincrement=True)
     user_id    = Column(Integer, index=True, nullable=False, default=1)
     topic      = Column(String(128), nullable=False)
@@ -126,6 +137,7 @@ class SessionSummaryORM(Base):
 
 class RaterAssessmentORM(Base):
     __tablename__ = "rater_assessments"
+    __table_args__  = (Index("ix_rater_assessments_session_rater", "session_id", "rater_id"),)
     id              = Column(Integer, primary_key=True, autoincrement=True)
     session_id      = Column(Integer, index=True, nullable=False)
     rater_id        = Column(Integer, nullable=False, default=1)  # 1 or 2
@@ -136,3 +148,95 @@ class RaterAssessmentORM(Base):
     score_interaction = Column(Float, nullable=True, name="score_phonology")
     notes             = Column(Text, nullable=True)
     rated_at        = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class TranscriptCacheORM(Base):
+    __tablename__ = "transcript_cache"
+    id           = Column(Integer, primary_key=True, autoincrement=True)
+    cache_key    = Column(String(64), unique=True, nullable=False, index=True)  # sha256(audio_sha256 + language + prompt)
+    audio_sha256 = Column(String(64), nullable=False)
+    language     = Column(String(16), nullable=True)
+    result_json  = Column(Text, nullable=False)                                 # respons Whisper apa adanya
+    hits         = Column(Integer, nullable=False, default=0)
+    created_at   = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_used_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
+class FeedbackTurnORM(Base):
+    __tablename__ = "feedback_turns"
+    # session_key berasal dari client → unik per user, bukan global
+    __table_args__ = (UniqueConstraint("user_id", "session_key", "turn_idx", name="uq_feedback_turn"),)
+    id           = Column(Integer, primary_key=True, autoincrement=True)
+    user_id      = Column(Integer, nullable=False, index=True)
+    session_key  = Column(String(64), nullable=False, index=True)   # id sesi dari client (belum ada sessions.id)
+    turn_idx     = Column(Integer, nullable=False)                  # urutan giliran user (0-based)
+    text_sha256  = Column(String(64), nullable=False)               # cocokkan dengan teks saat merge
+    word_count   = Column(Integer, nullable=False, default=0)
+    result_json  = Column(Text, nullable=False)                     # {"scores": {...}, "evidence": {...}}
+    created_at   = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
+class AgentJobORM(Base):
+    __tablename__ = "agent_jobs"
+    id           = Column(Integer, primary_key=True, autoincrement=True)
+    user_id      = Column(Integer, nullable=False, index=True)
+    session_id   = Column(Integer, nullable=True, index=True)
+    kind         = Column(String(32), nullable=False, default="reflect_plan")
+    status       = Column(String(16), nullable=False, default="queued", index=True)   # queued|running|done|failed
+    attempts     = Column(Integer, nullable=False, default=0)
+    payload_json = Column(Text, nullable=False)
+    result_json  = Column(Text, nullable=True)          # {"reflect": {...}, "plan": {...}}
+    error        = Column(Text, nullable=True)
+    next_run_at  = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at   = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at   = Column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at  = Column(DateTime, nullable=True)
+
+
+class DailyScoreRollupORM(Base):
+    __tablename__ = "daily_score_rollups"
+    __table_args__ = (UniqueConstraint("user_id", "day", name="uq_daily_rollup_user_day"),)
+    id              = Column(Integer, primary_key=True, autoincrement=True)
+    user_id         = Column(Integer, nullable=False, index=True)
+    day             = Column(Date, nullable=False)                   # tanggal UTC dari sessions.created_at
+    sessions_count  = Column(Integer, nullable=False, default=0)
+    sum_overall     = Column(Float, nullable=False, default=0.0)
+    sum_range       = Column(Float, nullable=False, default=0.0)
+    sum_accuracy    = Column(Float, nullable=False, default=0.0)
+    sum_fluency     = Column(Float, nullable=False, default=0.0)
+    sum_coherence   = Column(Float, nullable=False, default=0.0)
+    sum_interaction = Column(Float, nullable=False, default=0.0)
+    total_min       = Column(Float, nullable=False, default=0.0)
+    scenarios       = Column(Text, nullable=True)                    # dipisah newline, urut waktu sesi
+
+
+class SessionTurnORM(Base):
+    """Satu turn percakapan sesi (teks + audio sejajar, lihat turn_manifest) — query per turn
+    tanpa mem-parse full_audio_json / full_text_json."""
+    __tablename__ = "session_turns"
+    __table_args__ = (Index("uq_session_turns_session_idx", "session_id", "idx", unique=True),)
+    id          = Column(Integer, primary_key=True, autoincrement=True)
+    session_id  = Column(Integer, nullable=False)
+    idx         = Column(Integer, nullable=False)                    # urutan dalam percakapan, mulai 0
+    role        = Column(String(16), nullable=False)                 # user | assistant
+    text        = Column(Text, nullable=True)                        # None = klip audio tanpa pasangan teks
+    audio_path  = Column(String(255), nullable=True, index=True)     # nama file di uploads/audio
+    duration_s  = Column(Float, nullable=True)                       # None = tanpa audio / bukan WAV
+    word_count  = Column(Integer, nullable=False, default=0)
+
+
+class AudioArchiveORM(Base):
+    """File audio yang dipindah ke tier arsip (uploads/audio/archive) atau dihapus karena sudah
+    ada di file sesi gabungan. Handler /uploads/audio memakai tabel ini untuk tetap melayaninya."""
+    __tablename__ = "audio_archive"
+    id           = Column(Integer, primary_key=True, autoincrement=True)
+    name         = Column(String(255), unique=True, nullable=False, index=True)   # nama asli di uploads/audio
+    kind         = Column(String(16), nullable=False)                # transcoded | segment
+    stored       = Column(String(255), nullable=False)               # transcoded: file di archive/; segment: file sesi sumber
+    media_type   = Column(String(32), nullable=False)
+    start_frame  = Column(Integer, nullable=True)                    # segment: posisi di file sumber
+    frames       = Column(Integer, nullable=True)
+    sample_rate  = Column(Integer, nullable=True)                    # segment: rate file sumber (satuan frame)
+    bytes_before = Column(Integer, nullable=False, default=0)
+    bytes_after  = Column(Integer, nullable=False, default=0)
+    archived_at  = Column(DateTime, default=datetime.utcnow, nullable=False)
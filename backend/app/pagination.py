@@ -0,0 +1,38 @@
+from datetime import datetime
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_, desc
+from sqlalchemy.orm import Session
+
+# Keyset pagination pada (created_at, id) DESC untuk daftar sesi rater/validasi.
+# Cursor = "<created_at ISO>_<id>" baris terakhir halaman; halaman berikutnya mulai
+# tepat setelahnya lewat index, tanpa OFFSET / scan ulang baris yang sudah dilihat.
+# Cursor berikutnya dikirim di header X-Next-Cursor (body tetap list seperti sebelumnya).
+MAX_PAGE = 200
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    return f"{created_at.isoformat()}_{row_id}"
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        ts, row_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(ts), int(row_id)
+    except (ValueError, AttributeError):
+        raise HTTPException(status_code=400, detail="Cursor tidak valid")
+
+
+def keyset_page(db: Session, stmt, model, cursor: str | None, limit: int, response: Response) -> list:
+    """Jalankan `stmt` (select model) satu halaman setelah `cursor`; set X-Next-Cursor jika masih ada."""
+    limit = max(1, min(limit, MAX_PAGE))
+    if cursor:
+        ts, row_id = decode_cursor(cursor)
+        stmt = stmt.where(or_(model.created_at < ts, and_(model.created_at == ts, model.id < row_id)))
+    rows = db.execute(
+        stmt.order_by(desc(model.created_at), desc(model.id)).limit(limit + 1)
+    ).scalars().all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows
@@ -0,0 +1,188 @@
+import asyncio
+import json
+import shutil
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from .config import PIPER_BIN, PIPER_VOICES_DIR, PIPER_WORKERS_PER_VOICE
+
+# Protokol ke proses Piper (mode --json-input): satu baris JSON per ucapan di stdin
+#   {"text": "...", "output_file": "/tmp/.../x.wav"}
+# Piper menulis WAV ke output_file lalu mencetak path-nya satu baris di stdout —
+# baris itu adalah frame "selesai" untuk request tersebut.
+_SYNTH_TIMEOUT   = 30.0
+_HEALTH_INTERVAL = 15.0
+
+
+def voice_model(voice_name: str) -> Path:
+    return PIPER_VOICES_DIR / f"{voice_name}.onnx"
+
+
+def piper_available(voice_name: str) -> bool:
+    return PIPER_BIN.exists() and voice_model(voice_name).exists()
+
+
+class _PiperWorker:
+    def __init__(self, voice_name: str, idx: int, out_dir: Path):
+        self.voice_name = voice_name
+        self.idx        = idx
+        self.out_dir    = out_dir
+        self.proc: asyncio.subprocess.Process | None = None
+        self.restarts   = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.returncode is None
+
+    async def start(self) -> None:
+        self.proc = await asyncio.create_subprocess_exec(
+            str(PIPER_BIN), "--model", str(voice_model(self.voice_name)), "--json-input",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+
+    async def stop(self) -> None:
+        if self.alive:
+            self.proc.kill()
+            await self.proc.wait()
+        self.proc = None
+
+    async def restart(self) -> None:
+        await self.stop()
+        self.restarts += 1
+        await self.start()
+
+    async def synth(self, text: str) -> bytes:
+        if not self.alive:
+            await self.restart()
+        out_file = self.out_dir / f"{self.voice_name}_{self.idx}_{uuid.uuid4().hex[:8]}.wav"
+        line = json.dumps({"text": " ".join(text.split()), "output_file": str(out_file)}) + "\n"
+        try:
+            self.proc.stdin.write(line.encode())
+            await self.proc.stdin.drain()
+            done = await asyncio.wait_for(self.proc.stdout.readline(), timeout=_SYNTH_TIMEOUT)
+            if not done:
+                raise RuntimeError("piper worker exited")
+            return out_file.read_bytes()
+        except BaseException:
+            # Proses dalam keadaan tidak jelas (timeout / crash / dibatalkan) → mulai ulang
+            await self.stop()
+            raise
+        finally:
+            out_file.unlink(missing_ok=True)
+
+
+class PiperPool:
+    """
+    Proses Piper yang tetap hidup (model ONNX dimuat sekali) per voice.
+    Request mengantre di asyncio.Queue berisi worker idle kalau semua worker sibuk.
+    """
+
+    def __init__(self, workers_per_voice: int = 1):
+        self.workers_per_voice = max(1, workers_per_voice)
+        self._idle: dict[str, asyncio.Queue] = {}
+        self._workers: dict[str, list[_PiperWorker]] = {}
+        self._out_dir: Path | None = None
+        self._health_task: asyncio.Task | None = None
+        self.stats_ = {"requests": 0, "errors": 0, "queue_wait_s": 0.0, "synth_s": 0.0,
+                       "max_queue_wait_s": 0.0, "max_synth_s": 0.0}
+
+    def has_voice(self, voice_name: str) -> bool:
+        return voice_name in self._workers
+
+    async def _add_voice(self, voice_name: str) -> None:
+        if voice_name in self._workers or not piper_available(voice_name):
+            return
+        if self._out_dir is None:
+            self._out_dir = Path(tempfile.mkdtemp(prefix="piper_"))
+        q: asyncio.Queue = asyncio.Queue()
+        workers = [_PiperWorker(voice_name, i, self._out_dir) for i in range(self.workers_per_voice)]
+        for w in workers:
+            await w.start()
+            q.put_nowait(w)
+        self._workers[voice_name] = workers
+        self._idle[voice_name] = q
+        print(f"[TTS] Piper pool: {len(workers)} worker(s) warm for {voice_name}", flush=True)
+
+    async def startup(self, voice_names) -> None:
+        for v in voice_names:
+            try:
+                await self._add_voice(v)
+            except Exception as e:
+                print(f"[TTS] Piper pool start failed for {v}: {e}", flush=True)
+        if self._workers and self._health_task is None:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def shutdown(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        for workers in self._workers.values():
+            for w in workers:
+                await w.stop()
+        self._workers.clear()
+        self._idle.clear()
+        if self._out_dir is not None:
+            shutil.rmtree(self._out_dir, ignore_errors=True)
+            self._out_dir = None
+
+    async def _health_loop(self) -> None:
+        # Worker idle yang crash dihidupkan ulang sebelum dipakai request berikutnya
+        while True:
+            await asyncio.sleep(_HEALTH_INTERVAL)
+            for voice_name, q in self._idle.items():
+                for _ in range(q.qsize()):
+                    w = q.get_nowait()
+                    try:
+                        if not w.alive:
+                            print(f"[TTS] Piper worker {voice_name}#{w.idx} died — restarting", flush=True)
+                            await w.restart()
+                    except Exception as e:
+                        print(f"[TTS] Piper restart failed: {e}", flush=True)
+                    finally:
+                        q.put_nowait(w)
+
+    async def synth(self, text: str, voice_name: str) -> bytes:
+        """Sintesis WAV lewat worker idle untuk voice ini (antre kalau semua sibuk)."""
+        q = self._idle[voice_name]
+        t0 = time.perf_counter()
+        w = await q.get()
+        t1 = time.perf_counter()
+        try:
+            return await w.synth(text)
+        except Exception:
+            self.stats_["errors"] += 1
+            raise
+        finally:
+            t2 = time.perf_counter()
+            q.put_nowait(w)
+            s = self.stats_
+            s["requests"]        += 1
+            s["queue_wait_s"]    += t1 - t0
+            s["synth_s"]         += t2 - t1
+            s["max_queue_wait_s"] = max(s["max_queue_wait_s"], t1 - t0)
+            s["max_synth_s"]      = max(s["max_synth_s"], t2 - t1)
+
+    def stats(self) -> dict:
+        s = self.stats_
+        n = s["requests"] or 1
+        return {
+            "workers_per_voice": self.workers_per_voice,
+            "voices": {
+                v: {"workers": len(ws), "idle": self._idle[v].qsize(),
+                    "alive": sum(w.alive for w in ws), "restarts": sum(w.restarts for w in ws)}
+                for v, ws in self._workers.items()
+            },
+            "requests":           s["requests"],
+            "errors":             s["errors"],
+            "avg_queue_wait_ms":  round(s["queue_wait_s"] / n * 1000, 1),
+            "avg_synth_ms":       round(s["synth_s"] / n * 1000, 1),
+            "max_queue_wait_ms":  round(s["max_queue_wait_s"] * 1000, 1),
+            "max_synth_ms":       round(s["max_synth_s"] * 1000, 1),
+        }
+
+
+pool = PiperPool(PIPER_WORKERS_PER_VOICE)
@@ -0,0 +1,153 @@
+from datetime import datetime
+
+from sqlalchemy import select as sa_select, func
+from sqlalchemy.orm import Session
+
+from .database import engine, dialect_insert
+from .models import ErrorPatternORM, VocabTargetORM
+
+# Simpan hasil reflect dengan jumlah statement konstan: satu SELECT baris yang sudah ada
+# per tabel, lalu satu INSERT ... ON CONFLICT DO UPDATE (SQLite & PostgreSQL) per tabel.
+# Unik per (user_id, tag) dan (user_id, topic) — tabel tidak tumbuh setiap sesi.
+_VOCAB_MAX_ITEMS = 20
+
+
+def _upsert(db: Session, model, rows: list[dict], keys: tuple[str, ...]) -> None:
+    if not rows:
+        return
+    insert = dialect_insert(db)
+    if insert is None:
+        # Dialek lain: merge per baris (tetap benar, hanya tidak bulk)
+        for r in rows:
+            obj = db.execute(
+                sa_select(model).where(*[getattr(model, k) == r[k] for k in keys])
+            ).scalar_one_or_none()
+            if obj is None:
+                db.add(model(**r))
+            else:
+                for k, v in r.items():
+                    setattr(obj, k, v)
+        return
+    stmt = insert(model).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={c: stmt.excluded[c] for c in rows[0] if c not in keys},
+    )
+    db.execute(stmt)
+
+
+def upsert_error_patterns(db: Session, user_id: int, patterns: list[dict]) -> int:
+    merged: dict[str, dict] = {}
+    for ep in patterns:
+        tag = (ep.get("tag") or "misc").strip()[:64]
+        merged[tag] = {**merged.get(tag, {}), **{k: v for k, v in ep.items() if v}}
+    if not merged:
+        return 0
+
+    existing = {
+        r.tag: r for r in db.execute(
+            sa_select(ErrorPatternORM.tag, ErrorPatternORM.description, ErrorPatternORM.examples,
+                      ErrorPatternORM.weight)
+            .where(ErrorPatternORM.user_id == user_id, ErrorPatternORM.tag.in_(list(merged)))
+        ).all()
+    }
+    now, rows = datetime.utcnow(), []
+    for tag, ep in merged.items():
+        old = existing.get(tag)
+        try:    weight = float(ep.get("weight") or (old.weight if old else 1.0))
+        except: weight = old.weight if old else 1.0
+        examples = "\n".join(ep.get("examples", [])[:5]) if ep.get("examples") else (old.examples if old else "")
+        rows.append({
+            "user_id":      user_id,
+            "tag":          tag,
+            "description":  (ep.get("description") or (old.description if old else ""))[:2000],
+            "examples":     examples,
+            "weight":       weight,
+            "last_seen_at": now,
+        })
+    _upsert(db, ErrorPatternORM, rows, ("user_id", "tag"))
+    return len(rows)
+
+
+def _merge_items(new: list[str], old: str | None) -> str:
+    seen, out = set(), []
+    for item in [*new, *(old or "").split("\n")]:
+        item = (item or "").strip()
+        if item and item.lower() not in seen:
+            seen.add(item.lower())
+            out.append(item)
+    return "\n".join(out[:_VOCAB_MAX_ITEMS])
+
+
+def upsert_vocab_targets(db: Session, user_id: int, targets: list[dict]) -> int:
+    """Satu baris per topik; item baru digabung (tanpa duplikat) ke daftar yang sudah ada."""
+    wanted: dict[str, tuple[str, list[str]]] = {}
+    for vt in targets:
+        topic = (vt.get("topic") or "general").strip()[:128] or "general"
+        key   = topic.lower()
+        items = [str(i) for i in (vt.get("items") or [])[:10]]
+        prev  = wanted.get(key)
+        wanted[key] = (prev[0], items + prev[1]) if prev else (topic, items)
+    if not wanted:
+        return 0
+
+    existing = {
+        topic.lower(): (topic, items) for topic, items in db.execute(
+            sa_select(VocabTargetORM.topic, VocabTargetORM.items)
+            .where(VocabTargetORM.user_id == user_id, func.lower(VocabTargetORM.topic).in_(list(wanted)))
+        ).all()
+    }
+    now, rows = datetime.utcnow(), []
+    for key, (topic, items) in wanted.items():
+        old_topic, old_items = existing.get(key, (topic, None))
+        rows.append({
+            "user_id":    user_id,
+            "topic":      old_topic,   # pakai ejaan topik yang sudah tersimpan
+            "items":      _merge_items(items, old_items),
+            "due_next":   True,
+            "created_at": now,
+        })
+    _upsert(db, VocabTargetORM, rows, ("user_id", "topic"))
+    return len(rows)
+
+
+def save_reflection(db: Session, user_id: int, out: dict) -> None:
+    upsert_error_patterns(db, user_id, out.get("error_patterns") or [])
+    upsert_vocab_targets(db, user_id, out.get("vocab_targets") or [])
+    db.commit()
+
+
+def ensure_unique_indexes() -> None:
+    """
+    Migrasi DB lama: gabungkan baris ganda lalu buat index unik (user_id, tag) dan (user_id, topic).
+    Aman dipanggil setiap startup (IF NOT EXISTS).
+    """
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "DELETE FROM error_patterns WHERE id NOT IN "
+            "(SELECT MAX(id) FROM error_patterns GROUP BY user_id, tag)"
+        )
+        dupes = conn.exec_driver_sql(
+            "SELECT id, user_id, topic, items FROM vocab_targets WHERE (user_id, topic) IN "
+            "(SELECT user_id, topic FROM vocab_targets GROUP BY user_id, topic HAVING COUNT(*) > 1) "
+            "ORDER BY id DESC"
+        ).fetchall()
+        keep: dict[tuple, tuple[int, str]] = {}
+        drop = []
+        for vid, uid, topic, items in dupes:
+            if (uid, topic) in keep:
+                kid, kitems = keep[(uid, topic)]
+                keep[(uid, topic)] = (kid, _merge_items(kitems.split("\n"), items))
+                drop.append(vid)
+            else:
+                keep[(uid, topic)] = (vid, items or "")
+        for vid, items in keep.values():
+            conn.execute(VocabTargetORM.__table__.update().where(VocabTargetORM.id == vid).values(items=items))
+        if drop:
+            conn.execute(VocabTargetORM.__table__.delete().where(VocabTargetORM.id.in_(drop)))
+        conn.exec_driver_sql(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_error_patterns_user_tag ON error_patterns (user_id, tag)"
+        )
+        conn.exec_driver_sql(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_vocab_targets_user_topic ON vocab_targets (user_id, topic)"
+        )
@@ -0,0 +1,115 @@
+"""
+Rollup skor harian per user (tabel daily_score_rollups): jumlah sesi, jumlah skor per dimensi,
+total menit. Diperbarui save_session dalam transaksi yang sama; dashboard membaca tabel ini
+sehingga biayanya O(hari), bukan O(sesi).
+
+Backfill / bangun ulang dari riwayat sesi (dari folder backend/):
+  python -m app.rollups
+"""
+from sqlalchemy import select as sa_select, func, delete as sa_delete, literal
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal, dialect_insert
+from .models import DailyScoreRollupORM, SessionRecordORM
+
+_SUMS = {
+    "sum_overall":     "score_overall",
+    "sum_range":       "score_range",
+    "sum_accuracy":    "score_accuracy",
+    "sum_fluency":     "score_fluency",
+    "sum_coherence":   "score_coherence",
+    "sum_interaction": "score_interaction",
+}
+
+
+def add_session(db: Session, s: SessionRecordORM) -> None:
+    """Tambahkan satu sesi (sudah di-flush) ke rollup harinya. Tidak commit — ikut transaksi caller."""
+    values = {
+        "user_id":        s.user_id,
+        "day":            s.created_at.date(),
+        "sessions_count": 1,
+        **{col: float(getattr(s, attr) or 0.0) for col, attr in _SUMS.items()},
+        "total_min":      float(s.duration_min or 0.0),
+        "scenarios":      s.scenario,
+    }
+    insert = dialect_insert(db)
+    if insert is None:
+        row = db.execute(
+            sa_select(DailyScoreRollupORM)
+            .where(DailyScoreRollupORM.user_id == values["user_id"], DailyScoreRollupORM.day == values["day"])
+            .with_for_update()
+        ).scalar_one_or_none()
+        if row is None:
+            db.add(DailyScoreRollupORM(**values))
+            return
+        row.sessions_count += 1
+        for col in _SUMS:
+            setattr(row, col, getattr(row, col) + values[col])
+        row.total_min += values["total_min"]
+        row.scenarios  = f"{row.scenarios}\n{values['scenarios']}" if row.scenarios else values["scenarios"]
+        return
+
+    t    = DailyScoreRollupORM.__table__
+    stmt = insert(t).values(**values)
+    ex   = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "day"],
+        set_={
+            "sessions_count": t.c.sessions_count + ex.sessions_count,
+            **{col: t.c[col] + ex[col] for col in _SUMS},
+            "total_min":      t.c.total_min + ex.total_min,
+            "scenarios":      func.coalesce(t.c.scenarios + "\n", "") + ex.scenarios,
+        },
+    )
+    db.execute(stmt)
+
+
+def rebuild(db: Session) -> int:
+    """Bangun ulang seluruh rollup dari tabel sessions (INSERT ... SELECT ... GROUP BY). Return jumlah baris."""
+    s   = SessionRecordORM
+    day = func.date(s.created_at)
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import aggregate_order_by
+        scenarios = func.string_agg(aggregate_order_by(s.scenario, s.created_at), literal("\n"))
+        source    = s
+    else:
+        # group_concat SQLite mengikuti urutan baris masukan → urutkan di subquery
+        source    = (
+            sa_select(s.user_id, s.created_at, s.scenario, s.duration_min,
+                      *[getattr(s, attr).label(attr) for attr in _SUMS.values()])
+            .order_by(s.created_at, s.id)
+            .subquery()
+        )
+        s         = source.c
+        day       = func.date(s.created_at)
+        scenarios = func.group_concat(s.scenario, "\n")
+    select = (
+        sa_select(
+            s.user_id, day, func.count(),
+            *[func.sum(getattr(s, attr)) for attr in _SUMS.values()],
+            func.sum(func.coalesce(s.duration_min, 0.0)),
+            scenarios,
+        )
+        .select_from(source)
+        .group_by(s.user_id, day)
+    )
+    cols = ["user_id", "day", "sessions_count", *_SUMS, "total_min", "scenarios"]
+    db.execute(sa_delete(DailyScoreRollupORM))
+    db.execute(DailyScoreRollupORM.__table__.insert().from_select(cols, select))
+    db.commit()
+    return db.execute(sa_select(func.count()).select_from(DailyScoreRollupORM)).scalar_one()
+
+
+def backfill_if_empty() -> None:
+    """Startup: isi rollup dari riwayat kalau tabel baru dibuat (DB lama yang sudah punya sesi)."""
+    with SessionLocal() as db:
+        has_rollup  = db.execute(sa_select(DailyScoreRollupORM.id).limit(1)).first() is not None
+        has_session = db.execute(sa_select(SessionRecordORM.id).limit(1)).first() is not None
+        if has_session and not has_rollup:
+            n = rebuild(db)
+            print(f"[DB] daily_score_rollups backfilled: {n} row(s)", flush=True)
+
+
+if __name__ == "__main__":
+    with SessionLocal() as db:
+        print(f"[DB] daily_score_rollups rebuilt: {rebuild(db)} row(s)")
@@ -1,11 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, Body
-from sqlalchemy import select as sa_select, asc
+from sqlalchemy import select as sa_select, asc, func
 from sqlalchemy.orm import Session
 
-from ..database import get_db
-from ..models import UserORM, ScenarioORM, SessionRecordORM, ProfileORM
+from ..database import get_db, get_read_db
+from ..models import UserORM, ScenarioORM, SessionRecordORM, ProfileORM, DailyScoreRollupORM
 from ..schemas import ScenarioIn
-from ..auth import require_admin
+from ..auth import require_admin, forget_media_user
+from ..groq_keys import scheduler as groq_scheduler
+from ..piper_pool import pool as piper_pool
+from ..tts_cache import cache as tts_cache
+from .. import transcript_cache, agent_jobs, audio_archive, audio_serving
+from ..token_usage import meter as token_meter
 
 router = APIRouter(prefix="/admin")
 
@@ -42,6 +47,7 @@ def admin_update_user(
         if key in allowed:
             setattr(user, key, val)
     db.commit(); db.refresh(user)
+    forget_media_user(user.id)
     return {"ok": True, "user": {"id": user.id, "username": user.username,
                                   "role": user.role, "is_active": user.is_active}}
 
@@ -55,6 +61,84 @@ def admin_list_scenarios(
     return [{"id": r.id, "title": r.title, "description": r.description} for r in rows]
 
 
+@router.get("/groq/keys")
+def admin_groq_key_stats(
+    current_user: dict = Depends(require_admin),
+):
+    """Utilisasi per key Groq (budget dari header x-ratelimit-*) untuk menentukan ukuran pool."""
+    return groq_scheduler.stats()
+
+
+@router.get("/tts/pool")
+def admin_tts_pool_stats(
+    current_user: dict = Depends(require_admin),
+):
+    """Status worker Piper + rata-rata waktu antre vs waktu sintesis."""
+    return piper_pool.stats()
+
+
+@router.get("/tts/cache")
+def admin_tts_cache_stats(
+    current_user: dict = Depends(require_admin),
+):
+    return tts_cache.stats()
+
+
+@router.get("/transcribe/cache")
+def admin_transcript_cache_stats(
+    current_user: dict = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """Hit rate cache hasil Whisper (retry klip yang sama tidak dikirim ulang ke Groq)."""
+    return transcript_cache.stats(db)
+
+
+@router.get("/groq/tokens")
+def admin_groq_token_stats(
+    current_user: dict = Depends(require_admin),
+):
+    """Token prompt/completion/cached per jenis prompt (feedback penuh vs per-giliran)."""
+    return token_meter.stats()
+
+
+@router.get("/agent/jobs")
+def admin_agent_job_stats(
+    current_user: dict = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """Jumlah job reflect+plan per status + antrean worker."""
+    return agent_jobs.queue.stats(db)
+
+
+@router.get("/audio/archive")
+def admin_audio_archive_report(
+    current_user: dict = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """Dry-run compactor: byte yang bisa dihemat sekarang + total yang sudah diarsip."""
+    return {**audio_archive.compact(dry_run=True), "archived": audio_archive.totals(db)}
+
+
+@router.get("/audio/serving")
+def admin_audio_serving_stats(
+    current_user: dict = Depends(require_admin),
+):
+    """Byte audio terkirim per role/status (200/206/304) dan rata-rata per rater per sesi."""
+    return audio_serving.meter.stats()
+
+
+@router.post("/audio/archive/compact")
+def admin_audio_archive_compact(
+    current_user: dict = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """Jalankan compactor sekarang (tanpa menunggu interval AUDIO_ARCHIVE_INTERVAL_H). 409 kalau sedang jalan."""
+    report = audio_archive.compact(dry_run=False, wait=False)
+    if report is None:
+        raise HTTPException(status_code=409, detail="Compactor audio sedang berjalan")
+    return {**report, "archived": audio_archive.totals(db)}
+
+
 @router.patch("/sessions/{session_id}/rater-visibility")
 def toggle_rater_visibility(
     session_id: int,
@@ -110,84 +194,124 @@ def admin_delete_scenario(
     return {"ok": True}
 
 
-def _aggregate_by_date(sessions: list) -> list:
-    """Aggregate sessions by date (DD/MM format)"""
-    from collections import defaultdict
-    by_date = defaultdict(list)
-    for s in sessions:
-        date_key = s.created_at.strftime("%d/%m")
-        by_date[date_key].append(s)
+_TREND_LIMIT = 30   # sesi (view session) / hari aktif (view daily) terakhir per user di dashboard
 
-    result = []
-    for date_key in sorted(by_date.keys()):
-        day_sessions = by_date[date_key]
-        result.append({
-            "date": date_key,
-            "sessions_on_day": len(day_sessions),
-            "overall": round(sum(s.score_overall for s in day_sessions) / len(day_sessions), 2),
-            "range": round(sum(s.score_range for s in day_sessions) / len(day_sessions), 2),
-            "accuracy": round(sum(s.score_accuracy for s in day_sessions) / len(day_sessions), 2),
-            "fluency": round(sum(s.score_fluency for s in day_sessions) / len(day_sessions), 2),
-            "coherence": round(sum(s.score_coherence for s in day_sessions) / len(day_sessions), 2),
-            "interaction": round(sum(s.score_interaction for s in day_sessions) / len(day_sessions), 2),
-            "total_min": round(sum(s.duration_min or 0 for s in day_sessions), 1),
-            "scenarios": [s.scenario for s in day_sessions],
+
+def _recent_sessions_subq():
+    """N sesi terakhir per user — ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY created_at DESC)."""
+    rn = func.row_number().over(
+        partition_by=SessionRecordORM.user_id,
+        order_by=(SessionRecordORM.created_at.desc(), SessionRecordORM.id.desc()),
+    ).label("rn")
+    ranked = sa_select(
+        SessionRecordORM.id, SessionRecordORM.user_id, SessionRecordORM.created_at,
+        SessionRecordORM.scenario, SessionRecordORM.duration_min,
+        SessionRecordORM.score_overall, SessionRecordORM.score_range, SessionRecordORM.score_accuracy,
+        SessionRecordORM.score_fluency, SessionRecordORM.score_coherence, SessionRecordORM.score_interaction,
+        rn,
+    ).subquery()
+    return sa_select(ranked).where(ranked.c.rn <= _TREND_LIMIT).subquery()
+
+
+def _day_month(db: Session, col):
+    """Label 'DD/MM' dihitung di SQL — tidak perlu parse datetime per baris di Python."""
+    if db.get_bind().dialect.name == "postgresql":
+        return func.to_char(col, "DD/MM")
+    return func.strftime("%d/%m", col)
+
+
+def _session_trends(db: Session) -> tuple[dict, dict]:
+    """(trend per user, (jumlah sesi, total menit) per user) dalam satu query."""
+    s = _recent_sessions_subq()
+    rows = db.execute(
+        sa_select(s.c.user_id, s.c.scenario, s.c.duration_min, s.c.score_overall, s.c.score_range,
+                  s.c.score_accuracy, s.c.score_fluency, s.c.score_coherence, s.c.score_interaction,
+                  _day_month(db, s.c.created_at).label("day"))
+        .order_by(s.c.user_id, s.c.created_at, s.c.id)
+    ).all()
+    trends: dict[int, list] = {}
+    totals: dict[int, list] = {}
+    for uid, scenario, dur, o, ra, ac, fl, co, it, day in rows:
+        t = trends.setdefault(uid, [])
+        t.append({
+            "session":  len(t) + 1,
+            "overall":  round(o, 2),
+            "range":    round(ra, 2),
+            "accuracy": round(ac, 2),
+            "fluency":  round(fl, 2),
+            "coherence":round(co, 2),
+            "interaction":round(it, 2),
+            "date":     day,
+            "scenario": scenario,
         })
-    return result
+        tot = totals.setdefault(uid, [0, 0.0])
+        tot[0] += 1
+        tot[1] += dur or 0
+    return trends, totals
+
+
+def _daily_trends(db: Session) -> tuple[dict, dict]:
+    """Trend harian dibaca dari daily_score_rollups (N hari aktif terakhir per user) — O(hari)."""
+    r  = DailyScoreRollupORM
+    rn = func.row_number().over(partition_by=r.user_id, order_by=r.day.desc()).label("rn")
+    ranked = sa_select(r, rn).subquery()
+    rows = db.execute(
+        sa_select(ranked).where(ranked.c.rn <= _TREND_LIMIT).order_by(ranked.c.user_id, ranked.c.day)
+    ).all()
+    trends: dict[int, list] = {}
+    totals: dict[int, list] = {}
+    for x in rows:
+        n = x.sessions_count or 1
+        trends.setdefault(x.user_id, []).append({
+            "date":            x.day.strftime("%d/%m"),
+            "sessions_on_day": x.sessions_count,
+            "overall":         round(x.sum_overall / n, 2),
+            "range":           round(x.sum_range / n, 2),
+            "accuracy":        round(x.sum_accuracy / n, 2),
+            "fluency":         round(x.sum_fluency / n, 2),
+            "coherence":       round(x.sum_coherence / n, 2),
+            "interaction":     round(x.sum_interaction / n, 2),
+            "total_min":       round(x.total_min or 0, 1),
+            "scenarios":       x.scenarios.split("\n") if x.scenarios else [],
+        })
+        tot = totals.setdefault(x.user_id, [0, 0.0])
+        tot[0] += x.sessions_count
+        tot[1] += x.total_min or 0
+    return trends, totals
 
 
 @router.get("/analytics")
 def admin_analytics(
     view: str = "session",  # 'session' or 'daily'
     current_user: dict = Depends(require_admin),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),   # engine baca — tidak merebut pool endpoint tulis
 ):
-    users = db.execute(
-        sa_select(UserORM).where(UserORM.role == "user").order_by(asc(UserORM.id))
-    ).scalars().all()
+    # Profil pertama per user (id terkecil) di-join sekaligus — bukan satu query per user
+    first_prof = (
+        sa_select(ProfileORM.user_id, func.min(ProfileORM.id).label("pid"))
+        .group_by(ProfileORM.user_id)
+        .subquery()
+    )
+    rows = db.execute(
+        sa_select(UserORM, ProfileORM)
+        .outerjoin(first_prof, first_prof.c.user_id == UserORM.id)
+        .outerjoin(ProfileORM, ProfileORM.id == first_prof.c.pid)
+        .where(UserORM.role == "user")
+        .order_by(asc(UserORM.id))
+    ).all()
 
-    result = []
-    for u in users:
-        prof_rows = db.execute(
-            sa_select(ProfileORM).where(ProfileORM.user_id == u.id).order_by(asc(ProfileORM.id))
-        ).scalars().all()
-        prof = prof_rows[0] if prof_rows else None
-
-        sessions = db.execute(
-            sa_select(SessionRecordORM)
-            .where(SessionRecordORM.user_id == u.id)
-            .order_by(asc(SessionRecordORM.created_at))
-            .limit(30)
-        ).scalars().all()
-
-        total_min = sum(s.duration_min or 0 for s in sessions)
-
-        # Build score_trend based on view parameter
-        if view == "daily":
-            score_trend = _aggregate_by_date(sessions)
-        else:  # default 'session'
-            score_trend = [
-                {
-                    "session":  i + 1,
-                    "overall":  round(s.score_overall, 2),
-                    "range":    round(s.score_range, 2),
-                    "accuracy": round(s.score_accuracy, 2),
-                    "fluency":  round(s.score_fluency, 2),
-                    "coherence":round(s.score_coherence, 2),
-                    "interaction":round(s.score_interaction, 2),
-                    "date":     s.created_at.strftime("%d/%m"),
-                    "scenario": s.scenario,
-                }
-                for i, s in enumerate(sessions)
-            ]
+    trends, totals = _daily_trends(db) if view == "daily" else _session_trends(db)
 
+    result = []
+    for u, prof in rows:
+        count, total_min = totals.get(u.id, (0, 0.0))
         result.append({
             "user_id":       u.id,
             "username":      u.username,
             "full_name":     u.full_name or u.username,
             "is_active":     u.is_active,
             "last_login":    u.last_login_at.isoformat() if u.last_login_at else None,
-            "sessions_count": len(sessions),
+            "sessions_count": count,
             "total_min":     round(total_min, 1),
             "level":         prof.level if prof else 1,
             "target_cefr":   prof.target_cefr if prof else "B1",
@@ -200,7 +324,7 @@ def admin_analytics(
                 "interaction": round(prof.ma_interaction, 2) if prof else 3.0,
                 "overall":   round(prof.ma_overall, 2)   if prof else 3.0,
             },
-            "score_trend": score_trend,
+            "score_trend": trends.get(u.id, []),
         })
 
     result.sort(key=lambda x: x["ma"]["overall"], reverse=True)
@@ -1,13 +1,11 @@
-import json
-from datetime import datetime
-
 from fastapi import APIRouter, Depends
 from fastapi.responses import JSONResponse
 from sqlalchemy import select as sa_select, asc, desc, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ..database import get_db
-from ..models import PlanORM, PlanItemORM, ErrorPatternORM, VocabTargetORM, SessionRecordORM
+from ..database import get_db, get_async_db
+from ..models import PlanORM, PlanItemORM, SessionRecordORM, AgentJobORM
 from ..schemas import CompleteIn, ReflectIn, ReflectOut, PlanIn, PlanGenOut
 from ..auth import require_user
 from ..utils import (
@@ -16,18 +14,13 @@ from ..utils import (
     _suggest_scenario_for_focus,
     _make_prompt,
     _make_agent_opening,
-    _groq_json_chat,
 )
+from ..agent_jobs import reflect_session, plan_next_session, job_to_dict
 
 router = APIRouter(prefix="/agent")
 
 
-@router.get("/next")
-def agent_next(
-    current_user: dict = Depends(require_user),
-    db: Session = Depends(get_db),
-):
-    user_id      = int(current_user["sub"])
+def _next_item(db: Session, user_id: int) -> dict:
     prof         = ensure_profile(db, user_id=user_id)
     focus        = _weak_focus_from_profile(prof)
     scenario     = _suggest_scenario_for_focus(focus)
@@ -72,6 +65,20 @@ def agent_next(
     }
 
 
+def _session_owner(db: Session, session_id: int) -> int | None:
+    return db.execute(
+        sa_select(SessionRecordORM.user_id).where(SessionRecordORM.id == session_id)
+    ).scalar_one_or_none()
+
+
+@router.get("/next")
+async def agent_next(
+    current_user: dict = Depends(require_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await db.run_sync(_next_item, int(current_user["sub"]))
+
+
 @router.post("/complete")
 def agent_complete(
     payload: CompleteIn,
@@ -90,117 +97,40 @@ def agent_complete(
 async def agent_reflect(
     payload: ReflectIn,
     current_user: dict = Depends(require_user),
-    db: Session = Depends(get_db),
 ):
     user_id = int(current_user["sub"])
-    system  = {
-        "role": "system",
-        "content": (
-            "You are an English speaking coach. Return STRICT JSON only.\n"
-            "IMPORTANT: Write all text fields in Bahasa Indonesia EXCEPT vocab_targets.items (keep English words).\n"
-            '{"summary":"3-5 kalimat ringkasan sesi dalam Bahasa Indonesia",'
-            '"error_patterns":[{"tag":"kategori singkat","description":"deskripsi kesalahan dalam Bahasa Indonesia","examples":["kutipan dari percakapan"],"weight":0}],'
-            '"vocab_targets":[{"topic":"topik dalam Bahasa Indonesia","items":["english_word1","english_word2"]}],'
-            '"objectives_next":["tujuan latihan berikutnya dalam Bahasa Indonesia"]}\nNo extra text.'
-        ),
-    }
-    msgs     = [m.dict() for m in payload.messages][-60:]
-    user_msg = {"role": "user", "content": json.dumps({"dialogue": msgs, "feedback": payload.feedback}, ensure_ascii=False)}
-    data     = await _groq_json_chat([system, user_msg], temperature=0.2)
-    out      = {
-        "summary":         (data.get("summary") or "")[:2000],
-        "error_patterns":  data.get("error_patterns", [])[:5],
-        "vocab_targets":   data.get("vocab_targets", [])[:2],
-        "objectives_next": data.get("objectives_next", [])[:5],
-    }
-
-    for ep in out["error_patterns"]:
-        tag = (ep.get("tag") or "misc").strip()[:64]
-        row = db.execute(
-            sa_select(ErrorPatternORM).where(ErrorPatternORM.user_id == user_id, ErrorPatternORM.tag == tag)
-        ).scalar_one_or_none()
-        if not row:
-            row = ErrorPatternORM(
-                user_id=user_id, tag=tag,
-                description=(ep.get("description") or "")[:2000],
-                examples="\n".join(ep.get("examples", [])[:5]),
-                weight=float(ep.get("weight") or 1.0),
-            )
-        else:
-            row.description = (ep.get("description") or row.description)[:2000]
-            if ep.get("examples"): row.examples = "\n".join(ep.get("examples", [])[:5])
-            try: row.weight = float(ep.get("weight") or row.weight)
-            except: pass
-            row.last_seen_at = datetime.utcnow()
-        db.add(row)
-
-    for vt in out["vocab_targets"]:
-        db.add(VocabTargetORM(
-            user_id=user_id,
-            topic=(vt.get("topic") or "general")[:128],
-            items="\n".join(vt.get("items", [])[:10]),
-            due_next=True,
-        ))
-    db.commit()
-    return out
+    msgs    = [m.dict() for m in payload.messages]
+    return await reflect_session(user_id, msgs, payload.feedback)
 
 
 @router.post("/plan", response_model=PlanGenOut)
 async def agent_plan(
     payload: PlanIn,
     current_user: dict = Depends(require_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     user_id = int(current_user["sub"])
 
     # If session_id is provided, validate it exists and belongs to this user
     if payload.session_id is not None:
-        session = db.get(SessionRecordORM, payload.session_id)
-        if not session or session.user_id != user_id:
+        owner = await db.run_sync(_session_owner, payload.session_id)
+        if owner != user_id:
             return JSONResponse({"error": "session_not_found"}, status_code=404)
 
-    prof    = ensure_profile(db, user_id=user_id)
-    profile = payload.profile or {
-        "level": prof.level,
-        "ma": {
-            "range":     prof.ma_range,
-            "accuracy":  prof.ma_accuracy,
-            "fluency":   prof.ma_fluency,
-            "coherence": prof.ma_coherence,
-            "interaction": prof.ma_interaction,
-            "overall":   prof.ma_overall,
-        },
-    }
-    context = {
-        "profile":         profile,
-        "error_patterns":  payload.error_patterns,
-        "objectives_next": payload.objectives_next,
-        "vocab_targets":   payload.vocab_targets,
-    }
-    system = {
-        "role": "system",
-        "content": (
-            "You are a session planner. Produce JSON only.\n"
-            "IMPORTANT: objectives and rubric in Bahasa Indonesia. starter_turns in English (practice prompts).\n"
-            '{"scenario":"scenario name in English","level":1..5,'
-            '"objectives":["tujuan dalam Bahasa Indonesia"],'
-            '"rubric":["kriteria penilaian dalam Bahasa Indonesia"],'
-            '"starter_turns":["opening question in English"],'
-            '"target_time_min":5}\n'
-            "No extra text."
-        ),
-    }
-    plan = await _groq_json_chat(
-        [system, {"role": "user", "content": json.dumps(context, ensure_ascii=False)}],
-        temperature=0.3,
+    return await plan_next_session(
+        user_id, payload.error_patterns, payload.objectives_next, payload.vocab_targets,
+        profile=payload.profile,
     )
-    prof.last_objectives = "\n".join((plan.get("objectives") or [])[:6])
-    db.add(prof); db.commit()
-    return {
-        "scenario":        plan.get("scenario", "Daily Conversation"),
-        "level":           int(plan.get("level", profile.get("level", 2))),
-        "objectives":      (plan.get("objectives") or [])[:6],
-        "rubric":          (plan.get("rubric") or ["Speak clearly", "Use correct tense"])[:6],
-        "starter_turns":   (plan.get("starter_turns") or ["Tell me about your day."])[:3],
-        "target_time_min": int(plan.get("target_time_min", 7)),
-    }
+
+
+@router.get("/jobs/{job_id}")
+def agent_job_status(
+    job_id: int,
+    current_user: dict = Depends(require_user),
+    db: Session = Depends(get_db),
+):
+    """Status job reflect+plan yang dibuat saat sesi disimpan (poll sampai status done/failed)."""
+    job = db.get(AgentJobORM, job_id)
+    if not job or (job.user_id != int(current_user["sub"]) and current_user["role"] != "admin"):
+        return JSONResponse({"error": "job_not_found"}, status_code=404)
+    return job_to_dict(job)
@@ -3,15 +3,17 @@ from datetime import datetime, timedelta
 
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy import select as sa_select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from ..config import REFRESH_TOKEN_EXP
-from ..database import get_db
+from ..database import get_db, get_async_db, run_write
 from ..models import UserORM, RefreshTokenORM
 from ..schemas import RegisterIn, LoginIn, TokenOut, RefreshIn, UserOut
 from ..auth import (
     hash_password, verify_password,
-    create_access_token, create_refresh_token,
+    create_access_token, create_refresh_token, create_media_token,
     verify_token, get_current_user,
 )
 from ..limiter import limiter
@@ -39,16 +41,11 @@ def register(payload: RegisterIn, db: Session = Depends(get_db)):
                    full_name=user.full_name, role=user.role, is_active=user.is_active)
 
 
-@router.post("/login", response_model=TokenOut)
-@limiter.limit("5/minute")
-def login(request: Request, payload: LoginIn, db: Session = Depends(get_db)):
-    user = db.execute(sa_select(UserORM).where(UserORM.username == payload.username)).scalar_one_or_none()
-    # Pesan error generik (OWASP: jangan reveal apakah username/password yang salah)
-    if not user or not verify_password(payload.password, user.hashed_password):
-        raise HTTPException(status_code=401, detail="Username atau password salah")
-    if not user.is_active:
-        raise HTTPException(status_code=403, detail="Akun dinonaktifkan. Hubungi administrator.")
+def _find_user(db: Session, username: str) -> UserORM | None:
+    return db.execute(sa_select(UserORM).where(UserORM.username == username)).scalar_one_or_none()
+
 
+def _issue_tokens(db: Session, user: UserORM) -> TokenOut:
     user.last_login_at = datetime.utcnow()
     access_token  = create_access_token(user.id, user.username, user.role)
     refresh_token = create_refresh_token(user.id, user.username)
@@ -65,12 +62,24 @@ def login(request: Request, payload: LoginIn, db: Session = Depends(get_db)):
                     role=user.role, username=user.username)
 
 
-@router.post("/refresh", response_model=TokenOut)
-def refresh_token_endpoint(payload: RefreshIn, db: Session = Depends(get_db)):
-    data    = verify_token(payload.refresh_token, expected_type="refresh")
+@router.post("/login", response_model=TokenOut)
+@limiter.limit("5/minute")
+async def login(request: Request, payload: LoginIn, db: AsyncSession = Depends(get_async_db)):
+    user = await db.run_sync(_find_user, payload.username)
+    # Pesan error generik (OWASP: jangan reveal apakah username/password yang salah).
+    # bcrypt murni CPU → thread pool, jangan memblok event loop
+    if not user or not await run_in_threadpool(verify_password, payload.password, user.hashed_password):
+        raise HTTPException(status_code=401, detail="Username atau password salah")
+    if not user.is_active:
+        raise HTTPException(status_code=403, detail="Akun dinonaktifkan. Hubungi administrator.")
+    return await run_write(db, _issue_tokens, user)
+
+
+def _rotate_refresh(db: Session, refresh_token: str) -> TokenOut:
+    data    = verify_token(refresh_token, expected_type="refresh")
     user_id = int(data["sub"])
 
-    token_hash = hashlib.sha256(payload.refresh_token.encode()).hexdigest()
+    token_hash = hashlib.sha256(refresh_token.encode()).hexdigest()
     rt_row = db.execute(
         sa_select(RefreshTokenORM).where(
             RefreshTokenORM.token_hash == token_hash,
@@ -101,6 +110,11 @@ def refresh_token_endpoint(payload: RefreshIn, db: Session = Depends(get_db)):
                     role=user.role, username=user.username)
 
 
+@router.post("/refresh", response_model=TokenOut)
+async def refresh_token_endpoint(payload: RefreshIn, db: AsyncSession = Depends(get_async_db)):
+    return await run_write(db, _rotate_refresh, payload.refresh_token)
+
+
 @router.post("/logout")
 def logout(payload: RefreshIn, db: Session = Depends(get_db)):
     token_hash = hashlib.sha256(payload.refresh_token.encode()).hexdigest()
@@ -120,3 +134,10 @@ def me(current_user: dict = Depends(get_current_user), db: Session = Depends(get
         raise HTTPException(status_code=404, detail="User tidak ditemukan")
     return UserOut(id=user.id, username=user.username, email=user.email,
                    full_name=user.full_name, role=user.role, is_active=user.is_active)
+
+
+@router.get("/media-token")
+def media_token(current_user: dict = Depends(get_current_user)):
+    """Token untuk URL audio /uploads/audio/<nama>?token=... (rater/admin memutar rekaman)."""
+    token, exp = create_media_token(int(current_user["sub"]))
+    return {"media_token": token, "expires_at": exp}
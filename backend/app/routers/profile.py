@@ -1,20 +1,16 @@
 from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ..database import get_db
+from ..database import get_async_db
 from ..auth import require_user
 from ..utils import ensure_profile
 
 router = APIRouter()
 
 
-@router.get("/profile")
-def get_profile(
-    current_user: dict = Depends(require_user),
-    db: Session = Depends(get_db),
-):
-    user_id = int(current_user["sub"])
-    prof    = ensure_profile(db, user_id=user_id)
+def _profile(db: Session, user_id: int) -> dict:
+    prof = ensure_profile(db, user_id=user_id)
     return {
         "user_id":        prof.user_id,
         "level":          prof.level,
@@ -29,3 +25,11 @@ def get_profile(
             "overall":   round(prof.ma_overall, 2),
         },
     }
+
+
+@router.get("/profile")
+async def get_profile(
+    current_user: dict = Depends(require_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await db.run_sync(_profile, int(current_user["sub"]))
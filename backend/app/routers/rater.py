@@ -1,13 +1,16 @@
+import json
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select as sa_select, desc
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select as sa_select, exists
+from sqlalchemy.orm import Session, load_only
 
 from ..database import get_db
-from ..models import SessionRecordORM, RaterAssessmentORM
+from ..models import SessionRecordORM, RaterAssessmentORM, SessionTurnORM
 from ..schemas import RaterAssessmentIn
 from ..auth import require_rater
+from ..pagination import keyset_page
+from .. import validation_stats, session_turns
 
 router = APIRouter(prefix="/rater")
 
@@ -17,48 +20,107 @@ def _rater_id_from_role(role: str) -> int:
     return 1 if role == "rater1" else 2
 
 
+# Kolom ringkasan — blob JSON percakapan/manifest tidak ikut dimuat untuk daftar
+_SUMMARY_COLUMNS = (
+    SessionRecordORM.id, SessionRecordORM.scenario, SessionRecordORM.audio_path, SessionRecordORM.audio_status,
+    SessionRecordORM.turn_count, SessionRecordORM.duration_min, SessionRecordORM.created_at,
+)
+
+
 @router.get("/sessions")
 def rater_list_sessions(
+    response: Response,
     current_user: dict = Depends(require_rater),
     db: Session = Depends(get_db),
     limit: int = 100,
+    cursor: str | None = None,
 ):
-    """Sessions untuk rater — skor AI disembunyikan, status rater lain juga disembunyikan."""
+    """
+    Ringkasan sesi untuk rater — skor AI & status rater lain disembunyikan. Turn, transkrip
+    dan audio per sesi diambil lewat /rater/sessions/{id}/bundle saat sesi dibuka.
+    Keyset pagination: kirim `cursor` dari header X-Next-Cursor untuk halaman berikutnya.
+    """
     my_id = _rater_id_from_role(current_user.get("role", "rater1"))
 
-    # Tampilkan sesi yang punya audio apapun: turn-by-turn (full_audio_json) atau gabungan lama (audio_path)
-    sessions = db.execute(
-        sa_select(SessionRecordORM)
-        .where(
-            ((SessionRecordORM.full_audio_json.isnot(None)) |
-             (SessionRecordORM.audio_path.isnot(None))) &
+    # Tampilkan sesi yang punya audio apapun: turn-by-turn (session_turns) atau gabungan lama (audio_path)
+    has_turn_audio = exists().where(
+        SessionTurnORM.session_id == SessionRecordORM.id, SessionTurnORM.audio_path.isnot(None)
+    )
+    sessions = keyset_page(
+        db,
+        sa_select(SessionRecordORM).options(load_only(*_SUMMARY_COLUMNS)).where(
+            (has_turn_audio | (SessionRecordORM.audio_path.isnot(None))) &
             (SessionRecordORM.rater_visible == True)
+        ),
+        SessionRecordORM, cursor, limit, response,
+    )
+
+    # Satu query untuk status penilaian rater ini di seluruh halaman
+    done = set(db.execute(
+        sa_select(RaterAssessmentORM.session_id).where(
+            RaterAssessmentORM.session_id.in_([s.id for s in sessions]),
+            RaterAssessmentORM.rater_id   == my_id,
         )
-        .order_by(desc(SessionRecordORM.created_at))
-        .limit(limit)
-    ).scalars().all()
-
-    result = []
-    for s in sessions:
-        my_assessment = db.execute(
-            sa_select(RaterAssessmentORM).where(
-                RaterAssessmentORM.session_id == s.id,
-                RaterAssessmentORM.rater_id   == my_id,
-            )
-        ).scalar_one_or_none()
-
-        result.append({
+    ).scalars().all()) if sessions else set()
+    # Sesi dengan klip per turn — turn_count juga menghitung turn teks tanpa audio
+    with_turn_audio = set(db.execute(
+        sa_select(SessionTurnORM.session_id).where(
+            SessionTurnORM.session_id.in_([s.id for s in sessions]),
+            SessionTurnORM.audio_path.isnot(None),
+        ).distinct()
+    ).scalars().all()) if sessions else set()
+
+    return [
+        {
             "id":               s.id,
             "scenario":         s.scenario,
-            "audio_path":       s.audio_path,
-            "full_audio_json":  s.full_audio_json,
-            "full_text_json":   s.full_text_json,   # [{role, content}] transkrip teks percakapan
+            "has_audio":        s.audio_path is not None or s.id in with_turn_audio,
+            "audio_status":     s.audio_status,
+            "turn_count":       s.turn_count,
             "duration_min":     s.duration_min,
             "created_at":       s.created_at.isoformat(),
             "my_rater_id":      my_id,
-            "my_rating_done":   my_assessment is not None,
-        })
-    return result
+            "my_rating_done":   s.id in done,
+        }
+        for s in sessions
+    ]
+
+
+@router.get("/sessions/{session_id}/bundle")
+def rater_session_bundle(
+    session_id: int,
+    current_user: dict = Depends(require_rater),
+    db: Session = Depends(get_db),
+):
+    """
+    Satu sesi untuk dinilai: ringkasan + manifest turn (teks & audio per turn sejajar, durasi).
+    Manifest dihitung saat sesi disimpan (sesi lama: backfill saat startup); endpoint ini hanya membaca.
+    """
+    my_id = _rater_id_from_role(current_user.get("role", "rater1"))
+    s = db.get(SessionRecordORM, session_id,
+               options=[load_only(*_SUMMARY_COLUMNS, SessionRecordORM.rater_visible, SessionRecordORM.turn_manifest_json)])
+    if not s or not s.rater_visible:
+        raise HTTPException(status_code=404, detail="Session tidak ditemukan")
+
+    manifest = json.loads(s.turn_manifest_json) if s.turn_manifest_json else session_turns.manifest(db, session_id)
+
+    done = db.execute(
+        sa_select(RaterAssessmentORM.id).where(
+            RaterAssessmentORM.session_id == session_id,
+            RaterAssessmentORM.rater_id   == my_id,
+        )
+    ).first() is not None
+    return {
+        "id":             session_id,
+        "scenario":       s.scenario,
+        "audio_path":     s.audio_path,       # file sesi gabungan (sesi lama / tanpa manifest audio)
+        "audio_status":   s.audio_status,
+        "duration_min":   s.duration_min,
+        "created_at":     s.created_at.isoformat(),
+        "my_rater_id":    my_id,
+        "my_rating_done": done,
+        "manifest":       manifest,
+    }
 
 
 @router.post("/assessments")
@@ -102,4 +164,5 @@ def rater_save_assessment(
             notes           = payload.notes,
         ))
     db.commit()
+    validation_stats.correlations.invalidate()
     return {"ok": True, "session_id": payload.session_id, "rater_id": rater_id}
@@ -1,67 +1,26 @@
 import json
-import wave
-import uuid as _uuid
 from math import fsum
-from pathlib import Path
 
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy import select as sa_select, func, desc
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from ..database import get_db
-from ..models import SessionRecordORM
+from ..database import get_db, get_async_db, run_write
+from ..models import SessionRecordORM, DailyScoreRollupORM
 from ..schemas import SaveSessionIn
 from ..auth import require_user
 from ..utils import ensure_profile, _clip1to5, _ma_update, _adjust_level
-
-_UPLOADS = Path(__file__).parent.parent.parent / "uploads" / "audio"
-
-
-def _concat_wav(filenames: list[str]) -> str | None:
-    """Gabungkan semua WAV turn menjadi satu file sesi penuh. Return filename baru."""
-    valid = [_UPLOADS / f for f in filenames if (_UPLOADS / f).exists()]
-    if not valid:
-        return None
-    if len(valid) == 1:
-        return valid[0].name
-
-    out_name = f"session_{_uuid.uuid4().hex[:12]}.wav"
-    out_path = _UPLOADS / out_name
-    try:
-        params, frames = None, []
-        for p in valid:
-            with wave.open(str(p), "rb") as wf:
-                if params is None:
-                    params = wf.getparams()
-                frames.append(wf.readframes(wf.getnframes()))
-        with wave.open(str(out_path), "wb") as wf:
-            wf.setparams(params)
-            for f in frames:
-                wf.writeframes(f)
-        return out_name
-    except Exception as e:
-        print(f"[AUDIO] concat failed: {e}")
-        return valid[-1].name  # fallback ke clip terakhir
+from .. import agent_jobs, rollups, session_audio, session_turns, turn_manifest
 
 router = APIRouter()
 
 
-@router.get("/sessions/recent")
-def get_recent_sessions(
-    limit: int = Query(10, ge=1, le=50),
-    current_user: dict = Depends(require_user),
-    db: Session = Depends(get_db),
-):
-    user_id = int(current_user["sub"])
-    if current_user["role"] == "admin":
-        query = sa_select(SessionRecordORM).order_by(desc(SessionRecordORM.created_at)).limit(limit)
-    else:
-        query = (
-            sa_select(SessionRecordORM)
-            .where(SessionRecordORM.user_id == user_id)
-            .order_by(desc(SessionRecordORM.created_at))
-            .limit(limit)
-        )
+def _recent_sessions(db: Session, user_id: int, is_admin: bool, limit: int) -> list[dict]:
+    query = sa_select(SessionRecordORM).order_by(desc(SessionRecordORM.created_at)).limit(limit)
+    if not is_admin:
+        query = query.where(SessionRecordORM.user_id == user_id)
     rows = db.execute(query).scalars().all()
     return [
         {"id": r.id, "scenario": r.scenario, "score_overall": r.score_overall or 0.0,
@@ -70,14 +29,20 @@ def get_recent_sessions(
     ]
 
 
-@router.post("/sessions")
-def save_session(
-    payload: SaveSessionIn,
+@router.get("/sessions/recent")
+async def get_recent_sessions(
+    limit: int = Query(10, ge=1, le=50),
     current_user: dict = Depends(require_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    # User id dari token (bukan dari payload — cegah IDOR)
-    user_id = int(current_user["sub"])
+    return await db.run_sync(
+        _recent_sessions, int(current_user["sub"]), current_user["role"] == "admin", limit
+    )
+
+
+def _save_session(db: Session, payload: SaveSessionIn, user_id: int, manifest: dict | None) -> dict:
+    # Klip audio per turn digabung worker session_audio setelah respons dikirim
+    parts   = session_audio.collect_parts(payload.audio_paths, payload.conversation_turns)
     overall = _clip1to5(fsum([
         payload.score_range, payload.score_accuracy, payload.score_fluency,
         payload.score_coherence, payload.score_interaction
@@ -94,13 +59,20 @@ def save_session(
         score_overall=overall,
         comment=(payload.comment or ""),
         duration_min=float(payload.duration_min or 0.0),
-        # Gabungkan semua user turn audio menjadi satu file; fallback ke audio_path lama
-        audio_path=_concat_wav(payload.audio_paths) if payload.audio_paths else payload.audio_path,
-        # Simpan urutan lengkap percakapan (user + AI) untuk diputar rater per turn
-        full_audio_json=json.dumps(payload.conversation_turns) if payload.conversation_turns else None,
-        full_text_json =json.dumps(payload.messages)           if payload.messages           else None,
+        # Tanpa klip turn: audio_path lama (satu file) dipakai langsung
+        audio_path=None if parts else payload.audio_path,
+        audio_status="pending" if parts else ("ready" if payload.audio_path else None),
+        audio_parts_json=json.dumps(parts) if parts else None,
+        # Percakapan (user + AI) disimpan sekali sebagai manifest + baris session_turns;
+        # full_audio_json / full_text_json hanya ada di sesi lama (sumber backfill)
+        turn_manifest_json=json.dumps(manifest) if manifest else None,
+        turn_count=manifest["turn_count"] if manifest else None,
     )
-    db.add(row); db.commit(); db.refresh(row)
+    db.add(row); db.flush()
+    rollups.add_session(db, row)   # rollup harian ikut transaksi yang sama
+    if manifest:
+        session_turns.write(db, row.id, manifest["turns"])
+    db.commit(); db.refresh(row)
 
     prof = ensure_profile(db, user_id=user_id)
     old_count = prof.sessions_count
@@ -114,8 +86,29 @@ def save_session(
     _adjust_level(prof)
     db.add(prof); db.commit(); db.refresh(prof)
 
+    # Reflect + plan jalan di background — halaman pasca-sesi cukup poll /agent/jobs/{id}
+    job = None
+    if payload.messages and any(m.get("role") == "user" for m in payload.messages):
+        job = agent_jobs.queue.enqueue(db, user_id, row.id, {
+            "messages": [m for m in payload.messages if m.get("role") != "system"],
+            "feedback": {
+                "range":       row.score_range,
+                "accuracy":    row.score_accuracy,
+                "fluency":     row.score_fluency,
+                "coherence":   row.score_coherence,
+                "interaction": row.score_interaction,
+                "overall":     row.score_overall,
+                "comment":     row.comment,
+            },
+        })
+
+    if parts:
+        session_audio.assembler.schedule(row.id)
+
     return {
         "id": row.id, "saved": True,
+        "agent_job_id": job.id if job else None,
+        "audio_status": row.audio_status,
         "profile": {
             "level": prof.level,
             "ma": {
@@ -131,24 +124,35 @@ def save_session(
     }
 
 
+@router.post("/sessions")
+async def save_session(
+    payload: SaveSessionIn,
+    current_user: dict = Depends(require_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # Manifest turn untuk bundle rater — sekali di sini, bukan di setiap buka sesi. Membaca header
+    # setiap klip (stat + wave.open) → di thread pool, bukan di dalam run_write (greenlet di event loop
+    # yang memegang gate tulis SQLite)
+    manifest = await run_in_threadpool(turn_manifest.build, payload.conversation_turns, payload.messages) \
+        if payload.conversation_turns or payload.messages else None
+    # User id dari token (bukan dari payload — cegah IDOR)
+    return await run_write(db, _save_session, payload, int(current_user["sub"]), manifest)
+
+
 @router.get("/sessions/stats")
 def sessions_stats(
     current_user: dict = Depends(require_user),
     db: Session = Depends(get_db),
 ):
+    # Dibaca dari rollup harian — O(hari), bukan O(sesi)
     user_id = int(current_user["sub"])
-    if current_user["role"] == "admin":
-        total_min      = db.execute(sa_select(func.coalesce(func.sum(SessionRecordORM.duration_min), 0.0))).scalar_one()
-        total_sessions = db.execute(sa_select(func.count(SessionRecordORM.id))).scalar_one()
-    else:
-        total_min      = db.execute(
-            sa_select(func.coalesce(func.sum(SessionRecordORM.duration_min), 0.0))
-            .where(SessionRecordORM.user_id == user_id)
-        ).scalar_one()
-        total_sessions = db.execute(
-            sa_select(func.count(SessionRecordORM.id))
-            .where(SessionRecordORM.user_id == user_id)
-        ).scalar_one()
+    query   = sa_select(
+        func.coalesce(func.sum(DailyScoreRollupORM.total_min), 0.0),
+        func.coalesce(func.sum(DailyScoreRollupORM.sessions_count), 0),
+    )
+    if current_user["role"] != "admin":
+        query = query.where(DailyScoreRollupORM.user_id == user_id)
+    total_min, total_sessions = db.execute(query).one()
 
     total_hours = float(total_min or 0.0) / 60.0
     return {
@@ -0,0 +1,131 @@
+import re
+from pathlib import Path
+
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+
+from ..auth import get_media_user
+from ..config import AUDIO_ACCEL_REDIRECT
+from ..database import get_read_db
+from .. import audio_archive, audio_serving
+
+# Pengganti StaticFiles("/uploads"): file mentah dilayani langsung, file yang sudah masuk
+# tier arsip (audio_archive) dilayani dari archive/ atau dipotong dari file sesi gabungan.
+# Akses dicek per role (audio_serving.access); token lewat header Bearer atau ?token= (media token).
+# ETag + Cache-Control (immutable untuk nama content-addressed), 304, Range/206 untuk seek <audio>.
+router = APIRouter(prefix="/uploads", tags=["uploads"])
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """Range tunggal `bytes=a-b` / `bytes=a-` / `bytes=-n` → (start, end) inklusif.
+    None = kirim seluruh file; ValueError = tidak bisa dipenuhi (416)."""
+    m = _RANGE_RE.match(header.strip()) if header else None
+    if not m or m.groups() == ("", ""):
+        return None   # multi-range / format lain → abaikan, kirim 200 penuh
+    first, last = m.groups()
+    if first == "":
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        raise ValueError("unsatisfiable")
+    return start, end
+
+
+class FileRangeResponse(Response):
+    """Kirim [start, start+length) dari file. Server ASGI dengan ekstensi
+    `http.response.zerocopysend` mendapat file descriptor (sendfile di kernel);
+    selain itu dibaca per chunk di thread."""
+
+    chunk_size = 256 * 1024
+
+    def __init__(self, path: Path, start: int, length: int, status_code: int, headers: dict,
+                 media_type: str, head: bool = False):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.path, self.start, self.length, self.head = path, start, length, head
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.head or self.length <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as f:
+                await send({"type": "http.response.zerocopysend", "file": f,
+                            "offset": self.start, "count": self.length, "more_body": False})
+            return
+        async with await anyio.open_file(self.path, mode="rb") as f:
+            await f.seek(self.start)
+            remaining = self.length
+            while remaining > 0:
+                chunk = await f.read(min(self.chunk_size, remaining))
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk,
+                            "more_body": remaining > 0 and bool(chunk)})
+                if not chunk:
+                    break
+
+
+@router.api_route("/audio/{name}", methods=["GET", "HEAD"])
+def get_audio(
+    name: str,
+    request: Request,
+    current_user: dict = Depends(get_media_user),
+    db: Session = Depends(get_read_db),
+):
+    if not audio_archive.safe_name(name):
+        raise HTTPException(status_code=404, detail="Audio tidak ditemukan")
+    allowed, session_id = audio_serving.access(db, current_user, name)
+    if not allowed:
+        raise HTTPException(status_code=403, detail="Akses audio ditolak")
+    found = audio_archive.resolve(name)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Audio tidak ditemukan")
+    data, media_type = found
+
+    etag    = audio_archive.segment_etag(data) if isinstance(data, bytes) else audio_serving.etag_for(data)
+    size    = len(data) if isinstance(data, bytes) else data.stat().st_size
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag":          etag,
+        "Cache-Control": audio_serving.CACHE_IMMUTABLE if audio_serving.is_content_addressed(name)
+                         else audio_serving.CACHE_DEFAULT,
+    }
+    if audio_serving.etag_matches(request.headers.get("if-none-match"), etag):
+        audio_serving.meter.record(current_user, session_id, 304, 0)
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range     = request.headers.get("if-range")
+    if if_range is not None and if_range.strip() != etag:
+        range_header = None   # representasi berubah (mis. diarsip) → kirim utuh
+    try:
+        rng = parse_range(range_header, size)
+    except ValueError:
+        audio_serving.meter.record(current_user, session_id, 416, 0)
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    status, start, end = 200, 0, size - 1
+    if rng is not None:
+        status, (start, end) = 206, rng
+    length = end - start + 1
+    head   = request.method == "HEAD"
+    audio_serving.meter.record(current_user, session_id, status, 0 if head else length)
+
+    if AUDIO_ACCEL_REDIRECT and isinstance(data, Path):
+        # nginx melayani file (sendfile + Range) dari location internal; header cache dari sini
+        rel = data.relative_to(audio_archive._AUDIO_DIR).as_posix()
+        return Response(headers={**headers, "X-Accel-Redirect": f"{AUDIO_ACCEL_REDIRECT.rstrip('/')}/{rel}"},
+                        media_type=media_type)
+
+    if rng is not None:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(length)
+    if isinstance(data, bytes):
+        return Response(b"" if head else data[start:end + 1], status_code=status,
+                        headers=headers, media_type=media_type)
+    return FileRangeResponse(data, start, length, status, headers, media_type, head=head)
@@ -1,41 +1,56 @@
-from sqlalchemy import select as sa_select, desc
-from sqlalchemy.orm import Session
-from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select as sa_select
+from sqlalchemy.orm import Session, load_only
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import JSONResponse
 from datetime import datetime
 
-from ..database import get_db
+from ..database import get_db, get_read_db
 from ..models import SessionRecordORM, RaterAssessmentORM
 from ..schemas import RaterAssessmentIn, SessionForRatingOut
 from ..auth import require_admin
+from ..pagination import keyset_page
+from .. import validation_stats, validation_bootstrap
 
 router = APIRouter(prefix="/admin/validation")
 
 
 @router.get("/sessions")
 def list_sessions_for_rating(
+    response: Response,
     current_user: dict = Depends(require_admin),
     db: Session = Depends(get_db),
     limit: int = 100,
+    cursor: str | None = None,
 ):
-    """List sessions available for rater assessment."""
-    sessions = db.execute(
-        sa_select(SessionRecordORM)
-        .where(SessionRecordORM.audio_path.isnot(None))
-        .order_by(desc(SessionRecordORM.created_at))
-        .limit(limit)
-    ).scalars().all()
-
-    result = []
-    for s in sessions:
-        # Get rater assessments for this session
+    """List sessions available for rater assessment (keyset pagination via X-Next-Cursor)."""
+    sessions = keyset_page(
+        db,
+        # audio_status pending: audio gabungan sedang dirakit worker, sebentar lagi ada audio_path.
+        # Hanya kolom yang dikirim — blob percakapan/manifest tidak dimuat
+        sa_select(SessionRecordORM).options(load_only(
+            SessionRecordORM.id, SessionRecordORM.user_id, SessionRecordORM.scenario,
+            SessionRecordORM.audio_path, SessionRecordORM.audio_status, SessionRecordORM.duration_min,
+            SessionRecordORM.created_at, SessionRecordORM.rater_visible,
+            SessionRecordORM.score_range, SessionRecordORM.score_accuracy, SessionRecordORM.score_fluency,
+            SessionRecordORM.score_coherence, SessionRecordORM.score_interaction, SessionRecordORM.score_overall,
+        )).where(
+            SessionRecordORM.audio_path.isnot(None) | (SessionRecordORM.audio_status == "pending")
+        ),
+        SessionRecordORM, cursor, limit, response,
+    )
+
+    # Get rater assessments for the whole page in one query
+    rater_scores_by_session: dict[int, dict] = {}
+    if sessions:
         assessments = db.execute(
-            sa_select(RaterAssessmentORM).where(RaterAssessmentORM.session_id == s.id)
-        ).scalars().all()
-
-        rater_scores = {}
+            sa_select(
+                RaterAssessmentORM.session_id, RaterAssessmentORM.rater_id,
+                RaterAssessmentORM.score_range, RaterAssessmentORM.score_accuracy, RaterAssessmentORM.score_fluency,
+                RaterAssessmentORM.score_coherence, RaterAssessmentORM.score_interaction,
+            ).where(RaterAssessmentORM.session_id.in_([s.id for s in sessions]))
+        ).all()
         for a in assessments:
-            rater_id = a.rater_id
-            rater_scores[rater_id] = {
+            rater_scores_by_session.setdefault(a.session_id, {})[a.rater_id] = {
                 "range": a.score_range,
                 "accuracy": a.score_accuracy,
                 "fluency": a.score_fluency,
@@ -43,11 +58,15 @@ def list_sessions_for_rating(
                 "interaction": a.score_interaction,
             }
 
+    result = []
+    for s in sessions:
+        rater_scores = rater_scores_by_session.get(s.id, {})
         result.append({
             "id": s.id,
             "user_id": s.user_id,
             "scenario": s.scenario,
             "audio_path": s.audio_path,
+            "audio_status": s.audio_status,
             "duration_min": s.duration_min,
             "created_at": s.created_at.isoformat(),
             "rater_visible": bool(s.rater_visible),
@@ -114,114 +133,34 @@ def save_assessment(
         db.add(assessment)
 
     db.commit()
+    validation_stats.correlations.invalidate()
     return {"ok": True, "session_id": payload.session_id, "rater_id": payload.rater_id}
 
 
 @router.get("/correlations")
 def calculate_correlations(
     current_user: dict = Depends(require_admin),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    """Calculate correlation between AI scores and human raters."""
-    from scipy import stats
-
-    sessions = db.execute(
-        sa_select(SessionRecordORM)
-        .where(SessionRecordORM.audio_path.isnot(None))
-    ).scalars().all()
-
-    dimensions = ["range", "accuracy", "fluency", "coherence", "interaction"]
-    result = {
-        "ai_vs_rater1": {},
-        "ai_vs_rater2": {},
-        "rater1_vs_rater2": {},
-        "sample_size": 0,
-        "timestamp": datetime.utcnow().isoformat(),
-    }
-
-    ai_scores  = {d: [] for d in dimensions}
-    r1_scores  = {d: [] for d in dimensions}
-    r2_scores  = {d: [] for d in dimensions}
-    avg_scores = {d: [] for d in dimensions}  # rata-rata kedua rater sebagai ground truth
+    """
+    Correlation between AI scores and human raters (Spearman ρ), plus quadratic weighted
+    kappa and ICC(2,1) per dimension. Cached until a rater assessment is saved.
+    """
+    return validation_stats.correlations.get(db)
 
-    for s in sessions:
-        assessments = db.execute(
-            sa_select(RaterAssessmentORM).where(RaterAssessmentORM.session_id == s.id)
-        ).scalars().all()
-
-        rater_map = {a.rater_id: a for a in assessments}
-        if not rater_map:
-            continue
-
-        has_r1 = 1 in rater_map
-        has_r2 = 2 in rater_map
-
-        if has_r1 and has_r2:
-            result["sample_size"] += 1
-            for d in dimensions:
-                ai_val = getattr(s, f"score_{d}")
-                r1_val = getattr(rater_map[1], f"score_{d}")
-                r2_val = getattr(rater_map[2], f"score_{d}")
-
-                if all(v is not None for v in [ai_val, r1_val, r2_val]):
-                    ai_scores[d].append(ai_val)
-                    r1_scores[d].append(r1_val)
-                    r2_scores[d].append(r2_val)
-                    avg_scores[d].append((r1_val + r2_val) / 2)
-
-    import math
-
-    result["ai_vs_avg_rater"] = {}
-
-    def safe_spearman(x, y):
-        """Spearman ρ — tidak berasumsi normalitas, cocok untuk data ordinal skala 1–5."""
-        if len(x) < 3:
-            return None
-        import warnings
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            r, p = stats.spearmanr(x, y)
-        if math.isnan(r) or math.isinf(r):
-            return None
-        return round(float(r), 3), round(float(p), 4)
-
-    # Hitung Spearman ρ per dimensi untuk semua kombinasi
-    for d in dimensions:
-        n = len(ai_scores[d])
-        if n < 3:
-            entry = {"r": None, "n": n, "insufficient": True}
-            result["ai_vs_rater1"][d]    = entry
-            result["ai_vs_rater2"][d]    = entry
-            result["rater1_vs_rater2"][d] = entry
-            result["ai_vs_avg_rater"][d] = entry
-            continue
-
-        res_ai_r1  = safe_spearman(ai_scores[d],  r1_scores[d])
-        res_ai_r2  = safe_spearman(ai_scores[d],  r2_scores[d])
-        res_r1_r2  = safe_spearman(r1_scores[d],  r2_scores[d])
-        res_ai_avg = safe_spearman(ai_scores[d],  avg_scores[d])
-
-        result["ai_vs_rater1"][d]     = {"r": res_ai_r1[0],  "p_value": res_ai_r1[1],  "n": n} if res_ai_r1  else {"r": None, "n": n, "insufficient": True}
-        result["ai_vs_rater2"][d]     = {"r": res_ai_r2[0],  "p_value": res_ai_r2[1],  "n": n} if res_ai_r2  else {"r": None, "n": n, "insufficient": True}
-        result["rater1_vs_rater2"][d] = {"r": res_r1_r2[0],  "p_value": res_r1_r2[1],  "n": n} if res_r1_r2  else {"r": None, "n": n, "insufficient": True}
-        result["ai_vs_avg_rater"][d]  = {"r": res_ai_avg[0], "p_value": res_ai_avg[1], "n": n} if res_ai_avg else {"r": None, "n": n, "insufficient": True}
-
-    # Overall (gabungkan semua dimensi)
-    all_ai  = [v for vals in ai_scores.values()  for v in vals]
-    all_r1  = [v for vals in r1_scores.values()  for v in vals]
-    all_r2  = [v for vals in r2_scores.values()  for v in vals]
-    all_avg = [v for vals in avg_scores.values() for v in vals]
-
-    if len(all_ai) >= 3:
-        n_all = len(all_ai)
-        for key, x, y in [
-            ("ai_vs_rater1",    all_ai, all_r1),
-            ("ai_vs_rater2",    all_ai, all_r2),
-            ("rater1_vs_rater2",all_r1, all_r2),
-            ("ai_vs_avg_rater", all_ai, all_avg),
-        ]:
-            res = safe_spearman(x, y)
-            if res:
-                result[key]["overall"] = {"r": res[0], "p_value": res[1], "n": n_all}
 
-    return result
+@router.get("/bootstrap")
+async def bootstrap_confidence_intervals(
+    resamples: int | None = None,
+    current_user: dict = Depends(require_admin),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Bootstrap 95% CI for Spearman ρ, weighted kappa and mean absolute difference.
+    Computed in a background process pool and cached per dataset fingerprint:
+    202 + status "running" while computing — poll until status "done".
+    """
+    runner    = validation_bootstrap.runner
+    resamples = max(200, min(resamples or runner.default_resamples, 20000))
+    out = await runner.get_or_start(db, resamples)
+    return JSONResponse(status_code=202 if out["status"] == "running" else 200, content=out)
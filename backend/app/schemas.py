@@ -30,6 +30,13 @@ class ChatOpenRequest(BaseModel):
 class FeedbackIn(BaseModel):
     messages: List[Message] = Field(default_factory=list)
     duration_min: Optional[float] = 0.0
+    session_key: Optional[str] = Field(None, min_length=8, max_length=64)   # aktifkan merge skor per-giliran
+
+
+class FeedbackTurnIn(BaseModel):
+    session_key: str = Field(..., min_length=8, max_length=64)
+    turn_idx: int = Field(..., ge=0, le=500)
+    messages: List[Message] = Field(..., min_items=1, max_items=6)   # konteks singkat, diakhiri giliran user
 
 
 class PlanItemOut(BaseModel):
@@ -0,0 +1,237 @@
+import asyncio
+import json
+import os
+import time
+import uuid as _uuid
+import wave
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import select as sa_select, update as sa_update
+
+from .audio_prep import pcm_to_float
+from .config import SESSION_AUDIO_WORKERS, SESSION_AUDIO_INCLUDE_AI, SESSION_AUDIO_ON_MISMATCH
+from .database import SessionLocal
+from .models import SessionRecordORM
+from . import validation_stats
+
+# Audio sesi penuh (satu WAV untuk rater) dirakit di luar request save_session:
+# sesi disimpan dengan audio_status="pending" + daftar klip (audio_parts_json), worker
+# menggabungkan klip per blok berukuran tetap (tidak memuat seluruh audio ke memori),
+# lalu mengisi audio_path dan audio_status="ready". Klip dengan sample rate / channel /
+# sample width berbeda dari klip pertama dikonversi (atau ditolak, SESSION_AUDIO_ON_MISMATCH).
+
+_UPLOADS      = Path(__file__).parent.parent / "uploads" / "audio"
+_BLOCK_FRAMES = 32768   # frame per baca/tulis (±64 KB untuk 16-bit mono)
+_FIR_TAPS     = 65      # low-pass sebelum downsample, sama seperti audio_prep._resample
+
+
+def collect_parts(audio_paths: list[str] | None, conversation_turns: list[dict] | None) -> list[str]:
+    """Urutan klip yang digabung: user turn saja, atau user + AI bila SESSION_AUDIO_INCLUDE_AI."""
+    if SESSION_AUDIO_INCLUDE_AI and conversation_turns:
+        names = [t.get("path") for t in conversation_turns if isinstance(t, dict)]
+    else:
+        names = audio_paths or []
+    # Hanya nama file di uploads/audio — path dari client tidak boleh keluar direktori
+    return [n for n in names if isinstance(n, str) and n and Path(n).name == n and not n.startswith(".")]
+
+
+def _float_to_pcm(x: np.ndarray, width: int) -> bytes:
+    x = np.clip(x, -1.0, 1.0)
+    if width == 1:
+        return (x * 127 + 128).astype(np.uint8).tobytes()
+    if width == 2:
+        return (x * 32767).astype("<i2").tobytes()
+    if width == 3:
+        v = (x * 8388607).astype("<i4").reshape(-1, 1).view(np.uint8)
+        return v[:, :3].tobytes()
+    if width == 4:
+        return (x.astype(np.float64) * 2147483647).astype("<i4").tobytes()
+    raise ValueError(f"unsupported sample width {width}")
+
+
+class _StreamConverter:
+    """Konversi blok PCM (channels, sample width, sample rate) dengan state antar blok:
+    FIR low-pass saat downsample lalu interpolasi linear — hasil kontinu di batas blok."""
+
+    def __init__(self, src: tuple[int, int, int], dst: tuple[int, int, int]):
+        (self.src_ch, self.src_w, src_rate), (self.dst_ch, self.dst_w, dst_rate) = src, dst
+        self.step = src_rate / dst_rate
+        self.h    = None
+        if src_rate > dst_rate:
+            cutoff = 0.5 * dst_rate / src_rate
+            taps   = np.arange(_FIR_TAPS) - _FIR_TAPS // 2
+            h      = 2 * cutoff * np.sinc(2 * cutoff * taps) * np.hamming(_FIR_TAPS)
+            self.h = (h / h.sum()).astype(np.float32)
+        self._hist = np.zeros((_FIR_TAPS - 1, self.dst_ch), dtype=np.float32)
+        self._tail = None    # sampel terakhir blok sebelumnya (titik awal interpolasi)
+        self._pos  = 0.0     # posisi sampel output berikutnya, relatif terhadap _tail
+
+    def _channels(self, x: np.ndarray) -> np.ndarray:
+        if self.src_ch == self.dst_ch:
+            return x
+        mono = x.mean(axis=1, keepdims=True)
+        return mono if self.dst_ch == 1 else np.repeat(mono, self.dst_ch, axis=1)
+
+    def process(self, frames: bytes) -> bytes:
+        x = pcm_to_float(frames, self.src_w)
+        x = self._channels(x[: len(x) - len(x) % self.src_ch].reshape(-1, self.src_ch))
+        if self.step != 1.0:
+            if self.h is not None:
+                buf = np.concatenate([self._hist, x])
+                self._hist = buf[-(_FIR_TAPS - 1):]
+                x = np.stack([np.convolve(buf[:, c], self.h, mode="valid") for c in range(x.shape[1])], axis=1)
+            if self._tail is not None:
+                x = np.concatenate([self._tail, x])
+            n = len(x)
+            count = int(np.ceil((n - 1 - self._pos) / self.step)) if n - 1 > self._pos else 0
+            pos   = self._pos + self.step * np.arange(count)
+            idx   = pos.astype(np.int64)
+            frac  = (pos - idx)[:, None].astype(np.float32)
+            self._pos  = self._pos + self.step * count - (n - 1)
+            self._tail = x[-1:]
+            x = x[idx] * (1 - frac) + x[np.minimum(idx + 1, n - 1)] * frac
+        return _float_to_pcm(x.ravel(), self.dst_w)
+
+
+def concat_wav(names: list[str], directory: Path = _UPLOADS) -> tuple[str | None, dict]:
+    """Gabungkan klip WAV secara streaming. Return (filename baru | klip tunggal | None, statistik)."""
+    paths = [directory / n for n in names if (directory / n).is_file()]
+    stats = {"clips": 0, "converted": 0, "skipped": len(names) - len(paths), "segments": []}
+    if not paths:
+        return None, stats
+    if len(paths) == 1:
+        stats["clips"] = 1
+        return paths[0].name, stats
+
+    out_name = f"session_{_uuid.uuid4().hex[:12]}.wav"
+    tmp_path = directory / f"{out_name}.part"
+    out, target, written = None, None, 0
+    try:
+        for p in paths:
+            try:
+                src = wave.open(str(p), "rb")
+            except (wave.Error, EOFError) as e:
+                print(f"[AUDIO] concat skip {p.name}: {type(e).__name__} {e}", flush=True)
+                stats["skipped"] += 1
+                continue
+            with src:
+                params = (src.getnchannels(), src.getsampwidth(), src.getframerate())
+                if out is None:
+                    target = params
+                    out    = wave.open(str(tmp_path), "wb")
+                    out.setnchannels(params[0]); out.setsampwidth(params[1]); out.setframerate(params[2])
+                converter = None
+                if params != target:
+                    if SESSION_AUDIO_ON_MISMATCH == "reject":
+                        print(f"[AUDIO] concat reject {p.name}: {params} != {target}", flush=True)
+                        stats["skipped"] += 1
+                        continue
+                    converter = _StreamConverter(params, target)
+                    stats["converted"] += 1
+                start = written
+                while frames := src.readframes(_BLOCK_FRAMES):
+                    data     = converter.process(frames) if converter else frames
+                    written += len(data) // (target[0] * target[1])
+                    out.writeframes(data)
+                # Posisi klip di file gabungan (frame) — dipakai audio_archive untuk melayani turn
+                stats["segments"].append([p.name, start, written - start])
+                stats["clips"] += 1
+        if out is None:
+            return None, stats
+        out.close(); out = None
+        os.replace(tmp_path, directory / out_name)
+        return out_name, stats
+    finally:
+        if out is not None:
+            out.close()
+        tmp_path.unlink(missing_ok=True)
+
+
+def assemble_session(session_id: int) -> str | None:
+    """Dijalankan di thread worker: rakit audio satu sesi pending lalu simpan hasilnya."""
+    with SessionLocal() as db:
+        row = db.get(SessionRecordORM, session_id)
+        if row is None or row.audio_status != "pending":
+            return None
+        parts = json.loads(row.audio_parts_json or "[]")
+
+    t0 = time.perf_counter()
+    try:
+        name, stats = concat_wav(parts)
+        status = "ready" if name else "failed"
+    except Exception as e:
+        print(f"[AUDIO] Session {session_id} concat failed: {e}", flush=True)
+        name, stats, status = None, {}, "failed"
+    segments = stats.pop("segments", None)
+
+    with SessionLocal() as db:
+        db.execute(
+            sa_update(SessionRecordORM)
+            .where(SessionRecordORM.id == session_id, SessionRecordORM.audio_status == "pending")
+            .values(audio_path=name, audio_status=status,
+                    audio_segments_json=json.dumps(segments) if segments else None)
+        )
+        db.commit()
+    validation_stats.correlations.invalidate()   # sesi ber-audio ikut dataset validasi
+    print(f"[AUDIO] Session {session_id}: {status} {name} {stats} "
+          f"in {(time.perf_counter() - t0) * 1000:.0f} ms", flush=True)
+    return name
+
+
+class SessionAudioAssembler:
+    """
+    Worker asyncio yang merakit audio sesi pending di thread (I/O file + numpy).
+    Antrian hanya berisi id sesi; state ada di kolom sessions.audio_status, jadi sesi
+    yang masih pending saat restart diambil lagi di startup.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    async def startup(self) -> None:
+        self._loop  = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        with SessionLocal() as db:
+            pending = db.execute(
+                sa_select(SessionRecordORM.id).where(SessionRecordORM.audio_status == "pending")
+            ).scalars().all()
+        for session_id in pending:
+            self._queue.put_nowait(session_id)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if pending:
+            print(f"[AUDIO] Resumed {len(pending)} pending session audio job(s)", flush=True)
+
+    async def shutdown(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop  = None
+        self._queue = None
+
+    def schedule(self, session_id: int) -> None:
+        """Aman dipanggil dari thread endpoint. Tanpa loop aktif sesi tetap 'pending' di DB."""
+        loop, queue = self._loop, self._queue
+        if loop is None or queue is None:
+            return
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, session_id)
+        except RuntimeError:
+            pass   # loop sudah ditutup — diambil lagi saat startup berikutnya
+
+    async def _worker(self) -> None:
+        while True:
+            session_id = await self._queue.get()
+            try:
+                await asyncio.to_thread(assemble_session, session_id)
+            except Exception as e:
+                print(f"[AUDIO] Session {session_id} assembly crashed: {e}", flush=True)
+            finally:
+                self._queue.task_done()
+
+
+assembler = SessionAudioAssembler(SESSION_AUDIO_WORKERS)
@@ -0,0 +1,132 @@
+import json
+
+from sqlalchemy import select as sa_select, insert as sa_insert, exists, or_
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .models import SessionRecordORM, SessionTurnORM
+from . import turn_manifest
+
+# Tabel session_turns: satu baris per turn percakapan, ditulis bulk oleh save_session dari
+# manifest turn_manifest. Sesi lama (hanya full_audio_json / full_text_json) di-backfill saat startup.
+#
+# CARA PAKAI (dari folder backend/):
+#   python -m app.session_turns    # backfill manual (sama dengan yang dijalankan saat startup)
+
+_BATCH = 200
+
+
+def write(db: Session, session_id: int, turns: list[dict]) -> None:
+    """Insert bulk (executemany) — satu statement untuk seluruh turn sesi."""
+    if not turns:
+        return
+    db.execute(sa_insert(SessionTurnORM), [
+        {
+            "session_id": session_id,
+            "idx":        t["idx"],
+            "role":       t["role"],
+            "text":       t["text"],
+            "audio_path": t["audio"],
+            "duration_s": t["duration_s"],
+            "word_count": t["word_count"],
+        }
+        for t in turns
+    ])
+
+
+def referenced_audio(names: list[str]) -> set[str]:
+    """Nama file audio (dari `names`) yang dipakai turn sesi tersimpan — satu query lewat index."""
+    if not names:
+        return set()
+    with SessionLocal() as db:
+        return set(db.execute(
+            sa_select(SessionTurnORM.audio_path).where(SessionTurnORM.audio_path.in_(names)).distinct()
+        ).scalars().all())
+
+
+def manifest(db: Session, session_id: int) -> dict | None:
+    """Manifest dari baris session_turns (sesi tanpa turn_manifest_json)."""
+    rows = db.execute(
+        sa_select(SessionTurnORM.role, SessionTurnORM.text, SessionTurnORM.audio_path, SessionTurnORM.duration_s)
+        .where(SessionTurnORM.session_id == session_id)
+        .order_by(SessionTurnORM.idx)
+    ).all()
+    if not rows:
+        return None
+    return turn_manifest.summarize([
+        {"role": r.role, "text": r.text, "audio": r.audio_path, "duration_s": r.duration_s} for r in rows
+    ])
+
+
+def _pending_backfill():
+    """Sesi dengan percakapan JSON tapi belum punya baris turn (turn_count 0 = memang kosong)."""
+    return sa_select(
+        SessionRecordORM.id, SessionRecordORM.full_audio_json, SessionRecordORM.full_text_json,
+        SessionRecordORM.turn_manifest_json,
+    ).where(
+        or_(SessionRecordORM.full_audio_json.isnot(None), SessionRecordORM.full_text_json.isnot(None)),
+        or_(SessionRecordORM.turn_count.is_(None), SessionRecordORM.turn_count > 0),
+        ~exists().where(SessionTurnORM.session_id == SessionRecordORM.id),
+    ).order_by(SessionRecordORM.id)
+
+
+def backfill() -> int:
+    """Isi session_turns (dan turn_manifest_json/turn_count yang masih kosong) dari kolom JSON."""
+    done, last_id = 0, 0
+    while True:
+        with SessionLocal() as db:
+            rows = db.execute(_pending_backfill().where(SessionRecordORM.id > last_id).limit(_BATCH)).all()
+            if not rows:
+                return done
+            for r in rows:
+                m = json.loads(r.turn_manifest_json) if r.turn_manifest_json \
+                    else turn_manifest.build_for_row(r.full_audio_json, r.full_text_json)
+                write(db, r.id, m["turns"])
+                if r.turn_manifest_json is None:
+                    db.execute(
+                        SessionRecordORM.__table__.update()
+                        .where(SessionRecordORM.id == r.id)
+                        .values(turn_manifest_json=json.dumps(m), turn_count=m["turn_count"])
+                    )
+            db.commit()
+            done   += len(rows)
+            last_id = rows[-1].id
+
+
+def backfill_manifests() -> int:
+    """turn_manifest_json untuk sesi yang sudah punya baris session_turns tapi belum punya manifest
+    (bundle rater hanya membaca — tidak menulis manifest saat GET)."""
+    done = 0
+    while True:
+        with SessionLocal() as db:
+            ids = db.execute(
+                sa_select(SessionRecordORM.id).where(
+                    SessionRecordORM.turn_manifest_json.is_(None),
+                    exists().where(SessionTurnORM.session_id == SessionRecordORM.id),
+                ).order_by(SessionRecordORM.id).limit(_BATCH)
+            ).scalars().all()
+            if not ids:
+                return done
+            for session_id in ids:
+                m = manifest(db, session_id)
+                db.execute(
+                    SessionRecordORM.__table__.update()
+                    .where(SessionRecordORM.id == session_id)
+                    .values(turn_manifest_json=json.dumps(m), turn_count=m["turn_count"])
+                )
+            db.commit()
+            done += len(ids)
+
+
+def backfill_if_needed() -> None:
+    """Startup: DB lama yang sudah punya sesi sebelum tabel session_turns / turn_manifest_json ada."""
+    n = backfill()
+    if n:
+        print(f"[DB] session_turns backfilled: {n} session(s)", flush=True)
+    n = backfill_manifests()
+    if n:
+        print(f"[DB] turn_manifest_json backfilled: {n} session(s)", flush=True)
+
+
+if __name__ == "__main__":
+    print(f"[DB] session_turns backfilled: {backfill()} session(s)")
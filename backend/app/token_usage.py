@@ -0,0 +1,56 @@
+import threading
+
+
+def prompt_tokens_estimate(text: str) -> int:
+    """Perkiraan token dari teks (~4 karakter/token) — dipakai untuk ukuran prefix statis."""
+    return len(text or "") // 4
+
+
+def usage_from_response(data: dict, prefix_tokens: int = 0) -> dict:
+    """Ambil field `usage` dari response chat completion Groq (format OpenAI)."""
+    usage   = (data or {}).get("usage") or {}
+    details = usage.get("prompt_tokens_details") or {}
+    return {
+        "prompt_tokens":     int(usage.get("prompt_tokens") or 0),
+        "completion_tokens": int(usage.get("completion_tokens") or 0),
+        "cached_tokens":     int(details.get("cached_tokens") or 0),   # prefix yang terbaca dari cache Groq
+        "prefix_tokens":     int(prefix_tokens),                       # ukuran prefix statis yang bisa di-cache
+    }
+
+
+def add_usage(total: dict, usage: dict) -> dict:
+    for k in ("prompt_tokens", "completion_tokens", "cached_tokens"):
+        total[k] = total.get(k, 0) + int(usage.get(k) or 0)
+    total["prefix_tokens"] = max(total.get("prefix_tokens", 0), int(usage.get("prefix_tokens") or 0))
+    return total
+
+
+class TokenMeter:
+    """Akumulasi pemakaian token Groq per jenis prompt, untuk memantau biaya per sesi vs pool key."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._kinds: dict[str, dict] = {}
+
+    def record(self, kind: str, usage: dict) -> None:
+        with self._lock:
+            s = self._kinds.setdefault(kind, {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                                              "cached_tokens": 0, "prefix_tokens": 0})
+            s["requests"] += 1
+            add_usage(s, usage)
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = {}
+            for kind, s in self._kinds.items():
+                n = s["requests"] or 1
+                out[kind] = {
+                    **s,
+                    "avg_prompt_tokens":     round(s["prompt_tokens"] / n, 1),
+                    "avg_completion_tokens": round(s["completion_tokens"] / n, 1),
+                    "cached_ratio":          round(s["cached_tokens"] / s["prompt_tokens"], 3) if s["prompt_tokens"] else 0.0,
+                }
+            return out
+
+
+meter = TokenMeter()
@@ -0,0 +1,80 @@
+import hashlib
+import json
+from datetime import datetime
+
+from sqlalchemy import select as sa_select, func, delete
+from sqlalchemy.orm import Session
+
+from .config import TRANSCRIPT_CACHE_MAX_ROWS
+from .database import SessionLocal
+from .models import TranscriptCacheORM
+
+# Counter proses ini (hit rate sejak start); jumlah hit historis ada di kolom `hits`
+_stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+
+
+def transcript_key(audio_sha256: str, language: str, prompt: str) -> str:
+    return hashlib.sha256(f"{audio_sha256}\x00{language}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+def lookup(key: str) -> dict | None:
+    """Sync — panggil lewat asyncio.to_thread (commit counter hit tidak boleh di event loop)."""
+    with SessionLocal() as db:
+        row = db.execute(
+            sa_select(TranscriptCacheORM).where(TranscriptCacheORM.cache_key == key)
+        ).scalar_one_or_none()
+        if row is None:
+            _stats["misses"] += 1
+            return None
+        _stats["hits"] += 1
+        row.hits += 1
+        row.last_used_at = datetime.utcnow()
+        raw = row.result_json
+        db.commit()
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
+
+
+def store(key: str, audio_sha256: str, language: str, result: dict) -> None:
+    """Sync — panggil lewat asyncio.to_thread. Ukuran tabel dijaga evict_excess() (maintenance)."""
+    with SessionLocal() as db:
+        try:
+            db.add(TranscriptCacheORM(
+                cache_key=key, audio_sha256=audio_sha256, language=language,
+                result_json=json.dumps(result, ensure_ascii=False),
+            ))
+            db.commit()
+            _stats["stored"] += 1
+        except Exception:
+            db.rollback()     # request paralel untuk klip yang sama sudah menyimpan duluan
+
+
+def evict_excess() -> int:
+    """Batasi ukuran tabel: buang entri yang paling lama tidak dipakai. Dijalankan periodik."""
+    with SessionLocal() as db:
+        total  = db.execute(sa_select(func.count(TranscriptCacheORM.id))).scalar_one()
+        excess = total - TRANSCRIPT_CACHE_MAX_ROWS
+        if excess <= 0:
+            return 0
+        stale = (
+            sa_select(TranscriptCacheORM.id)
+            .order_by(TranscriptCacheORM.last_used_at.asc())
+            .limit(excess)
+        )
+        db.execute(delete(TranscriptCacheORM).where(TranscriptCacheORM.id.in_(stale)))
+        db.commit()
+    _stats["evicted"] += excess
+    return excess
+
+
+def stats(db: Session) -> dict:
+    total = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "hit_rate": round(_stats["hits"] / total, 3) if total else 0.0,
+        "rows":     db.execute(sa_select(func.count(TranscriptCacheORM.id))).scalar_one(),
+        "max_rows": TRANSCRIPT_CACHE_MAX_ROWS,
+        "hits_all_time": db.execute(sa_select(func.coalesce(func.sum(TranscriptCacheORM.hits), 0))).scalar_one(),
+    }
@@ -0,0 +1,168 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable
+
+from .config import TTS_CACHE_MAX_MB, TTS_CACHE_GRACE_MIN
+
+_AUDIO_DIR = Path(__file__).parent.parent / "uploads" / "audio"
+_PREFIX    = "tts_"
+
+
+def normalize_text(text: str) -> str:
+    return " ".join((text or "").split())
+
+
+def cache_key(engine: str, voice: str, text: str) -> str:
+    return hashlib.sha256(f"{engine}\x00{voice}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()[:32]
+
+
+class TTSCache:
+    """
+    Cache audio TTS content-addressed: hash(engine + voice + teks ternormalisasi) → file
+    `tts_<hash>.<ext>` di uploads/audio. File yang sama dipakai ulang sebagai X-Audio-Path,
+    jadi jejak rater tetap valid tanpa menduplikasi byte. Eviction LRU (mtime) saat ukuran
+    total melewati batas — file yang direferensikan sesi tersimpan (`referenced`) tidak dihapus,
+    begitu juga file yang dipakai dalam `grace_s` terakhir (sesi yang masih berjalan belum tersimpan).
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, grace_s: float = 0.0,
+                 referenced: Callable[[list[str]], set[str]] | None = None):
+        self.dir        = directory
+        self.max_bytes  = max_bytes
+        self.grace_s    = grace_s
+        self.referenced = referenced   # nama file → subset yang masih dipakai sesi tersimpan
+        self._lock      = threading.Lock()
+        self._index: OrderedDict[str, tuple[str, int]] = OrderedDict()   # key → (filename, size)
+        self._bytes     = 0
+        self.hits       = 0
+        self.misses     = 0
+        self.evicted    = 0
+        self._loaded    = False
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self.dir.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for p in self.dir.glob(f"{_PREFIX}*.*"):
+            if p.suffix not in (".wav", ".mp3"):
+                continue
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, p.stem[len(_PREFIX):], p.name, st.st_size))
+        for _, key, name, size in sorted(entries):
+            self._index[key] = (name, size)
+            self._bytes += size
+        self._loaded = True
+
+    def lookup(self, candidates: list[tuple[str, str]], text: str) -> str | None:
+        """candidates: [(engine, voice)] sesuai urutan preferensi. Return filename kalau ada."""
+        with self._lock:
+            self._load()
+            for engine, voice in candidates:
+                key = cache_key(engine, voice, text)
+                entry = self._index.get(key)
+                if entry is None:
+                    continue
+                path = self.dir / entry[0]
+                if not path.exists():
+                    self._bytes -= entry[1]
+                    del self._index[key]
+                    continue
+                self._index.move_to_end(key)
+                try: os.utime(path)          # simpan urutan LRU lintas restart
+                except OSError: pass
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def put(self, engine: str, voice: str, text: str, audio_bytes: bytes, ext: str) -> str | None:
+        key  = cache_key(engine, voice, text)
+        name = f"{_PREFIX}{key}.{ext}"
+        path = self.dir / name
+        tmp  = path.with_suffix(f".{ext}.part")
+        with self._lock:
+            self._load()
+        try:
+            tmp.write_bytes(audio_bytes)
+            os.replace(tmp, path)
+        except Exception as e:
+            print(f"[TTS] Cache write failed: {e}", flush=True)
+            tmp.unlink(missing_ok=True)
+            return None
+        with self._lock:
+            old = self._index.pop(key, None)
+            if old:
+                self._bytes -= old[1]
+            self._index[key] = (name, len(audio_bytes))
+            self._bytes += len(audio_bytes)
+            candidates = self._eviction_candidates()
+        if candidates:
+            self._evict(candidates)
+        return name
+
+    def _eviction_candidates(self) -> list[tuple[str, str, int]]:
+        """Entri tertua secukupnya untuk kembali di bawah batas (dipanggil dengan _lock)."""
+        if self._bytes <= self.max_bytes:
+            return []
+        candidates, need = [], self._bytes - self.max_bytes
+        recent = time.time() - self.grace_s
+        for key, (name, size) in self._index.items():
+            try:
+                if (self.dir / name).stat().st_mtime > recent:
+                    break   # urutan LRU: entri berikutnya lebih baru lagi
+            except OSError:
+                pass
+            candidates.append((key, name, size))
+            need -= size
+            if need <= 0 and len(candidates) >= 8:
+                break
+        return candidates
+
+    def _evict(self, candidates: list[tuple[str, str, int]]) -> None:
+        # Cek referensi sesi (query DB) di luar _lock supaya lookup() tidak menunggu SQLite
+        try:
+            keep = self.referenced([n for _, n, _ in candidates]) if self.referenced else set()
+        except Exception as e:
+            print(f"[TTS] Cache eviction skipped: {e}", flush=True)
+            return
+        with self._lock:
+            for key, name, size in candidates:
+                if self._bytes <= self.max_bytes:
+                    break
+                if self._index.get(key) != (name, size):
+                    continue   # sudah dihapus / ditulis ulang sejak kandidat diambil
+                if name in keep:
+                    # Dipakai sesi: keluarkan dari index (tidak dihapus) supaya tidak dicek ulang
+                    del self._index[key]
+                    self._bytes -= size
+                    continue
+                (self.dir / name).unlink(missing_ok=True)
+                del self._index[key]
+                self._bytes -= size
+                self.evicted += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._load()
+            total = self.hits + self.misses
+            return {
+                "entries":  len(self._index),
+                "bytes":    self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits":     self.hits,
+                "misses":   self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "evicted":  self.evicted,
+            }
+
+
+# referenced dipasang di main.py (session_turns.referenced_audio) — modul cache tidak bergantung ORM
+cache = TTSCache(_AUDIO_DIR, TTS_CACHE_MAX_MB * 1024 * 1024, grace_s=TTS_CACHE_GRACE_MIN * 60)
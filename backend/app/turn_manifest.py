@@ -0,0 +1,73 @@
+import json
+import wave
+from pathlib import Path
+
+# Manifest turn untuk rater: teks + audio per turn sudah disejajarkan, dengan durasi klip.
+# Ukuran file sengaja tidak dilaporkan: compactor audio_archive men-transcode / memotong klip lama,
+# jadi byte yang dilayani berubah, sedangkan durasinya tetap.
+# Dihitung sekali saat sesi disimpan (sessions.turn_manifest_json + baris session_turns) dan dikirim
+# apa adanya oleh GET /rater/sessions/{id}/bundle — client tidak lagi mem-parse full_audio_json/full_text_json.
+#
+# Penyejajaran: pesan ke-k role R dipasangkan dengan klip audio ke-k role R (urutan simpan sama
+# di halaman practice). Klip tanpa pasangan teks tetap masuk sebagai turn dengan text=None.
+
+_AUDIO_DIR = Path(__file__).parent.parent / "uploads" / "audio"
+_ROLES     = ("user", "assistant")
+
+
+def _duration(name: str) -> float | None:
+    """Durasi detik dari header WAV; None bila file tidak ada / bukan WAV (mp3 TTS, webm — dibaca player)."""
+    try:
+        with wave.open(str(_AUDIO_DIR / name), "rb") as wf:
+            return round(wf.getnframes() / wf.getframerate(), 2)
+    except (OSError, wave.Error, EOFError):
+        return None
+
+
+def build(conversation_turns: list | None, messages: list | None) -> dict:
+    texts = [m for m in (messages or []) if isinstance(m, dict) and m.get("role") in _ROLES]
+    clips = {r: [] for r in _ROLES}
+    for t in conversation_turns or []:
+        path = t.get("path") if isinstance(t, dict) else None
+        # Hanya nama file di uploads/audio (path dari client) — sama seperti session_audio.collect_parts
+        if isinstance(path, str) and path and Path(path).name == path and t.get("role") in _ROLES:
+            clips[t["role"]].append(path)
+
+    taken = {r: 0 for r in _ROLES}
+    turns = []
+    for m in texts:
+        role  = m["role"]
+        audio = clips[role][taken[role]] if taken[role] < len(clips[role]) else None
+        taken[role] += audio is not None
+        text  = m.get("content")
+        turns.append({"role": role, "text": text if isinstance(text, str) else "", "audio": audio})
+    for role in _ROLES:
+        turns += [{"role": role, "text": None, "audio": a} for a in clips[role][taken[role]:]]
+    return summarize(turns)
+
+
+def summarize(turns: list[dict]) -> dict:
+    """Lengkapi turn [{role, text, audio}] dengan idx, durasi, jumlah kata + total sesi.
+    duration_s yang sudah ada (dari session_turns) dipakai apa adanya — file bisa sudah diarsip."""
+    total_s = 0.0
+    for idx, t in enumerate(turns):
+        duration = t["duration_s"] if "duration_s" in t else (_duration(t["audio"]) if t["audio"] else None)
+        t.update(idx=idx, duration_s=duration, word_count=len((t["text"] or "").split()))
+        total_s += duration or 0.0
+    return {
+        "turns":       turns,
+        "turn_count":  len(turns),
+        "user_turns":  sum(t["role"] == "user" for t in turns),
+        "audio_turns": sum(t["audio"] is not None for t in turns),
+        "audio_s":     round(total_s, 2),
+    }
+
+
+def build_for_row(full_audio_json: str | None, full_text_json: str | None) -> dict:
+    """Manifest dari kolom JSON sesi lama (backfill session_turns / turn_manifest_json)."""
+    def _load(raw):
+        try:
+            return json.loads(raw) if raw else None
+        except ValueError:
+            return None
+    return build(_load(full_audio_json), _load(full_text_json))
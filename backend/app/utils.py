@@ -1,4 +1,3 @@
-import asyncio
 import json
 import re
 from math import fsum
@@ -6,48 +5,105 @@ from math import fsum
 from sqlalchemy import select as sa_select, asc
 from sqlalchemy.orm import Session
 
-from .config import GROQ_API_KEY, GROQ_API_KEYS
+from . import groq_client
+from .config import GROQ_API_KEY
+from .groq_keys import scheduler, estimate_tokens
 from .models import ProfileORM
 
 
 # ===== Groq Retry Helper =====
 
 async def groq_post_with_retry(
-    client,
     url: str,
     *,
+    endpoint: str = "chat",
     max_retries: int = 3,
     **kwargs,
 ):
     """
-    POST ke Groq API dengan key rotation otomatis saat kena rate limit (429).
-    Coba setiap key dalam pool sebelum sleep, lalu retry dengan backoff.
+    POST ke Groq API. Key dipilih oleh scheduler (groq_keys) berdasarkan budget
+    x-ratelimit-* sebelum request dikirim; kalau semua key jenuh, request mengantre
+    sampai ada key yang pulih. 429 tetap ditangani: key di-cooldown lalu coba key lain.
+    Memakai client bersama (groq_client) — timeout & batas paralel mengikuti kelas `endpoint`.
     """
-    MAX_WAIT = 30.0
-    keys = GROQ_API_KEYS or [GROQ_API_KEY]
-    delay = 2.0
-
-    for attempt in range(max_retries + 1):
-        # Coba semua key yang tersedia sebelum menyerah di attempt ini
-        for i, key in enumerate(keys):
-            kw = dict(kwargs)
-            hdrs = dict(kw.pop("headers", {}) or {})
-            hdrs["Authorization"] = f"Bearer {key}"
-            r = await client.post(url, headers=hdrs, **kw)
-            if r.status_code != 429:
-                return r
-            print(f"[GROQ] Key {i+1}/{len(keys)} rate limited", flush=True)
-
-        if attempt == max_retries:
-            break
-        wait = min(delay, MAX_WAIT)
-        print(f"[GROQ] All keys rate limited, waiting {wait:.1f}s (attempt {attempt+1}/{max_retries})", flush=True)
-        await asyncio.sleep(wait)
-        delay *= 2
+    client = groq_client.get_client()
+    kwargs.setdefault("timeout", groq_client.endpoint_timeout(endpoint))
+    est_tokens = estimate_tokens(kwargs.get("json"))
+    attempts = (max_retries + 1) * max(1, len(scheduler))
+
+    for attempt in range(attempts):
+        state = await scheduler.acquire(est_tokens)
+        kw = dict(kwargs)
+        hdrs = dict(kw.pop("headers", {}) or {})
+        hdrs["Authorization"] = f"Bearer {state.key}"
+        r = None
+        try:
+            async with groq_client.endpoint_slot(endpoint):
+                r = await client.post(url, headers=hdrs, **kw)
+        finally:
+            scheduler.release(state, r)
+        if r.status_code != 429:
+            return r
+        print(f"[GROQ] Key {state.idx+1}/{len(scheduler)} rate limited (attempt {attempt+1}/{attempts})", flush=True)
 
     return r
 
 
+async def groq_stream_with_retry(
+    url: str,
+    *,
+    endpoint: str = "chat",
+    max_retries: int = 3,
+    **kwargs,
+):
+    """
+    Versi streaming dari groq_post_with_retry untuk body dengan `stream: true`.
+    Yield potongan teks (choices[0].delta.content) begitu tiba dari SSE Groq.
+    Pemilihan key & retry 429 sama — hanya sebelum byte pertama dikirim ke caller.
+    """
+    client = groq_client.get_client()
+    kwargs.setdefault("timeout", groq_client.endpoint_timeout(endpoint))
+    est_tokens = estimate_tokens(kwargs.get("json"))
+    attempts = (max_retries + 1) * max(1, len(scheduler))
+
+    for attempt in range(attempts):
+        state = await scheduler.acquire(est_tokens)
+        kw = dict(kwargs)
+        hdrs = dict(kw.pop("headers", {}) or {})
+        hdrs["Authorization"] = f"Bearer {state.key}"
+        released = False
+        try:
+            async with groq_client.endpoint_slot(endpoint):
+                async with client.stream("POST", url, headers=hdrs, **kw) as r:
+                    scheduler.release(state, r)
+                    released = True
+                    if r.status_code == 429:
+                        print(f"[GROQ] Key {state.idx+1}/{len(scheduler)} rate limited (attempt {attempt+1}/{attempts})", flush=True)
+                        continue
+                    if r.status_code != 200:
+                        await r.aread()
+                        raise RuntimeError(f"groq stream failed ({r.status_code}): {r.text[:500]}")
+                    async for line in r.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            return
+                        try:
+                            chunk = json.loads(data)
+                        except ValueError:
+                            continue
+                        delta = ((chunk.get("choices") or [{}])[0].get("delta") or {}).get("content")
+                        if delta:
+                            yield delta
+                    return
+        finally:
+            if not released:
+                scheduler.release(state)
+
+    raise RuntimeError("groq stream failed: all keys rate limited")
+
+
 # ===== Profile =====
 
 def ensure_profile(db: Session, user_id: int = 1) -> ProfileORM:
@@ -173,9 +229,6 @@ def _objective_from_messages(msgs: list, duration_min: float | None) -> dict:
 
 async def _groq_json_chat(messages: list, temperature: float = 0.2) -> dict:
     if not GROQ_API_KEY: return {}
-    try:
-        import httpx
-    except Exception: return {}
     url  = "https://api.groq.com/openai/v1/chat/completions"
     body = {
         "model": "llama-3.3-70b-versatile",
@@ -183,12 +236,11 @@ async def _groq_json_chat(messages: list, temperature: float = 0.2) -> dict:
         "temperature": temperature,
         "response_format": {"type": "json_object"},
     }
-    async with httpx.AsyncClient(timeout=60) as client:
-        r = await groq_post_with_retry(client, url, json=body)
-        if r.status_code != 200: return {}
-        content = (r.json().get("choices") or [{}])[0].get("message", {}).get("content", "") or "{}"
-        try: return json.loads(content)
-        except: return {}
+    r = await groq_post_with_retry(url, endpoint="json", json=body)
+    if r.status_code != 200: return {}
+    content = (r.json().get("choices") or [{}])[0].get("message", {}).get("content", "") or "{}"
+    try: return json.loads(content)
+    except: return {}
 
 
 def _weak_focus_from_profile(p: ProfileORM) -> str:
@@ -0,0 +1,216 @@
+import asyncio
+import hashlib
+import multiprocessing
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import select as sa_select, func
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from .config import VALIDATION_BOOTSTRAP_WORKERS, VALIDATION_BOOTSTRAP_RESAMPLES
+from .models import RaterAssessmentORM
+from .validation_stats import DIMENSIONS, PAIRS, MIN_N, load_scores, _mask_incomplete
+
+# Bootstrap CI (persentil 95%) untuk ρ Spearman, weighted kappa, dan mean absolute difference
+# per pasangan × dimensi. Resample sesi (bukan skor) → "overall" tetap menghormati klaster sesi.
+# Dijalankan di luar request: resample dibagi ke ProcessPoolExecutor, hasil di-cache per
+# fingerprint dataset (jumlah penilaian + rated_at terakhir) — admin cukup poll endpoint.
+#
+# Satu resample = bobot multinomial (berapa kali tiap sesi terambil) atas data asli, jadi
+# tidak ada sort/copy per resample: rank dihitung dari urutan asli + cumsum bobot, kappa dan
+# MAD jadi perkalian matriks (B resample × n sesi).
+
+METRICS      = ("spearman", "weighted_kappa", "mean_abs_diff")
+_LABELS      = [*DIMENSIONS, "overall"]
+_LEVELS      = 5
+_KAPPA_W     = ((np.arange(_LEVELS)[:, None] - np.arange(_LEVELS)[None, :]) ** 2 / (_LEVELS - 1) ** 2).ravel()
+_BATCH_CELLS = 4_000_000   # batas elemen matriks bobot per batch (± 32 MB float64)
+_CI          = (2.5, 97.5)
+
+
+def fingerprint(db: Session) -> str:
+    n, last = db.execute(
+        sa_select(func.count(RaterAssessmentORM.id), func.max(RaterAssessmentORM.rated_at))
+    ).one()
+    return f"{n}:{last}"
+
+
+def _columns(x: np.ndarray) -> list[tuple[np.ndarray, np.ndarray]]:
+    """Per dimensi (+ overall gabungan): indeks sesi yang lengkap dan nilainya (m, seri)."""
+    cols = []
+    for d in range(x.shape[2]):
+        rows = np.flatnonzero(np.isfinite(x[:, :, d]).all(axis=1))
+        cols.append((rows, x[rows, :, d]))
+    cols.append((np.concatenate([r for r, _ in cols]), np.concatenate([v for _, v in cols])))
+    return cols
+
+
+def _weighted_midranks(values: np.ndarray, w: np.ndarray) -> np.ndarray:
+    """Rank rata-rata (seperti rankdata 'average') tiap titik bila titik i muncul w[b, i] kali."""
+    order  = np.argsort(values, kind="stable")
+    is_new = np.r_[True, values[order][1:] != values[order][:-1]]
+    group  = np.cumsum(is_new) - 1
+    gw     = np.add.reduceat(w[:, order], np.flatnonzero(is_new), axis=1)   # bobot per nilai unik
+    grank  = np.cumsum(gw, axis=1) - gw + (gw + 1) / 2
+    ranks  = np.empty_like(w)
+    ranks[:, order] = grank[:, group]
+    return ranks
+
+
+def _weighted_pearson(a: np.ndarray, b: np.ndarray, w: np.ndarray, total: np.ndarray) -> np.ndarray:
+    da = a - (w * a).sum(axis=1, keepdims=True) / total[:, None]
+    db = b - (w * b).sum(axis=1, keepdims=True) / total[:, None]
+    return (w * da * db).sum(axis=1) / np.sqrt((w * da * da).sum(axis=1) * (w * db * db).sum(axis=1))
+
+
+def _weighted_kappa(ca: np.ndarray, cb: np.ndarray, w: np.ndarray, total: np.ndarray) -> np.ndarray:
+    cells  = np.zeros((len(ca), _LEVELS * _LEVELS))
+    cells[np.arange(len(ca)), ca * _LEVELS + cb] = 1
+    obs    = (w @ cells).reshape(-1, _LEVELS, _LEVELS)      # tabel kontingensi per resample
+    exp    = obs.sum(axis=2)[:, :, None] * obs.sum(axis=1)[:, None, :] / total[:, None, None]
+    return 1 - obs.reshape(len(w), -1) @ _KAPPA_W / (exp.reshape(len(w), -1) @ _KAPPA_W)
+
+
+def _metrics(counts: np.ndarray, cols: list) -> np.ndarray:
+    """Bobot resample (B, n) → (metrik, pasangan, B, dimensi+overall)."""
+    out = np.full((len(METRICS), len(PAIRS), len(counts), len(cols)), np.nan)
+    for li, (rows, values) in enumerate(cols):
+        if len(rows) < MIN_N:
+            continue
+        w     = counts[:, rows].astype(float)
+        total = w.sum(axis=1)
+        ranks = [_weighted_midranks(values[:, s], w) for s in range(values.shape[1])]
+        cats  = np.clip(np.floor(values + 0.5), 1, _LEVELS).astype(int) - 1
+        for pi, (a, b) in enumerate(PAIRS.values()):
+            out[0, pi, :, li] = _weighted_pearson(ranks[a], ranks[b], w, total)
+            out[1, pi, :, li] = _weighted_kappa(cats[:, a], cats[:, b], w, total)
+            out[2, pi, :, li] = w @ np.abs(values[:, a] - values[:, b]) / total
+    return out
+
+
+def _bootstrap_chunk(x: np.ndarray, resamples: int, seed) -> np.ndarray:
+    """Dijalankan di proses worker: `resamples` resample sesi dengan RNG sendiri."""
+    rng   = np.random.default_rng(seed)
+    n     = x.shape[0]
+    cols  = _columns(x)
+    if n == 0:
+        return np.full((len(METRICS), len(PAIRS), resamples, len(cols)), np.nan)
+    batch = max(1, _BATCH_CELLS // max(1, len(cols[-1][0])))
+    parts = []
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for start in range(0, resamples, batch):
+            counts = rng.multinomial(n, np.full(n, 1.0 / n), size=min(batch, resamples - start))
+            parts.append(_metrics(counts, cols))
+    return np.concatenate(parts, axis=2)
+
+
+def _summarise(x: np.ndarray, samples: np.ndarray) -> dict:
+    cols = _columns(x)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        estimate  = _metrics(np.ones((1, x.shape[0])), cols)[:, :, 0, :]
+        low, high = np.nanpercentile(samples, _CI, axis=2)
+    n = [len(rows) for rows, _ in cols]
+    result = {}
+    for mi, metric in enumerate(METRICS):
+        result[metric] = {}
+        for pi, pair in enumerate(PAIRS):
+            result[metric][pair] = {}
+            for li, label in enumerate(_LABELS):
+                if n[li] < MIN_N or not np.isfinite(estimate[mi, pi, li]):
+                    result[metric][pair][label] = {"estimate": None, "n": n[li], "insufficient": True}
+                    continue
+                result[metric][pair][label] = {
+                    "estimate": round(float(estimate[mi, pi, li]), 3),
+                    "ci_low":   round(float(low[mi, pi, li]), 3),
+                    "ci_high":  round(float(high[mi, pi, li]), 3),
+                    "n":        n[li],
+                }
+    return result
+
+
+class BootstrapRunner:
+    """Satu perhitungan per (fingerprint, resamples); request berikutnya dapat status/hasil dari cache."""
+
+    def __init__(self, workers: int, default_resamples: int):
+        self.workers           = max(1, workers)
+        self.default_resamples = default_resamples
+        self._pool: ProcessPoolExecutor | None = None
+        self._tasks:   dict[tuple, asyncio.Task] = {}
+        self._results: dict[tuple, dict] = {}
+        self._errors:  dict[tuple, str]  = {}
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: jangan fork proses API yang punya event loop + thread aktif
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def shutdown(self) -> None:
+        for t in self._tasks.values():
+            t.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks = {}
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def get_or_start(self, db: Session, resamples: int) -> dict:
+        """Return hasil cache, atau mulai/lanjutkan job dan return statusnya.
+        Query DB (fingerprint, load_scores) dijalankan di thread pool; state job diurus di event loop."""
+        key  = (await run_in_threadpool(fingerprint, db), resamples)
+        base = {"fingerprint": key[0], "resamples": resamples}
+        if key in self._results:
+            return {**base, "status": "done", **self._results[key]}
+        if key in self._errors:
+            # Laporkan sekali; request berikutnya mencoba lagi
+            return {**base, "status": "failed", "error": self._errors.pop(key)}
+        if key not in self._tasks:
+            x = _mask_incomplete(await run_in_threadpool(load_scores, db))
+            # Cek ulang setelah await: request paralel bisa sudah memulai job yang sama
+            if key not in self._tasks and key not in self._results:
+                task = asyncio.create_task(self._run(key, x))
+                self._tasks[key] = task
+                task.add_done_callback(lambda _t, k=key: self._tasks.pop(k, None))
+        return {**base, "status": "running"}
+
+    async def _run(self, key: tuple, x: np.ndarray) -> None:
+        fp, resamples = key
+        started = datetime.utcnow()
+        try:
+            loop   = asyncio.get_running_loop()
+            pool   = self._get_pool()
+            chunks = [c for c in np.array_split(np.arange(resamples), self.workers) if len(c)]
+            # Seed dari fingerprint → CI yang sama untuk dataset yang sama
+            seeds  = np.random.SeedSequence(int(hashlib.sha256(fp.encode()).hexdigest()[:16], 16)).spawn(len(chunks))
+            parts  = await asyncio.gather(*[
+                loop.run_in_executor(pool, _bootstrap_chunk, x, len(c), s) for c, s in zip(chunks, seeds)
+            ])
+            result = _summarise(x, np.concatenate(parts, axis=2))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._pool = None   # worker mati (OOM/kill) → buat pool baru di percobaan berikutnya
+            self._errors[key] = f"{type(e).__name__}: {e}"[:500]
+            print(f"[VALIDATION] Bootstrap {fp} failed: {e}", flush=True)
+            return
+        elapsed = (datetime.utcnow() - started).total_seconds()
+        # Simpan hanya hasil untuk dataset terbaru
+        self._results = {k: v for k, v in self._results.items() if k[0] == fp}
+        self._results[key] = {
+            "sample_size": int(x.shape[0]),
+            "confidence":  0.95,
+            "elapsed_s":   round(elapsed, 2),
+            "computed_at": datetime.utcnow().isoformat(),
+            **result,
+        }
+        print(f"[VALIDATION] Bootstrap {fp}: {resamples} resamples, n={x.shape[0]} in {elapsed:.1f}s", flush=True)
+
+
+runner = BootstrapRunner(VALIDATION_BOOTSTRAP_WORKERS, VALIDATION_BOOTSTRAP_RESAMPLES)
@@ -0,0 +1,176 @@
+import threading
+import warnings
+from datetime import datetime
+
+import numpy as np
+from scipy import stats
+from sqlalchemy import select as sa_select
+from sqlalchemy.orm import Session, aliased
+
+from .models import SessionRecordORM, RaterAssessmentORM
+
+# Validasi skor AI vs rater manusia untuk /admin/validation/correlations.
+# Satu query join (sesi × rater1 × rater2) → array NumPy (n, seri, dimensi), lalu
+# Spearman ρ, Cohen's weighted kappa, dan ICC dihitung sekaligus untuk semua
+# dimensi × pasangan. Hasil di-cache sampai ada penilaian rater baru (invalidate()).
+
+DIMENSIONS = ["range", "accuracy", "fluency", "coherence", "interaction"]
+SERIES     = ["ai", "rater1", "rater2", "avg_rater"]   # avg_rater = rata-rata kedua rater (ground truth)
+PAIRS      = {
+    "ai_vs_rater1":     (0, 1),
+    "ai_vs_rater2":     (0, 2),
+    "rater1_vs_rater2": (1, 2),
+    "ai_vs_avg_rater":  (0, 3),
+}
+MIN_N      = 3
+_LEVELS    = 5   # skala ordinal 1–5 untuk kappa
+
+
+def load_scores(db: Session) -> np.ndarray:
+    """Sesi ber-audio yang dinilai kedua rater → array (n, 4, 5); None → NaN."""
+    r1 = aliased(RaterAssessmentORM)
+    r2 = aliased(RaterAssessmentORM)
+    cols = (
+        [getattr(SessionRecordORM, f"score_{d}") for d in DIMENSIONS]
+        + [getattr(r1, f"score_{d}") for d in DIMENSIONS]
+        + [getattr(r2, f"score_{d}") for d in DIMENSIONS]
+    )
+    rows = db.execute(
+        sa_select(*cols)
+        .join(r1, (r1.session_id == SessionRecordORM.id) & (r1.rater_id == 1))
+        .join(r2, (r2.session_id == SessionRecordORM.id) & (r2.rater_id == 2))
+        .where(SessionRecordORM.audio_path.isnot(None))
+    ).all()
+    x = np.array(rows, dtype=float).reshape(-1, 3, len(DIMENSIONS))
+    avg = (x[:, 1] + x[:, 2]) / 2
+    return np.concatenate([x, avg[:, None]], axis=1)
+
+
+def _mask_incomplete(x: np.ndarray) -> np.ndarray:
+    # Per dimensi, hanya sesi yang lengkap di semua seri yang dipakai (sama seperti perhitungan lama)
+    valid = np.isfinite(x).all(axis=1)
+    return np.where(valid[:, None, :], x, np.nan)
+
+
+def _pair_arrays(x: np.ndarray):
+    a = np.array([p[0] for p in PAIRS.values()])
+    b = np.array([p[1] for p in PAIRS.values()])
+    return x[:, a, :], x[:, b, :]   # (n, pasangan, dimensi)
+
+
+def spearman(x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """ρ dan p-value (uji t, seperti scipy.stats.spearmanr) untuk semua pasangan × dimensi."""
+    ranks  = stats.rankdata(x, axis=0, nan_policy="omit")
+    ra, rb = _pair_arrays(ranks)
+    n      = np.isfinite(ra).sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ra  = ra - np.nanmean(ra, axis=0)
+        rb  = rb - np.nanmean(rb, axis=0)
+        r   = np.nansum(ra * rb, axis=0) / np.sqrt(np.nansum(ra ** 2, axis=0) * np.nansum(rb ** 2, axis=0))
+        r   = np.clip(r, -1.0, 1.0)
+        t   = r * np.sqrt((n - 2) / ((1.0 + r) * (1.0 - r)))
+        p   = 2 * stats.t.sf(np.abs(t), np.maximum(n - 2, 1))
+    return r, p
+
+
+def weighted_kappa(x: np.ndarray) -> np.ndarray:
+    """Cohen's kappa berbobot kuadratik; skor dibulatkan ke kategori 1–5."""
+    ca, cb = _pair_arrays(x)
+    valid  = np.isfinite(ca)
+    ia     = np.clip(np.floor(np.nan_to_num(ca) + 0.5), 1, _LEVELS).astype(int) - 1
+    ib     = np.clip(np.floor(np.nan_to_num(cb) + 0.5), 1, _LEVELS).astype(int) - 1
+    _, n_pairs, n_dims = ca.shape
+    pair_idx = np.broadcast_to(np.arange(n_pairs)[None, :, None], ca.shape)
+    dim_idx  = np.broadcast_to(np.arange(n_dims)[None, None, :], ca.shape)
+    observed = np.zeros((n_pairs, n_dims, _LEVELS, _LEVELS))   # tabel kontingensi per pasangan × dimensi
+    np.add.at(observed, (pair_idx[valid], dim_idx[valid], ia[valid], ib[valid]), 1)
+    n        = observed.sum(axis=(2, 3), keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        expected = observed.sum(axis=3, keepdims=True) * observed.sum(axis=2, keepdims=True) / n
+        levels   = np.arange(_LEVELS)
+        weights  = (levels[:, None] - levels[None, :]) ** 2 / (_LEVELS - 1) ** 2
+        kappa    = 1 - (weights * observed).sum(axis=(2, 3)) / (weights * expected).sum(axis=(2, 3))
+    return kappa
+
+
+def icc(x: np.ndarray) -> np.ndarray:
+    """ICC(2,1) — two-way random, absolute agreement, single measure (Shrout & Fleiss)."""
+    ya, yb = _pair_arrays(x)
+    y      = np.stack([ya, yb], axis=1)        # (n, k=2, pasangan, dimensi)
+    k      = 2
+    n      = np.isfinite(ya).sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        grand    = np.nanmean(y, axis=(0, 1))
+        row_mean = np.nanmean(y, axis=1)
+        col_mean = np.nanmean(y, axis=0)
+        ss_rows  = k * np.nansum((row_mean - grand) ** 2, axis=0)
+        ss_cols  = n * ((col_mean - grand) ** 2).sum(axis=0)
+        ss_total = np.nansum((y - grand) ** 2, axis=(0, 1))
+        ms_rows  = ss_rows / (n - 1)
+        ms_cols  = ss_cols / (k - 1)
+        ms_err   = (ss_total - ss_rows - ss_cols) / ((n - 1) * (k - 1))
+        value    = (ms_rows - ms_err) / (ms_rows + (k - 1) * ms_err + k * (ms_cols - ms_err) / n)
+    return value
+
+
+def _entry(value: float, n: int, key: str, p: float | None = None) -> dict:
+    if n < MIN_N or not np.isfinite(value):
+        return {key: None, "n": int(n), "insufficient": True}
+    out = {key: round(float(value), 3), "n": int(n)}
+    if p is not None:
+        out["p_value"] = round(float(p), 4)
+    return out
+
+
+def compute(x: np.ndarray) -> dict:
+    x = _mask_incomplete(x)
+    # "overall" = semua dimensi digabung jadi satu sampel (n × 5 pengamatan)
+    pooled = x.transpose(0, 2, 1).reshape(-1, len(SERIES), 1)
+    result = {key: {} for key in PAIRS}
+    result["weighted_kappa"] = {key: {} for key in PAIRS}
+    result["icc"]            = {key: {} for key in PAIRS}
+    for data, labels in ((x, DIMENSIONS), (pooled, ["overall"])):
+        n = np.isfinite(data[:, 0]).sum(axis=0)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")   # dimensi tanpa data → NaN, ditandai insufficient di bawah
+            r, p       = spearman(data)
+            kappa      = weighted_kappa(data)
+            icc_values = icc(data)
+        for pi, key in enumerate(PAIRS):
+            for di, label in enumerate(labels):
+                if label == "overall" and n[di] < MIN_N:
+                    continue   # seperti sebelumnya: overall hanya muncul kalau datanya cukup
+                result[key][label]                   = _entry(r[pi, di], n[di], "r", p[pi, di])
+                result["weighted_kappa"][key][label] = _entry(kappa[pi, di], n[di], "kappa")
+                result["icc"][key][label]            = _entry(icc_values[pi, di], n[di], "icc")
+    result["sample_size"] = int(x.shape[0])
+    return result
+
+
+class CorrelationCache:
+    """Hasil korelasi terakhir; dihitung ulang hanya setelah invalidate() (penilaian rater disimpan)."""
+
+    def __init__(self):
+        self._lock       = threading.Lock()
+        self._generation = 0
+        self._result: dict | None = None
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._result      = None
+
+    def get(self, db: Session) -> dict:
+        with self._lock:
+            if self._result is not None:
+                return {**self._result, "cached": True}
+            generation = self._generation
+        result = compute(load_scores(db))
+        result["timestamp"] = datetime.utcnow().isoformat()
+        with self._lock:
+            if generation == self._generation:   # jangan simpan hasil yang sudah basi
+                self._result = result
+        return {**result, "cached": False}
+
+
+correlations = CorrelationCache()
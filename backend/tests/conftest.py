@@ -0,0 +1,36 @@
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# app.config membaca env saat import → set sebelum modul app mana pun dimuat.
+# DB SQLite sementara per run; tanpa pre-warm TTS / worker background (app.main tidak diimport).
+_TMP = Path(tempfile.mkdtemp(prefix="speaking_tests_"))
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP / 'test.db'}"
+os.environ.pop("DATABASE_READ_URL", None)
+os.environ["TTS_PREWARM"]  = "0"
+os.environ["DB_ASYNC"]     = "0"
+
+from app.database import Base, engine, SessionLocal  # noqa: E402
+from app import models  # noqa: E402,F401  (registrasi tabel)
+
+Base.metadata.create_all(bind=engine)
+
+
+@pytest.fixture
+def db():
+    with SessionLocal() as session:
+        yield session
+
+
+@pytest.fixture
+def clean_tables():
+    """Kosongkan tabel yang dipakai test DB (sesi, turn, user)."""
+    def _clean():
+        with engine.begin() as conn:
+            for table in (models.SessionTurnORM, models.SessionRecordORM, models.UserORM):
+                conn.execute(table.__table__.delete())
+    _clean()
+    yield
+    _clean()
@@ -0,0 +1,88 @@
+import asyncio
+import math
+import time
+
+import pytest
+
+from app.groq_keys import GroqKeyScheduler, _KeyState, _parse_duration, estimate_tokens
+
+
+class _Resp:
+    def __init__(self, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers     = headers or {}
+
+
+@pytest.mark.parametrize("value,expected", [
+    ("2m59.56s", 179.56), ("7.66s", 7.66), ("450ms", 0.45), ("1h0m0s", 3600.0), ("3", 3.0),
+    ("", None), (None, None), ("soon", None),
+])
+def test_parse_duration(value, expected):
+    result = _parse_duration(value)
+    assert result == pytest.approx(expected) if expected is not None else result is None
+
+
+def test_estimate_tokens_counts_prompt_and_completion():
+    payload = {"messages": [{"role": "user", "content": "x" * 400}], "max_tokens": 100}
+    assert estimate_tokens(payload) > 100
+    assert estimate_tokens(None) == 0
+
+
+def test_estimate_larger_than_limit_waits_for_full_budget_only():
+    s = _KeyState(0, "k")
+    s.update_from_headers({"x-ratelimit-limit-tokens": "1000", "x-ratelimit-remaining-tokens": "1000",
+                           "x-ratelimit-reset-tokens": "10s"}, now=0.0)
+    # Request 5000 token tidak pernah muat → diperlakukan sebagai butuh budget penuh
+    assert s.available(0.0, 5000)
+    s.reserve(5000)
+    assert not s.available(1.0, 5000)
+    assert s.ready_at(5000) == pytest.approx(10.0)
+
+
+def test_budget_refills_once_per_window():
+    s = _KeyState(0, "k")
+    s.update_from_headers({"x-ratelimit-limit-requests": "2", "x-ratelimit-remaining-requests": "0",
+                           "x-ratelimit-reset-requests": "1s"}, now=0.0)
+    assert not s.available(0.5, 0)
+    assert s.available(1.5, 0)
+    assert s.remaining_req == 2 and math.isinf(s.reset_req_at)
+    s.reserve(0); s.reserve(0)
+    # Jendela berikutnya belum diketahui → tidak diisi ulang lagi sampai header baru datang
+    assert not s.available(5.0, 0)
+    assert s.snapshot(5.0)["requests"]["reset_in_s"] is None
+    s.update_from_headers({"x-ratelimit-remaining-requests": "2", "x-ratelimit-reset-requests": "1s"}, now=5.0)
+    assert s.available(5.0, 0)
+
+
+def test_acquire_picks_least_loaded_key():
+    sched = GroqKeyScheduler(["a", "b"])
+    busy, idle = sched._states
+    busy.update_from_headers({"x-ratelimit-limit-requests": "10", "x-ratelimit-remaining-requests": "2",
+                              "x-ratelimit-reset-requests": "60s"}, time.monotonic())
+    idle.update_from_headers({"x-ratelimit-limit-requests": "10", "x-ratelimit-remaining-requests": "9",
+                              "x-ratelimit-reset-requests": "60s"}, time.monotonic())
+    state = asyncio.run(sched.acquire())
+    assert state is idle and idle.inflight == 1 and idle.remaining_req == 8
+    sched.release(state)
+    assert idle.inflight == 0
+
+
+def test_acquire_queues_until_reset_when_all_keys_exhausted():
+    sched = GroqKeyScheduler(["a", "b"])
+    for s in sched._states:
+        s.update_from_headers({"x-ratelimit-limit-requests": "5", "x-ratelimit-remaining-requests": "0",
+                               "x-ratelimit-reset-requests": "200ms"}, time.monotonic())
+    started = time.monotonic()
+    state = asyncio.run(sched.acquire(max_wait=5.0))
+    assert time.monotonic() - started >= 0.15
+    assert state in sched._states and sched.waits == 1 and sched.queued == 0
+
+
+def test_429_puts_key_in_cooldown():
+    sched = GroqKeyScheduler(["a"])
+    state = asyncio.run(sched.acquire())
+    sched.release(state, _Resp(429, {"retry-after": "3"}))
+    now = time.monotonic()
+    assert state.throttled == 1
+    assert state.cooldown_until == pytest.approx(now + 3, abs=0.5)
+    assert not state.available(now, 0)
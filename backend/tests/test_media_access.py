@@ -0,0 +1,86 @@
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app import audio_serving
+from app.auth import (create_access_token, create_media_token, forget_media_user, get_media_user,
+                      verify_token)
+from app.models import SessionRecordORM, SessionTurnORM, UserORM
+
+
+def _request(token: str | None = None) -> Request:
+    query = f"token={token}".encode() if token else b""
+    return Request({"type": "http", "method": "GET", "path": "/uploads/audio/x.wav",
+                    "query_string": query, "headers": []})
+
+
+def _user(db, role: str = "user", active: bool = True) -> UserORM:
+    name = f"u_{uuid.uuid4().hex[:8]}"
+    user = UserORM(username=name, email=f"{name}@example.com", hashed_password="x", role=role, is_active=active)
+    db.add(user); db.commit()
+    return user
+
+
+def test_media_token_is_stable_within_window():
+    (t1, exp1), (t2, exp2) = create_media_token(7), create_media_token(7)
+    assert t1 == t2 and exp1 == exp2
+    assert verify_token(t1, expected_type="media")["sub"] == "7"
+
+
+def test_media_token_is_not_an_access_token():
+    token, _ = create_media_token(7)
+    with pytest.raises(HTTPException) as e:
+        verify_token(token, expected_type="access")
+    assert e.value.status_code == 401
+
+
+def test_query_token_reads_role_from_db(db, clean_tables):
+    user = _user(db, role="rater1")
+    token, _ = create_media_token(user.id)
+    current = get_media_user(_request(token), credentials=None)
+    assert current["role"] == "rater1" and current["sub"] == str(user.id)
+
+
+def test_deactivated_user_is_rejected_after_forget(db, clean_tables):
+    user = _user(db)
+    token, _ = create_media_token(user.id)
+    get_media_user(_request(token), credentials=None)
+    user.is_active = False; db.commit()
+    forget_media_user(user.id)
+    with pytest.raises(HTTPException) as e:
+        get_media_user(_request(token), credentials=None)
+    assert e.value.status_code == 401
+
+
+@pytest.mark.parametrize("token", [None, "not-a-jwt"])
+def test_missing_or_invalid_query_token_is_401(token):
+    with pytest.raises(HTTPException) as e:
+        get_media_user(_request(token), credentials=None)
+    assert e.value.status_code == 401
+
+
+def test_access_token_in_query_is_rejected():
+    with pytest.raises(HTTPException):
+        get_media_user(_request(create_access_token(1, "admin", "admin")), credentials=None)
+
+
+def test_file_access_rules(db, clean_tables):
+    owner, other = _user(db), _user(db)
+    clip, hidden = f"c_{uuid.uuid4().hex[:8]}.wav", f"h_{uuid.uuid4().hex[:8]}.wav"
+    visible = SessionRecordORM(user_id=owner.id, scenario="s", audio_path=f"full_{clip}", rater_visible=True)
+    private = SessionRecordORM(user_id=owner.id, scenario="s", audio_path=hidden, rater_visible=False)
+    db.add_all([visible, private]); db.flush()
+    db.add(SessionTurnORM(session_id=visible.id, idx=0, role="user", text="hi", audio_path=clip, word_count=1))
+    db.commit()
+
+    def allowed(user_id, role, name):
+        return audio_serving.access(db, {"sub": str(user_id), "role": role}, name)[0]
+
+    assert allowed(owner.id, "user", clip) and allowed(owner.id, "user", hidden)
+    assert not allowed(other.id, "user", clip)
+    assert allowed(other.id, "rater1", clip) and not allowed(other.id, "rater2", hidden)
+    assert allowed(other.id, "admin", hidden)
+    assert allowed(other.id, "user", f"tts_{uuid.uuid4().hex}.mp3")   # audio AI bersama
+    assert audio_serving.access(db, {"sub": str(owner.id), "role": "user"}, clip)[1] == visible.id
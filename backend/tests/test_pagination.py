@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy import select as sa_select
+
+from app.models import SessionRecordORM
+from app.pagination import decode_cursor, encode_cursor, keyset_page
+
+
+@pytest.fixture
+def sessions(db, clean_tables):
+    base = datetime(2026, 1, 1, 12, 0, 0)
+    # Beberapa sesi berbagi created_at yang sama → urutan ditentukan id (tie-breaker)
+    rows = [SessionRecordORM(user_id=1, scenario=f"s{i}", created_at=base - timedelta(minutes=i // 3))
+            for i in range(10)]
+    db.add_all(rows); db.commit()
+    return sorted(rows, key=lambda r: (r.created_at, r.id), reverse=True)
+
+
+def test_cursor_roundtrip():
+    ts = datetime(2026, 3, 4, 5, 6, 7, 890)
+    assert decode_cursor(encode_cursor(ts, 42)) == (ts, 42)
+
+
+@pytest.mark.parametrize("cursor", ["garbage", "2026-01-01T00:00:00_x", "_5"])
+def test_invalid_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as e:
+        decode_cursor(cursor)
+    assert e.value.status_code == 400
+
+
+def test_pages_cover_every_row_once_in_order(db, sessions):
+    seen, cursor = [], None
+    while True:
+        response = Response()
+        page = keyset_page(db, sa_select(SessionRecordORM), SessionRecordORM, cursor, 3, response)
+        seen += [r.id for r in page]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        assert len(page) == 3
+    assert seen == [r.id for r in sessions]
+
+
+def test_last_page_has_no_next_cursor(db, sessions):
+    response = Response()
+    page = keyset_page(db, sa_select(SessionRecordORM), SessionRecordORM, None, 50, response)
+    assert len(page) == len(sessions) and "X-Next-Cursor" not in response.headers
+
+
+def test_limit_is_clamped(db, sessions):
+    response = Response()
+    page = keyset_page(db, sa_select(SessionRecordORM), SessionRecordORM, None, 0, response)
+    assert len(page) == 1 and "X-Next-Cursor" in response.headers
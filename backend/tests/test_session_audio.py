@@ -0,0 +1,73 @@
+import wave
+
+import numpy as np
+
+from app import session_audio
+from app.session_audio import _StreamConverter, collect_parts, concat_wav
+
+
+def _write(path, frames: np.ndarray, rate: int = 16000, channels: int = 1):
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(channels); w.setsampwidth(2); w.setframerate(rate)
+        w.writeframes((frames * 32767).astype("<i2").tobytes())
+
+
+def _tone(seconds: float, rate: int, freq: float = 220.0, channels: int = 1) -> np.ndarray:
+    t = np.arange(int(seconds * rate)) / rate
+    x = (0.4 * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+    return np.repeat(x[:, None], channels, axis=1).ravel() if channels > 1 else x
+
+
+def _read(path) -> tuple[tuple[int, int, int], bytes]:
+    with wave.open(str(path), "rb") as w:
+        return (w.getnchannels(), w.getsampwidth(), w.getframerate()), w.readframes(w.getnframes())
+
+
+def test_collect_parts_rejects_paths_outside_uploads():
+    names = ["a.wav", "../etc/passwd", "sub/b.wav", ".hidden.wav", "", None, "c.wav"]
+    assert collect_parts(names, None) == ["a.wav", "c.wav"]
+
+
+def test_concat_same_format_is_byte_exact_with_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(session_audio, "_BLOCK_FRAMES", 1000)   # paksa banyak blok per klip
+    _write(tmp_path / "a.wav", _tone(0.5, 16000))
+    _write(tmp_path / "b.wav", _tone(0.3, 16000, 440))
+    name, stats = concat_wav(["a.wav", "missing.wav", "b.wav"], tmp_path)
+    params, data = _read(tmp_path / name)
+    assert params == (1, 2, 16000)
+    assert data == _read(tmp_path / "a.wav")[1] + _read(tmp_path / "b.wav")[1]
+    assert stats["clips"] == 2 and stats["skipped"] == 1 and stats["converted"] == 0
+    assert stats["segments"] == [["a.wav", 0, 8000], ["b.wav", 8000, 4800]]
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_concat_converts_mismatched_clip_to_first_format(tmp_path):
+    _write(tmp_path / "a.wav", _tone(0.5, 16000))
+    _write(tmp_path / "b.wav", _tone(1.0, 44100, channels=2), rate=44100, channels=2)
+    (tmp_path / "bad.wav").write_bytes(b"not a wav")
+    name, stats = concat_wav(["a.wav", "bad.wav", "b.wav"], tmp_path)
+    params, data = _read(tmp_path / name)
+    assert params == (1, 2, 16000)
+    assert stats["converted"] == 1 and stats["skipped"] == 1
+    # 1 detik 44.1 kHz stereo → ±16000 frame mono
+    assert abs(stats["segments"][1][2] - 16000) <= 2
+    assert len(data) // 2 == 8000 + stats["segments"][1][2]
+
+
+def test_single_clip_is_returned_as_is(tmp_path):
+    _write(tmp_path / "a.wav", _tone(0.1, 16000))
+    assert concat_wav(["a.wav"], tmp_path)[0] == "a.wav"
+    assert concat_wav(["nope.wav"], tmp_path)[0] is None
+
+
+def test_stream_converter_is_continuous_across_blocks():
+    x   = (_tone(1.0, 48000) * 32767).astype("<i2").tobytes()
+    one = _StreamConverter((1, 2, 48000), (1, 2, 16000)).process(x)
+    conv, parts = _StreamConverter((1, 2, 48000), (1, 2, 16000)), []
+    for i in range(0, len(x), 2 * 777):   # blok ganjil, tidak sejajar dengan rasio 3:1
+        parts.append(conv.process(x[i:i + 2 * 777]))
+    blocks = b"".join(parts)
+    a, b = np.frombuffer(one, "<i2").astype(int), np.frombuffer(blocks, "<i2").astype(int)
+    assert abs(len(a) - len(b)) <= 1
+    n = min(len(a), len(b))
+    assert np.max(np.abs(a[:n] - b[:n])) <= 2
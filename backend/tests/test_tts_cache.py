@@ -0,0 +1,63 @@
+import os
+import time
+
+from app.tts_cache import TTSCache, cache_key, normalize_text
+
+
+def _age(cache: TTSCache, name: str, seconds: float) -> None:
+    t = time.time() - seconds
+    os.utime(cache.dir / name, (t, t))
+
+
+def test_key_ignores_whitespace_differences():
+    assert normalize_text("  Hello \n world ") == "Hello world"
+    assert cache_key("piper", "amy", "Hello  world") == cache_key("piper", "amy", " Hello world")
+    assert cache_key("piper", "amy", "hi") != cache_key("edge", "amy", "hi")
+
+
+def test_lookup_respects_candidate_order(tmp_path):
+    cache = TTSCache(tmp_path, max_bytes=10_000)
+    name  = cache.put("edge", "aria", "hello", b"x" * 10, "mp3")
+    assert cache.lookup([("piper", "amy"), ("edge", "aria")], "hello") == name
+    assert cache.lookup([("piper", "amy")], "hello") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_evicts_least_recently_used_first(tmp_path):
+    cache = TTSCache(tmp_path, max_bytes=250)
+    a = cache.put("p", "v", "a", b"a" * 100, "wav"); _age(cache, a, 300)
+    b = cache.put("p", "v", "b", b"b" * 100, "wav"); _age(cache, b, 200)
+    cache.lookup([("p", "v")], "a")                  # a jadi yang terbaru
+    c = cache.put("p", "v", "c", b"c" * 100, "wav")
+    assert (tmp_path / a).exists() and not (tmp_path / b).exists() and (tmp_path / c).exists()
+    assert cache.stats()["evicted"] == 1 and cache.stats()["bytes"] <= 250
+
+
+def test_referenced_files_are_kept_on_disk(tmp_path):
+    used  = set()
+    cache = TTSCache(tmp_path, max_bytes=150, referenced=lambda names: used & set(names))
+    a = cache.put("p", "v", "a", b"a" * 100, "wav"); _age(cache, a, 300)
+    used.add(a)                                       # dipakai sesi tersimpan
+    b = cache.put("p", "v", "b", b"b" * 100, "wav")
+    assert (tmp_path / a).exists() and (tmp_path / b).exists()
+    # Keluar dari index (tidak dicek ulang), tapi file tetap ada untuk rater
+    assert cache.stats()["evicted"] == 0 and cache.stats()["entries"] == 1
+
+
+def test_recently_used_files_survive_grace_period(tmp_path):
+    cache = TTSCache(tmp_path, max_bytes=150, grace_s=3600)
+    a = cache.put("p", "v", "a", b"a" * 100, "wav")
+    b = cache.put("p", "v", "b", b"b" * 100, "wav")
+    assert (tmp_path / a).exists() and (tmp_path / b).exists()   # over batas, tapi masih baru
+    _age(cache, a, 7200)
+    cache.put("p", "v", "c", b"c" * 10, "wav")
+    assert not (tmp_path / a).exists() and (tmp_path / b).exists()
+
+
+def test_index_is_rebuilt_from_disk_in_mtime_order(tmp_path):
+    first = TTSCache(tmp_path, max_bytes=10_000)
+    old = first.put("p", "v", "old", b"o" * 10, "wav"); _age(first, old, 500)
+    new = first.put("p", "v", "new", b"n" * 10, "mp3")
+    second = TTSCache(tmp_path, max_bytes=10_000)
+    assert second.stats()["entries"] == 2 and second.stats()["bytes"] == 20
+    assert [n for n, _ in second._index.values()] == [old, new]
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+from app import validation_bootstrap as vb
+from app import validation_stats as vs
+
+
+@pytest.fixture
+def scores():
+    rng = np.random.default_rng(7)
+    ai  = rng.integers(1, 6, size=(40, len(vs.DIMENSIONS))).astype(float)
+    r1  = np.clip(ai + rng.integers(-1, 2, size=ai.shape), 1, 5)
+    r2  = np.clip(ai + rng.integers(-1, 2, size=ai.shape), 1, 5)
+    x   = np.stack([ai, r1, r2, (r1 + r2) / 2], axis=1)   # (n, seri, dimensi)
+    x[3, 1, 2] = np.nan                                  # satu skor hilang
+    return vs._mask_incomplete(x)
+
+
+def _reference_kappa(a: np.ndarray, b: np.ndarray) -> float:
+    ia = np.clip(np.floor(a + 0.5), 1, 5).astype(int) - 1
+    ib = np.clip(np.floor(b + 0.5), 1, 5).astype(int) - 1
+    obs = np.zeros((5, 5))
+    for i, j in zip(ia, ib):
+        obs[i, j] += 1
+    exp = np.outer(obs.sum(axis=1), obs.sum(axis=0)) / obs.sum()
+    w = (np.arange(5)[:, None] - np.arange(5)[None, :]) ** 2 / 16
+    return 1 - (w * obs).sum() / (w * exp).sum()
+
+
+def test_spearman_matches_scipy(scores):
+    r, p = vs.spearman(scores)
+    for pi, (a, b) in enumerate(vs.PAIRS.values()):
+        for d in range(len(vs.DIMENSIONS)):
+            ok = np.isfinite(scores[:, a, d])
+            ref = stats.spearmanr(scores[ok, a, d], scores[ok, b, d])
+            assert r[pi, d] == pytest.approx(ref.statistic, abs=1e-9)
+            assert p[pi, d] == pytest.approx(ref.pvalue, abs=1e-9)
+
+
+def test_weighted_kappa_matches_reference(scores):
+    kappa = vs.weighted_kappa(scores)
+    for pi, (a, b) in enumerate(vs.PAIRS.values()):
+        for d in range(len(vs.DIMENSIONS)):
+            ok = np.isfinite(scores[:, a, d])
+            assert kappa[pi, d] == pytest.approx(_reference_kappa(scores[ok, a, d], scores[ok, b, d]))
+
+
+def test_perfect_agreement_gives_one():
+    x = np.tile(np.arange(1, 6, dtype=float)[:, None, None], (1, 4, len(vs.DIMENSIONS)))
+    assert np.allclose(vs.weighted_kappa(x), 1.0)
+    assert np.allclose(vs.icc(x), 1.0)
+
+
+def test_compute_flags_small_samples():
+    x = np.full((2, 4, len(vs.DIMENSIONS)), 3.0)
+    out = vs.compute(x)
+    assert out["ai_vs_rater1"]["range"]["insufficient"] and "overall" in out["ai_vs_rater1"]
+
+
+def test_weighted_midranks_equal_ranks_of_repeated_sample():
+    values = np.array([3.0, 1.0, 3.0, 2.0, 5.0])
+    w      = np.array([[2, 0, 1, 3, 1], [1, 1, 1, 1, 1]], dtype=float)
+    ranks  = vb._weighted_midranks(values, w)
+    for row, weights in zip(ranks, w):
+        expanded = np.repeat(values, weights.astype(int))
+        ref      = stats.rankdata(expanded)
+        for i, v in enumerate(values):
+            if weights[i]:
+                assert row[i] == pytest.approx(ref[expanded == v][0])
+
+
+def test_unit_weights_reproduce_point_estimates(scores):
+    cols = vb._columns(scores)
+    est  = vb._metrics(np.ones((1, scores.shape[0])), cols)[:, :, 0, :]
+    r, _ = vs.spearman(scores)
+    assert np.allclose(est[0, :, :len(vs.DIMENSIONS)], r)
+    assert np.allclose(est[1, :, :len(vs.DIMENSIONS)], vs.weighted_kappa(scores))
+    a, b = vs._pair_arrays(scores)
+    assert np.allclose(est[2, :, :len(vs.DIMENSIONS)], np.nanmean(np.abs(a - b), axis=0))
+
+
+def test_bootstrap_is_seeded_and_brackets_estimate(scores):
+    seed = np.random.SeedSequence(1)
+    s1   = vb._bootstrap_chunk(scores, 300, seed)
+    s2   = vb._bootstrap_chunk(scores, 300, np.random.SeedSequence(1))
+    assert np.array_equal(s1, s2, equal_nan=True)
+    result = vb._summarise(scores, s1)
+    entry  = result["spearman"]["ai_vs_rater1"]["overall"]
+    assert entry["ci_low"] <= entry["estimate"] <= entry["ci_high"]
+    assert entry["n"] == np.isfinite(scores[:, 0]).sum()
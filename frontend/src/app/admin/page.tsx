@@ -1,8 +1,8 @@
 "use client";
 import { useEffect, useState, useMemo } from "react";
 import Link from "next/link";
-import { authFetch, TokenStore } from "@/utils/auth";
-import { useTheme, Icon } from "@/components/shared";
+import { authFetch, TokenStore, useMediaToken } from "@/utils/auth";
+import { useTheme, Icon, MediaAudio } from "@/components/shared";
 import {
   LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip,
   ResponsiveContainer, Legend, RadarChart, Radar,
@@ -19,7 +19,7 @@ type UserAnalytics = {
 };
 type Scenario = { id:number; title:string; description:string|null };
 type User     = { id:number; username:string; email:string; full_name:string|null; role:string; is_active:boolean; created_at:string; last_login_at:string|null };
-type Session  = { id:number; scenario:string; audio_path:string|null; duration_min:number; created_at:string; ai_scores:Record<string,number>; rater_scores:Record<number,Record<string,number>>; rating_status:{rater_1_done:boolean;rater_2_done:boolean;both_done:boolean}; rater_visible:boolean };
+type Session  = { id:number; scenario:string; audio_path:string|null; audio_status?:string|null; duration_min:number; created_at:string; ai_scores:Record<string,number>; rater_scores:Record<number,Record<string,number>>; rating_status:{rater_1_done:boolean;rater_2_done:boolean;both_done:boolean}; rater_visible:boolean };
 type Tab      = "analytics" | "users" | "scenarios" | "rater";
 type Dim      = "overall"|"range"|"accuracy"|"fluency"|"coherence"|"interaction";
 
@@ -105,6 +105,7 @@ export default function AdminPage() {
   // ── Rater tab state ──────────────────────────────────────────────────────────
   const [raterSessions,    setRaterSessions]    = useState<Session[]>([]);
   const [raterLoading,     setRaterLoading]     = useState(false);
+  const [raterCursor,      setRaterCursor]      = useState<string|null>(null);
   const [selectedRaterSes, setSelectedRaterSes] = useState<Session|null>(null);
   const [raterNum,         setRaterNum]         = useState<1|2>(1);
   const [raterScores,      setRaterScores]      = useState<Record<string,number>>({});
@@ -112,7 +113,10 @@ export default function AdminPage() {
   const [raterSaving,      setRaterSaving]      = useState(false);
   const [correlations,     setCorrelations]     = useState<any>(null);
   const [corrLoading,      setCorrLoading]      = useState(false);
+  const [bootstrap,        setBootstrap]        = useState<any>(null);
+  const [bootLoading,      setBootLoading]      = useState(false);
   const [confirmAction,    setConfirmAction]    = useState<{ type:"role"|"active"; user:User; newRole?:string }|null>(null);
+  const mediaToken = useMediaToken();
 
   // ── Users tab: search + pagination ──────────────────────────────────────────
   const [userSearch, setUserSearch] = useState("");
@@ -166,10 +170,22 @@ export default function AdminPage() {
       const r = await authFetch(`${API}/api/admin/validation/sessions`);
       if (!r.ok) throw new Error(`Rater sessions: ${r.status}`);
       setRaterSessions(await r.json());
+      setRaterCursor(r.headers.get("X-Next-Cursor"));
     } catch(e:any) { setErr(e?.message); }
     finally { setRaterLoading(false); }
   };
 
+  const loadMoreRaterSessions = async () => {
+    if (!raterCursor) return;
+    try {
+      const r = await authFetch(`${API}/api/admin/validation/sessions?cursor=${encodeURIComponent(raterCursor)}`);
+      if (!r.ok) throw new Error(`Rater sessions: ${r.status}`);
+      const more: Session[] = await r.json();
+      setRaterSessions(p => [...p, ...more]);
+      setRaterCursor(r.headers.get("X-Next-Cursor"));
+    } catch(e:any) { setErr(e?.message); }
+  };
+
   const loadCorrelations = async () => {
     setCorrLoading(true);
     try {
@@ -180,6 +196,23 @@ export default function AdminPage() {
     finally { setCorrLoading(false); }
   };
 
+  // Bootstrap CI dihitung di background — poll sampai status "done"
+  const loadBootstrap = async () => {
+    setBootLoading(true);
+    try {
+      for (let i = 0; i < 90; i++) {
+        const r = await authFetch(`${API}/api/admin/validation/bootstrap`);
+        if (!r.ok && r.status !== 202) throw new Error(`Bootstrap: ${r.status}`);
+        const data = await r.json();
+        if (data.status === "failed") throw new Error(data.error || "Bootstrap gagal");
+        if (data.status === "done") { setBootstrap(data); return; }
+        await new Promise(res => setTimeout(res, 2000));
+      }
+      throw new Error("Bootstrap belum selesai — coba lagi nanti");
+    } catch(e:any) { setErr(e?.message); }
+    finally { setBootLoading(false); }
+  };
+
   const selectRaterSession = (s: Session) => {
     setSelectedRaterSes(s);
     const existing = s.rater_scores[raterNum];
@@ -951,6 +984,12 @@ export default function AdminPage() {
                       </div>
                     </div>
                   ))}
+                  {!raterLoading && raterCursor && (
+                    <button onClick={loadMoreRaterSessions}
+                      className="w-full py-3 text-xs" style={{ color:"var(--text2)" }}>
+                      Muat lebih banyak
+                    </button>
+                  )}
                 </div>
               </div>
 
@@ -964,10 +1003,9 @@ export default function AdminPage() {
                       Rekaman Audio — {selectedRaterSes.scenario}
                     </p>
                     {selectedRaterSes.audio_path ? (
-                      <audio key={selectedRaterSes.id} controls className="w-full" style={{ borderRadius:12 }}>
-                        <source src={`${API}/uploads/audio/${selectedRaterSes.audio_path}`} type="audio/wav" />
-                        Browser tidak support audio
-                      </audio>
+                      <MediaAudio path={selectedRaterSes.audio_path} token={mediaToken} className="w-full" style={{ borderRadius:12 }} />
+                    ) : selectedRaterSes.audio_status === "pending" ? (
+                      <p className="text-sm" style={{ color:"var(--text3)" }}>Audio sesi sedang digabungkan — muat ulang sebentar lagi</p>
                     ) : (
                       <p className="text-sm" style={{ color:"var(--danger)" }}>Audio tidak tersedia</p>
                     )}
@@ -1110,13 +1148,54 @@ export default function AdminPage() {
                     Spearman ρ antara skor AI dan rater manusia
                   </p>
                 </div>
-                <button onClick={loadCorrelations} disabled={corrLoading}
-                  className="px-5 py-2 rounded-2xl text-sm font-bold transition-all active:scale-95 disabled:opacity-40"
-                  style={{ background:"var(--accent)", color:"#0c0c10" }}>
-                  {corrLoading ? "Menghitung…" : "Hitung Korelasi"}
-                </button>
+                <div className="flex gap-2">
+                  <button onClick={loadBootstrap} disabled={bootLoading}
+                    className="px-4 py-2 rounded-2xl text-sm font-medium border transition-all active:scale-95 disabled:opacity-40"
+                    style={{ color:"var(--text2)", borderColor:"var(--border2)", background:"var(--surface2)" }}>
+                    {bootLoading ? "Bootstrap…" : "CI Bootstrap"}
+                  </button>
+                  <button onClick={loadCorrelations} disabled={corrLoading}
+                    className="px-5 py-2 rounded-2xl text-sm font-bold transition-all active:scale-95 disabled:opacity-40"
+                    style={{ background:"var(--accent)", color:"#0c0c10" }}>
+                    {corrLoading ? "Menghitung…" : "Hitung Korelasi"}
+                  </button>
+                </div>
               </div>
 
+              {/* Bootstrap 95% CI — ρ / κw / MAD per dimensi */}
+              {bootstrap && (
+                <div className="p-5 rounded-2xl overflow-x-auto mb-4" style={{ background:"var(--surface2)" }}>
+                  <p className="text-xs font-semibold mb-3" style={{ color:"var(--text3)" }}>
+                    CI 95% bootstrap ({bootstrap.resamples} resample, n = {bootstrap.sample_size}) — AI vs Rata-rata Rater
+                  </p>
+                  <table className="w-full text-xs">
+                    <thead>
+                      <tr style={{ color:"var(--text3)" }}>
+                        <th className="text-left font-medium pb-2">Dimensi</th>
+                        <th className="text-right font-medium pb-2 pl-3">ρ</th>
+                        <th className="text-right font-medium pb-2 pl-3">κw</th>
+                        <th className="text-right font-medium pb-2 pl-3">MAD</th>
+                      </tr>
+                    </thead>
+                    <tbody>
+                      {[...RATER_DIMS.map(d => ({ key:d.key, label:d.label })), { key:"overall", label:"Overall" }].map(d => (
+                        <tr key={d.key} className="border-t" style={{ borderColor:"var(--border)" }}>
+                          <td className="py-1.5" style={{ color:"var(--text2)" }}>{d.label}</td>
+                          {(["spearman","weighted_kappa","mean_abs_diff"] as const).map(m => {
+                            const e = bootstrap[m]?.ai_vs_avg_rater?.[d.key];
+                            return (
+                              <td key={m} className="py-1.5 pl-3 text-right tabular-nums" style={{ color:"var(--text)" }}>
+                                {!e || e.estimate==null ? "—" : `${e.estimate.toFixed(2)} [${e.ci_low.toFixed(2)}, ${e.ci_high.toFixed(2)}]`}
+                              </td>
+                            );
+                          })}
+                        </tr>
+                      ))}
+                    </tbody>
+                  </table>
+                </div>
+              )}
+
               {correlations ? (
                 correlations.sample_size < 3 ? (
                   <div className="rounded-2xl p-6 text-center" style={{ background:"var(--surface2)" }}>
@@ -1194,6 +1273,42 @@ export default function AdminPage() {
                         </div>
                       ))}
                     </div>
+                    {/* Reliabilitas: weighted kappa (kuadratik) & ICC(2,1) */}
+                    {correlations.weighted_kappa && correlations.icc && (
+                      <div className="p-5 rounded-2xl overflow-x-auto" style={{ background:"var(--surface2)" }}>
+                        <p className="text-xs font-semibold mb-3" style={{ color:"var(--text3)" }}>
+                          Kesepakatan — κw (weighted kappa) / ICC(2,1)
+                        </p>
+                        <table className="w-full text-xs">
+                          <thead>
+                            <tr style={{ color:"var(--text3)" }}>
+                              <th className="text-left font-medium pb-2">Pasangan</th>
+                              {[...RATER_DIMS.map(d => ({ key:d.key, label:d.label })), { key:"overall", label:"Overall" }].map(d => (
+                                <th key={d.key} className="text-right font-medium pb-2 pl-3">{d.label}</th>
+                              ))}
+                            </tr>
+                          </thead>
+                          <tbody>
+                            {(["ai_vs_avg_rater","rater1_vs_rater2","ai_vs_rater1","ai_vs_rater2"] as const).map(k => (
+                              <tr key={k} className="border-t" style={{ borderColor:"var(--border)" }}>
+                                <td className="py-1.5" style={{ color:"var(--text2)" }}>
+                                  {k==="ai_vs_avg_rater" ? "AI vs Rata-rata" : k==="rater1_vs_rater2" ? "R1 vs R2" : k==="ai_vs_rater1" ? "AI vs R1" : "AI vs R2"}
+                                </td>
+                                {[...RATER_DIMS.map(d => d.key), "overall"].map(dk => {
+                                  const kw  = correlations.weighted_kappa[k]?.[dk]?.kappa;
+                                  const icc = correlations.icc[k]?.[dk]?.icc;
+                                  return (
+                                    <td key={dk} className="py-1.5 pl-3 text-right tabular-nums" style={{ color:"var(--text)" }}>
+                                      {kw==null ? "—" : kw.toFixed(2)} / {icc==null ? "—" : icc.toFixed(2)}
+                                    </td>
+                                  );
+                                })}
+                              </tr>
+                            ))}
+                          </tbody>
+                        </table>
+                      </div>
+                    )}
                   </div>
                 )
               ) : (
@@ -130,6 +130,7 @@ export default function PracticeSessionPage({ params }:{ params:{ id:string } })
   const [reflectData,  setReflectData]  = useState<ReflectOut|null>(null);
   const [planLoad,     setPlanLoad]     = useState(false);
   const [planData,     setPlanData]     = useState<PlanOut|null>(null);
+  const [agentJobId,   setAgentJobId]   = useState<number|null>(null);  // job reflect+plan dari /sessions
   const [ended,        setEnded]        = useState(false);
   const [mounted,      setMounted]      = useState(false);
   const [startAt,      setStartAt]      = useState<number|null>(null);
@@ -147,6 +148,8 @@ export default function PracticeSessionPage({ params }:{ params:{ id:string } })
   const feedbackRef = useRef<HTMLDivElement>(null);
   const abortRef    = useRef<AbortController|null>(null);
   const ttsAudioRef = useRef<HTMLAudioElement|null>(null);  // referensi audio TTS aktif
+  const newSessionKey = () => (typeof crypto!=="undefined"&&"randomUUID" in crypto)?crypto.randomUUID():`${Date.now()}-${Math.random().toString(36).slice(2)}`;
+  const sessionKeyRef = useRef<string>(newSessionKey());  // skor per-giliran di-cache backend per sesi
 
   useEffect(() => {
     setMounted(true);
@@ -343,6 +346,16 @@ export default function PracticeSessionPage({ params }:{ params:{ id:string } })
     if (ended) return;
     const newMsgs:Msg[]=[...msgs,{role:"user",content:userText}];
     setMsgs(newMsgs); setThinking(true);
+    // Nilai giliran ini di background — /feedback di akhir sesi tinggal menggabungkan
+    const lastAi=[...msgs].reverse().find(m=>m.role==="assistant");
+    authFetch(`${API}/api/feedback/turn`,{
+      method:"POST", headers:{"Content-Type":"application/json"},
+      body:JSON.stringify({
+        session_key: sessionKeyRef.current,
+        turn_idx:    newMsgs.filter(m=>m.role==="user").length-1,
+        messages:    lastAi?[lastAi,{role:"user",content:userText}]:[{role:"user",content:userText}],
+      }),
+    }).catch(()=>{});
     try {
       const r=await authFetch(`${API}/api/chat`,{
         method:"POST", headers:{"Content-Type":"application/json"},
@@ -373,7 +386,7 @@ export default function PracticeSessionPage({ params }:{ params:{ id:string } })
     try {
       const fb=await authFetch(`${API}/api/feedback`,{
         method:"POST", headers:{"Content-Type":"application/json"},
-        body:JSON.stringify({messages:msgs,duration_min:dur}),
+        body:JSON.stringify({messages:msgs,duration_min:dur,session_key:sessionKeyRef.current}),
       });
       const fbJson=await fb.json();
       if (fbJson?.scores) {
@@ -387,7 +400,7 @@ export default function PracticeSessionPage({ params }:{ params:{ id:string } })
         setFeedback(scored);
         if (fbJson.descriptors)       setDescriptors(fbJson.descriptors);
         if (fbJson.objective_metrics) setObjective(fbJson.objective_metrics);
-        await authFetch(`${API}/api/sessions`,{
+        const sv=await authFetch(`${API}/api/sessions`,{
           method:"POST", headers:{"Content-Type":"application/json"},
           body:JSON.stringify({
             scenario:isAgent?agentTitle||"AI Plan":mapTitle(id),
@@ -399,6 +412,7 @@ export default function PracticeSessionPage({ params }:{ params:{ id:string } })
             messages:msgs.filter((m:Msg)=>m.role!=="system"),
           }),
         });
+        try { const sj=await sv.json(); setAgentJobId(sj?.agent_job_id??null); } catch { setAgentJobId(null); }
       } else { setFbRaw(fbJson?.content||"Tidak ada feedback yang dihasilkan."); }
       if (isAgent&&itemId) await authFetch(`${API}/api/agent/complete`,{
         method:"POST", headers:{"Content-Type":"application/json"},
@@ -409,9 +423,28 @@ export default function PracticeSessionPage({ params }:{ params:{ id:string } })
     finally { setFbLoading(false); }
   };
 
+  // Reflect+plan sudah dijalankan backend sejak sesi disimpan — tinggal poll hasilnya
+  const pollAgentJob=async(jobId:number):Promise<boolean>=>{
+    setReflectLoad(true); setPlanLoad(true);
+    try {
+      for (let i=0;i<90;i++) {
+        const r=await authFetch(`${API}/api/agent/jobs/${jobId}`);
+        if (!r.ok) return false;
+        const j=await r.json();
+        if (j?.reflect) { setReflectData(j.reflect); setReflectLoad(false); }
+        if (j?.status==="done") { setPlanData(j.plan||null); return true; }
+        if (j?.status==="failed") return false;
+        await new Promise(res=>setTimeout(res,1500));
+      }
+      return false;
+    } catch { return false; }
+    finally { setReflectLoad(false); setPlanLoad(false); }
+  };
+
   const doReflect=async()=>{
     if (!ended||reflectLoad||planLoad) return;
     setReflectData(null); setPlanData(null);
+    if (agentJobId&&await pollAgentJob(agentJobId)) return;
     let rj:ReflectOut|null=null;
     try {
       setReflectLoad(true);
@@ -437,8 +470,9 @@ export default function PracticeSessionPage({ params }:{ params:{ id:string } })
     stopTTS();
     if (isAgent&&planData?.scenario) setAgentTitle(planData.scenario);
     setEnded(false); setFeedback(null); setFbRaw(""); setDescriptors(null); setObjective(null);
-    setReflectData(null); setPlanData(null); setTranscript(""); setAudioPaths([]);
+    setReflectData(null); setPlanData(null); setAgentJobId(null); setTranscript(""); setAudioPaths([]);
     setConversationTurns([]); setStartAt(Date.now());
+    sessionKeyRef.current=newSessionKey();
     setMsgs([{role:"assistant",content:starter||(isAgent?"Let's continue!":mapOpen(id))}]);
   };
 
@@ -1,22 +1,37 @@
 "use client";
-import { useEffect, useState } from "react";
-import { authFetch, TokenStore } from "@/utils/auth";
-import { useTheme, Icon } from "@/components/shared";
-
-type ConversationTurn = { role: "user" | "assistant"; path: string };
+import { useEffect, useRef, useState } from "react";
+import { authFetch, TokenStore, useMediaToken } from "@/utils/auth";
+import { useTheme, Icon, MediaAudio } from "@/components/shared";
 
+// Ringkasan dari GET /api/rater/sessions
 type RaterSession = {
   id: number;
   scenario: string;
-  audio_path: string | null;
-  full_audio_json: string | null;  // [{role, path}] urutan audio turn-by-turn
-  full_text_json:  string | null;  // [{role, content}] transkrip teks percakapan
+  has_audio: boolean;
+  audio_status?: string | null;    // pending = audio gabungan masih dirakit di server
+  turn_count: number | null;
   duration_min: number;
   created_at: string;
   my_rater_id:    number;
   my_rating_done: boolean;
 };
 
+// Manifest turn (teks + audio sejajar) dari GET /api/rater/sessions/{id}/bundle
+type ManifestTurn = {
+  idx: number;
+  role: "user" | "assistant";
+  text: string | null;
+  audio: string | null;
+  duration_s: number | null;
+  bytes: number | null;
+};
+type RaterBundle = {
+  id: number;
+  audio_path: string | null;       // file sesi gabungan
+  audio_status?: string | null;
+  manifest: { turns: ManifestTurn[]; turn_count: number; audio_s: number } | null;
+};
+
 const DIMS = [
   { key: "range",     label: "Kosakata" },
   { key: "accuracy",  label: "Tata Bahasa" },
@@ -85,13 +100,18 @@ export default function RaterPage() {
   const [myRaterNum,setMyRaterNum]= useState<1|2>(1);  // dari role, bukan pilihan user
   const [sessions,  setSessions]  = useState<RaterSession[]>([]);
   const [loading,   setLoading]   = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [selected,  setSelected]  = useState<RaterSession | null>(null);
+  const [bundle,    setBundle]    = useState<RaterBundle | null>(null);
+  const selectedId = useRef<number | null>(null);   // abaikan bundle yang datang terlambat
   const [scores,    setScores]    = useState<Record<string, number>>({});
   const [notes,     setNotes]     = useState("");
   const [saving,     setSaving]    = useState(false);
   const [success,    setSuccess]   = useState<string | null>(null);
   const [err,        setErr]       = useState<string | null>(null);
   const [showRubric, setShowRubric] = useState(false);
+  const mediaToken = useMediaToken();
 
   useEffect(() => {
     setMounted(true);
@@ -110,15 +130,38 @@ export default function RaterPage() {
       const r = await authFetch(`${API}/api/rater/sessions`);
       if (!r.ok) throw new Error(`${r.status}`);
       setSessions(await r.json());
+      setNextCursor(r.headers.get("X-Next-Cursor"));
     } catch (e: any) { setErr(e?.message); }
     finally { setLoading(false); }
   };
 
-  const selectSession = (s: RaterSession) => {
+  // Halaman berikutnya (keyset cursor dari header X-Next-Cursor)
+  const loadMoreSessions = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const r = await authFetch(`${API}/api/rater/sessions?cursor=${encodeURIComponent(nextCursor)}`);
+      if (!r.ok) throw new Error(`${r.status}`);
+      const more: RaterSession[] = await r.json();
+      setSessions(prev => [...prev, ...more]);
+      setNextCursor(r.headers.get("X-Next-Cursor"));
+    } catch (e: any) { setErr(e?.message); }
+    finally { setLoadingMore(false); }
+  };
+
+  const selectSession = async (s: RaterSession) => {
     setSelected(s);
+    setBundle(null);
+    selectedId.current = s.id;
     setScores(Object.fromEntries(DIMS.map(d => [d.key, 3])));
     setNotes("");
     setErr(null);
+    try {
+      const r = await authFetch(`${API}/api/rater/sessions/${s.id}/bundle`);
+      if (!r.ok) throw new Error(`${r.status}`);
+      const b: RaterBundle = await r.json();
+      if (selectedId.current === b.id) setBundle(b);
+    } catch (e: any) { setErr(e?.message); }
   };
 
   const saveScore = async () => {
@@ -283,6 +326,7 @@ export default function RaterPage() {
                   </div>
                   <p className="text-xs mb-2" style={{ color: "var(--text2)" }}>
                     {new Date(s.created_at).toLocaleDateString("id-ID")} · {s.duration_min.toFixed(1)} min
+                    {s.turn_count ? ` · ${s.turn_count} turn` : ""}
                   </p>
                   {/* Hanya tampilkan status penilaian SENDIRI — tidak tahu status rater lain */}
                   <div className="flex gap-1.5">
@@ -300,6 +344,13 @@ export default function RaterPage() {
                   </div>
                 </button>
               ))}
+              {!loading && nextCursor && (
+                <button onClick={loadMoreSessions} disabled={loadingMore}
+                  className="w-full py-3 text-xs disabled:opacity-40"
+                  style={{ color: "var(--text2)" }}>
+                  {loadingMore ? "Memuat…" : "Muat lebih banyak"}
+                </button>
+              )}
             </div>
           </div>
 
@@ -314,18 +365,18 @@ export default function RaterPage() {
                 </p>
 
                 {(() => {
+                  if (!bundle || bundle.id !== selected.id) {
+                    return <p className="text-sm" style={{ color: "var(--text3)" }}>Memuat sesi…</p>;
+                  }
                   // Sesi baru: tampilkan per turn
-                  const turns: ConversationTurn[] = (() => {
-                    try { return selected.full_audio_json ? JSON.parse(selected.full_audio_json) : null; }
-                    catch { return null; }
-                  })();
+                  const turns = (bundle.manifest?.turns ?? []).filter(t => t.audio);
 
-                  if (turns && turns.length > 0) {
+                  if (turns.length > 0) {
                     return (
                       <div className="space-y-3">
                         {turns.map((t, i) => {
                           const isUser = t.role === "user";
-                          const ext    = t.path.endsWith(".mp3") ? "audio/mpeg" : "audio/wav";
+                          const path   = t.audio!;
                           return (
                             <div key={i} className="rounded-2xl p-3 border"
                               style={{
@@ -343,11 +394,10 @@ export default function RaterPage() {
                                 </span>
                                 <span className="text-xs" style={{ color: "var(--text3)" }}>
                                   Turn {Math.floor(i / 2) + 1}{isUser ? "" : " · respons"}
+                                  {t.duration_s != null ? ` · ${t.duration_s.toFixed(1)} dtk` : ""}
                                 </span>
                               </div>
-                              <audio controls className="w-full" style={{ height: 36 }}>
-                                <source src={`${API}/uploads/audio/${t.path}`} type={ext} />
-                              </audio>
+                              <MediaAudio path={path} token={mediaToken} className="w-full" style={{ height: 36 }} />
                             </div>
                           );
                         })}
@@ -356,15 +406,16 @@ export default function RaterPage() {
                   }
 
                   // Sesi lama: fallback satu file gabungan
-                  if (selected.audio_path) {
+                  if (bundle.audio_path) {
                     return (
-                      <audio key={selected.id} controls className="w-full" style={{ borderRadius: 12 }}>
-                        <source src={`${API}/uploads/audio/${selected.audio_path}`} type="audio/wav" />
-                        Browser tidak support audio
-                      </audio>
+                      <MediaAudio path={bundle.audio_path} token={mediaToken} className="w-full" style={{ borderRadius: 12 }} />
                     );
                   }
 
+                  if (bundle.audio_status === "pending") {
+                    return <p className="text-sm" style={{ color: "var(--text3)" }}>Audio sesi sedang digabungkan — muat ulang sebentar lagi</p>;
+                  }
+
                   return <p className="text-sm" style={{ color: "var(--danger)" }}>Audio tidak tersedia</p>;
                 })()}
 
@@ -385,11 +436,8 @@ export default function RaterPage() {
               </div>
 
               {/* Transkrip teks percakapan */}
-              {selected.full_text_json && (() => {
-                type TextTurn = { role: string; content: string };
-                const turns: TextTurn[] = (() => {
-                  try { return JSON.parse(selected.full_text_json!); } catch { return []; }
-                })().filter((m: TextTurn) => m.role === "user" || m.role === "assistant");
+              {bundle?.id === selected.id && bundle.manifest && (() => {
+                const turns = bundle.manifest.turns.filter(t => t.text !== null);
                 if (!turns.length) return null;
                 return (
                   <div className="rounded-3xl p-6" style={card}>
@@ -411,7 +459,7 @@ export default function RaterPage() {
                                 {isUser ? "Mahasiswa" : "AI"}
                               </p>
                               <p className="text-sm leading-relaxed" style={{ color: "var(--text)" }}>
-                                {t.content}
+                                {t.text}
                               </p>
                             </div>
                           </div>
@@ -1,8 +1,8 @@
 // src/components/shared.tsx
 "use client";
-import { useEffect, useState, useCallback } from "react";
+import { useEffect, useState, useCallback, useRef } from "react";
 import Link from "next/link";
-import { logout, TokenStore } from "@/utils/auth";
+import { logout, TokenStore, audioUrl } from "@/utils/auth";
 
 // ─── Theme hook ───────────────────────────────────────────────────────────────
 export function useTheme() {
@@ -30,6 +30,31 @@ export function useTheme() {
   return { dark, toggle, ready };
 }
 
+// ─── Audio /uploads/audio (media token di URL) ───────────────────────────────
+// Player baru dirender setelah token ada (tanpa request 401 pertama). Token yang berganti untuk
+// file yang sama hanya dipasang saat player diam — ganti src = muat ulang dari awal.
+// Tanpa atribut type: file arsip bisa flac/ogg, TTS mp3 — browser membaca Content-Type.
+export function MediaAudio({ path, token, className, style }: {
+  path: string; token: string; className?: string; style?: React.CSSProperties;
+}) {
+  const ref = useRef<HTMLAudioElement>(null);
+  const [src, setSrc] = useState("");
+
+  useEffect(() => {
+    if (!token) return;
+    const el   = ref.current;
+    const busy = el !== null && !el.ended && (!el.paused || el.currentTime > 0);
+    setSrc(prev => (busy && prev.startsWith(audioUrl(path, "")) ? prev : audioUrl(path, token)));
+  }, [path, token]);
+
+  if (!src) return <p className="text-xs" style={{ color: "var(--text3)" }}>Memuat audio…</p>;
+  return (
+    <audio ref={ref} src={src} controls preload="metadata" className={className} style={style}>
+      Browser tidak support audio
+    </audio>
+  );
+}
+
 // ─── Icons ────────────────────────────────────────────────────────────────────
 export const Icon = {
   Mic: (p: React.SVGProps<SVGSVGElement>) => (
@@ -126,4 +126,33 @@ export function useAuth() {
   }, []);
 
   return { isLoggedIn, role, username, mounted, logout };
-}
\ No newline at end of file
+}
+// ─── Media token (URL <audio src>) ────────────────────────────────────────────
+// <audio> tidak bisa kirim header Bearer → /uploads/audio/<nama>?token=<media token>.
+// Token sama selama satu jendela server, jadi URL stabil dan cache browser terpakai.
+let _media: { token: string; expiresAt: number } | null = null;
+
+export async function getMediaToken(): Promise<string> {
+  if (_media && Date.now() / 1000 < _media.expiresAt - 300) return _media.token;
+  const res = await authFetch(`${API_BASE}/api/auth/media-token`);
+  if (!res.ok) return "";
+  const data = await res.json();
+  _media = { token: data.media_token, expiresAt: data.expires_at };
+  return _media.token;
+}
+
+export function useMediaToken(): string {
+  const [token, setToken] = useState("");
+  useEffect(() => {
+    // Token berlaku singkat (jendela server) → perbarui sebelum kadaluarsa selama halaman terbuka
+    const refresh = () => { getMediaToken().then(setToken).catch(() => {}); };
+    refresh();
+    const id = setInterval(refresh, 60_000);
+    return () => clearInterval(id);
+  }, []);
+  return token;
+}
+
+export function audioUrl(path: string, mediaToken: string): string {
+  return `${API_BASE}/uploads/audio/${encodeURIComponent(path)}?token=${encodeURIComponent(mediaToken)}`;
+}